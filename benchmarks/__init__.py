@@ -0,0 +1,25 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Performance benchmarks for the compiler.
+
+These are not unit tests; run them as modules from the repository root, e.g.::
+
+    python -m benchmarks.parse
+
+:mod:`benchmarks.suite` measures all compilation phases on the synthetic
+infrastructures of :mod:`benchmarks.generators`, and compares the results to
+a stored baseline. :mod:`benchmarks.importtime` guards the import time of the
+compiler the same way.
+"""
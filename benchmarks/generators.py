@@ -0,0 +1,113 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Synthetic infrastructure descriptions for benchmarks.
+
+Each generator takes the number of nodes and returns a parsed description;
+:func:`to_yaml` converts them to YAML text, with nodes referenced through
+anchors.
+"""
+
+import json
+import random
+
+def make_nodes(size):
+    return [dict(name='n{0}'.format(i), type='t',
+                 scaling=dict(min=1, max=3),
+                 variables=dict(port=80, tags=['a', 'b']))
+            for i in range(size)]
+
+def infrastructure(nodes, pairs, mappings=1, variables=None):
+    """Builds a description from nodes and ``(dependent, dependee)`` index
+    pairs; each edge gets ``mappings`` attribute mappings."""
+    deps = list()
+    for dependent, dependee in pairs:
+        connection = [nodes[dependent], nodes[dependee]]
+        if mappings:
+            deps.append(dict(
+                connection=connection,
+                mappings=[['attr{0}'.format(i), 'var{0}'.format(i)]
+                          for i in range(mappings)],
+                backend_hint='x'))
+        else:
+            deps.append(connection)
+    return dict(infra_name='bench', user_id='bench',
+                variables=variables or dict(image='img', flavor='small'),
+                nodes=nodes, dependencies=deps)
+
+def chain(size, **kwargs):
+    """n0 <- n1 <- ... <- n(size-1)"""
+    return infrastructure(make_nodes(size),
+                          [(i, i - 1) for i in range(1, size)], **kwargs)
+
+def fan(size, **kwargs):
+    """n0 <- n1..n(size-2) <- n(size-1): wide fan-out, then fan-in."""
+    pairs = [(i, 0) for i in range(1, size - 1)] + \
+            [(size - 1, i) for i in range(1, size - 1)]
+    return infrastructure(make_nodes(size), pairs, **kwargs)
+
+def lattice(size, **kwargs):
+    """Diamond lattice: layers of ``sqrt(size)`` nodes, each node depending on
+    its (at most three) neighbours in the previous layer."""
+    width = max(1, int(size ** 0.5))
+    pairs = [(i, j)
+             for i in range(width, size)
+             for j in range(i - i % width - width, i - i % width)
+             if abs(j % width - i % width) <= 1]
+    return infrastructure(make_nodes(size), pairs, **kwargs)
+
+def random_dag(size, degree=2.0, seed=0, **kwargs):
+    """Random DAG; each node depends on ``degree`` earlier nodes on average."""
+    rnd = random.Random(seed)
+    pairs = set()
+    for i in range(1, size):
+        count = min(i, int(degree) + (rnd.random() < degree % 1))
+        for j in rnd.sample(range(i), count):
+            pairs.add((i, j))
+    return infrastructure(make_nodes(size), sorted(pairs), **kwargs)
+
+def mapping_heavy(size, **kwargs):
+    """Random DAG with many attribute mappings on each edge."""
+    kwargs.setdefault('mappings', 20)
+    return random_dag(size, **kwargs)
+
+#: The graph shapes, by name
+SHAPES = dict(chain=chain, fan=fan, lattice=lattice, random=random_dag,
+              mappings=mapping_heavy)
+
+def to_yaml(desc):
+    """Converts a generated description to YAML. Nodes are anchored and
+    referenced by alias in the dependencies. Values are emitted in flow style
+    (JSON is valid YAML)."""
+    anchor = dict((id(n), 'n{0}'.format(i))
+                  for i, n in enumerate(desc['nodes']))
+    lines = ['{0}: {1}'.format(k, json.dumps(v)) for k, v in desc.items()
+             if k not in ('nodes', 'dependencies')]
+    lines.append('nodes:')
+    for n in desc['nodes']:
+        lines.append('  - &{0}'.format(anchor[id(n)]))
+        lines.extend('    {0}: {1}'.format(k, json.dumps(v))
+                     for k, v in n.items())
+    lines.append('dependencies:')
+    for d in desc['dependencies']:
+        if isinstance(d, dict):
+            connection = d['connection']
+            extra = ''.join('\n    {0}: {1}'.format(k, json.dumps(v))
+                            for k, v in d.items() if k != 'connection')
+            lines.append('  - connection: [ *{0}, *{1} ]{2}'.format(
+                anchor[id(connection[0])], anchor[id(connection[1])], extra))
+        else:
+            lines.append('  - [ *{0}, *{1} ]'.format(
+                anchor[id(d[0])], anchor[id(d[1])]))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,124 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Import time of the compiler.
+
+Imports :mod:`occo.compiler` in fresh interpreters with ``-X importtime``, and
+reports its cumulative import time (best of ``--repeat`` runs) and the
+slowest modules it imports. The ``occo`` namespace package is imported
+beforehand, so its cost (which depends on the installation) is not counted.
+
+The exit status is 1 if
+
+- any of :data:`DEFERRED` is imported along with the compiler; these must only
+  be imported on first use, or
+- the import is slower than the baseline by more than ``--tolerance`` (see
+  :mod:`benchmarks.suite`). Record a baseline with ``--save-baseline``.
+
+Usage::
+
+    python -m benchmarks.importtime [--repeat 5] [--top 10]
+        [--baseline FILE] [--save-baseline] [--tolerance 0.25]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from benchmarks.suite import compare
+
+MODULE = 'occo.compiler'
+
+#: Modules (and their submodules) that must not be imported by
+#: ``import occo.compiler``.
+DEFERRED = ['ruamel.yaml', 'occo.resourcehandler', 'occo.configmanager',
+            'occo.infraprocessor', 'occo.plugins']
+
+def import_times(module):
+    """Imports ``module`` in a new interpreter.
+
+    :returns: ``{name: (self, cumulative)}``: the import time of each module
+        imported (after the ``occo`` namespace package), in seconds.
+    """
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         'import occo; import {0}'.format(module)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True)
+    times, started = dict(), False
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            own, cumulative = int(fields[0]), int(fields[1])
+        except ValueError:
+            # Header line
+            continue
+        name = fields[2].strip()
+        if started:
+            times[name] = (own / 1e6, cumulative / 1e6)
+        elif name == 'occo':
+            # Modules are listed when their import is finished
+            started = True
+    return times
+
+def deferred_imports(modules):
+    """The items of ``modules`` that should have been deferred."""
+    return sorted(m for m in modules
+                  if any(m == d or m.startswith(d + '.') for d in DEFERRED))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compiler import time')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--baseline', default='bench_import_baseline.json')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    best = None
+    for _ in range(args.repeat):
+        times = import_times(MODULE)
+        if best is None or times[MODULE][1] < best[MODULE][1]:
+            best = times
+    total = best[MODULE][1]
+    print('import {0}: {1:.1f} ms'.format(MODULE, total * 1e3))
+    for name, (own, _) in sorted(best.items(), key=lambda i: -i[1][0]) \
+            [:args.top]:
+        print('  {0:<50} {1:8.2f} ms'.format(name, own * 1e3))
+
+    status = 0
+    for name in deferred_imports(best):
+        print('DEFERRED MODULE IMPORTED: ' + name)
+        status = 1
+
+    results = {'import/' + MODULE: dict(time=dict(total=total))}
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+        return status
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except IOError:
+        print('No baseline ({0}); not comparing.'.format(args.baseline))
+        return status
+    for r in compare(results, baseline, args.tolerance):
+        print('REGRESSION: ' + r)
+        status = 1
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Memory used by compiled descriptions, per node and per edge; and per node
+with large inherited variables.
+
+The input description is built before measuring, so only the memory allocated
+by the compiler is counted.
+
+The compact representation is compared to the original one (``before``),
+which is reproduced here: edges keep their information in a per-instance
+:attr:`__dict__` (:class:`BaselineEdge`), and each node holds its own copy of
+the normalized mappings of its edges (:class:`BaselineDescription`). Only
+retained memory is measured, so the temporary structures of the topological
+ordering are not included.
+
+Usage::
+
+    python -m benchmarks.memory [SIZE ...]
+"""
+
+import gc
+import sys
+import tracemalloc
+import occo.compiler
+from occo.compiler import StaticDescription, Edge, altcall, create_mapping
+from benchmarks import generators
+
+class BaselineEdge(object):
+    """The original :class:`~occo.compiler.Edge`, with a :attr:`__dict__`."""
+    def __init__(self, connection, mappings=[], **kwargs):
+        self.dependent, self.dependee = connection
+        self.mappings = mappings
+        self.__dict__.update(kwargs)
+
+class BaselineDescription(StaticDescription):
+    """Compiles with :class:`BaselineEdge` objects, and copies the mappings
+    into each node, like the original implementation."""
+    def __init__(self, *args, **kwargs):
+        occo.compiler.Edge = BaselineEdge
+        try:
+            StaticDescription.__init__(self, *args, **kwargs)
+        finally:
+            occo.compiler.Edge = Edge
+
+    def merge_mappings(self, node):
+        def copied(e):
+            return [altcall(create_mapping, m) for m in e.mappings]
+        inbound = dict((e.dependee['name'], copied(e))
+                       for e in self.inbound_edges(node['name']))
+        outbound = dict((e.dependent['name'], copied(e))
+                        for e in self.outbound_edges(node['name']))
+        return dict(inbound=inbound, outbound=outbound)
+
+def allocated(func):
+    """Memory retained by the result of ``func()``, in bytes."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+def main(sizes):
+    """Memory per edge (:class:`Edge` objects only) and per node (the whole
+    compiled description), before and after."""
+    print('{0:>8} {1:>8} {2:>8} {3:>13} {4:>13} {5:>13} {6:>13}'.format(
+        'graph', 'nodes', 'edges', 'B/edge before', 'B/edge after',
+        'B/node before', 'B/node after'))
+    for size in sizes:
+        for name in ('chain', 'fan'):
+            desc = getattr(generators, name)(size)
+            deps = desc['dependencies']
+            row = list()
+            for edgeclass in (BaselineEdge, Edge):
+                row.append(float(allocated(
+                    lambda: [altcall(edgeclass, d) for d in deps])) / len(deps))
+            for sdclass in (BaselineDescription, StaticDescription):
+                # Node descriptions are prepared in place
+                desc = getattr(generators, name)(size)
+                row.append(float(allocated(lambda: sdclass(desc))) / size)
+            print('{0:>8} {1:>8} {2:>8} {3:>13.1f} {4:>13.1f} {5:>13.1f} '
+                  '{6:>13.1f}'.format(name, size, len(deps), *row))
+
+def main_variables(size, counts):
+    """Memory per node with merged vs layered variable inheritance."""
+    print('{0:>10} {1:>16} {2:>16}'.format(
+        'variables', 'B/node (merged)', 'B/node (layered)'))
+    for count in counts:
+        variables = dict(('v{0}'.format(i), dict(value=i, blob='x' * 50))
+                         for i in range(count))
+        row = list()
+        for layered in (False, True):
+            desc = generators.chain(size, variables=variables)
+            row.append(float(allocated(lambda: StaticDescription(
+                desc, layered_variables=layered))) / size)
+        print('{0:>10} {1:>16.1f} {2:>16.1f}'.format(count, *row))
+
+if __name__ == '__main__':
+    main([int(i) for i in sys.argv[1:]] or [1000, 10000, 100000])
+    main_variables(1000, [10, 100, 1000])
@@ -0,0 +1,72 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Compares the original YAML loader (``ruamel.yaml.Loader``, pure Python,
+unsafe) with :mod:`occo.compiler.loader`.
+
+The legacy ``ruamel.yaml.load`` function has been removed from
+:mod:`ruamel.yaml` (0.18); the original loader is reproduced with
+``YAML(typ='unsafe', pure=True)``, which uses the same parser and constructor.
+
+Usage::
+
+    python -m benchmarks.parse [SIZE ...]
+"""
+
+import sys
+import timeit
+import warnings
+from ruamel.yaml import YAML
+from occo.compiler import loader
+
+def infra_yaml(size):
+    """A chain of ``size`` nodes with anchors, variables and mappings."""
+    lines = ['infra_name: bench', 'user_id: bench',
+             'variables: {image: img, flavor: small}', 'nodes:']
+    for i in range(size):
+        lines += ['  - &n{0}'.format(i),
+                  '    name: n{0}'.format(i),
+                  '    type: t',
+                  '    scaling: {min: 1, max: 3}',
+                  '    variables: {port: 80, tags: [a, b, c]}']
+    lines.append('dependencies:')
+    for i in range(1, size):
+        lines += ['  - connection: [ *n{0}, *n{1} ]'.format(i, i - 1),
+                  '    mappings:',
+                  '      - [ fqdn, upstream_host ]']
+    return '\n'.join(lines) + '\n'
+
+def old_load(text):
+    with warnings.catch_warnings():
+        # typ='unsafe' is pending deprecation
+        warnings.simplefilter('ignore')
+        return YAML(typ='unsafe', pure=True).load(text)
+
+def measure(func, text, repeat=3):
+    return min(timeit.repeat(lambda: func(text), number=1, repeat=repeat))
+
+def main(sizes):
+    print('C parser available: {0}'.format(loader.HAVE_CPARSER))
+    print('{0:>8} {1:>12} {2:>12} {3:>12} {4:>8}'.format(
+        'nodes', 'old [s]', 'safe [s]', 'fast [s]', 'speedup'))
+    for size in sizes:
+        text = infra_yaml(size)
+        old = measure(old_load, text)
+        pure = measure(lambda t: loader.load(t, pure=True), text)
+        fast = measure(loader.load, text)
+        print('{0:>8} {1:>12.4f} {2:>12.4f} {3:>12.4f} {4:>7.1f}x'.format(
+            size, old, pure, fast, old / fast))
+
+if __name__ == '__main__':
+    main([int(i) for i in sys.argv[1:]] or [100, 1000, 5000])
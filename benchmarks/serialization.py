@@ -0,0 +1,54 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Compares loading a serialized description with recompiling it from YAML.
+
+Usage::
+
+    python -m benchmarks.serialization [SIZE ...]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import timeit
+from occo.compiler import StaticDescription, serialization
+from benchmarks.parse import infra_yaml
+
+def measure(func, repeat=3):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+def main(sizes):
+    # Schema check warnings would distort the measurement
+    logging.disable(logging.WARNING)
+    print('{0:>8} {1:>12} {2:>12} {3:>12} {4:>12}'.format(
+        'nodes', 'size [kB]', 'yaml [s]', 'loads [s]', 'mmap [s]'))
+    for size in sizes:
+        text = infra_yaml(size)
+        data = StaticDescription(text).dumps()
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            compile_time = measure(lambda: StaticDescription(text))
+            loads_time = measure(lambda: StaticDescription.loads(data))
+            mmap_time = measure(lambda: serialization.load_file(path))
+        finally:
+            os.remove(path)
+        print('{0:>8} {1:>12.1f} {2:>12.4f} {3:>12.4f} {4:>12.4f}'.format(
+            size, len(data) / 1024.0, compile_time, loads_time, mmap_time))
+
+if __name__ == '__main__':
+    main([int(i) for i in sys.argv[1:]] or [100, 1000, 10000])
@@ -0,0 +1,182 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Compiler benchmark suite.
+
+Measures the phases of compilation separately, for each graph shape of
+:mod:`benchmarks.generators` and each size:
+
+``parse``
+    YAML parsing (:func:`occo.compiler.loader.load`)
+``schema``
+    :meth:`SchemaChecker.check_infra_desc`
+``topo``
+    Edge construction and :meth:`StaticDescription.topo_order`
+``prepare``
+    :meth:`StaticDescription.prepare_nodes` (variables and mappings)
+
+Wall time (best of ``--repeat`` runs) and peak memory (``tracemalloc``, in a
+separate run) are written to a JSON results file. If a baseline file exists,
+the results are compared to it, and phases slower (or using more memory) than
+the baseline by more than ``--tolerance`` are reported as regressions; the exit
+status is then 1. Baselines are machine specific; record one with
+``--save-baseline``.
+
+Infrastructures of 100k nodes are only measured with ``--large``: without
+the C extension of :mod:`ruamel.yaml`, parsing them alone takes very long.
+
+Usage::
+
+    python -m benchmarks.suite [--sizes 10,100,1000,10000] [--large]
+        [--shapes chain,fan,...] [--output FILE] [--baseline FILE]
+        [--save-baseline] [--tolerance 0.25] [--no-memory]
+"""
+
+import argparse
+import gc
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from occo.compiler import StaticDescription, Edge, altcall, loader
+from occo.compiler.schema_check import SchemaChecker
+from benchmarks import generators
+
+PHASES = ['parse', 'schema', 'topo', 'prepare']
+
+#: Size run only with --large; parsing alone takes long without the C parser
+LARGE = 100000
+
+#: Differences below these are considered noise, regardless of tolerance
+MIN_TIME_DIFF = 0.005
+MIN_MEMORY_DIFF = 64 * 1024
+
+def run_phases(text, measure):
+    """Runs the compilation phase by phase on ``text``; ``measure(name,
+    func)`` runs and measures a phase, and returns its result."""
+    desc = measure('parse', lambda: loader.load(text))
+    measure('schema', lambda: SchemaChecker.check_infra_desc(desc))
+    def topo():
+        edges = [altcall(Edge, e) for e in desc['dependencies']]
+        return StaticDescription.topo_order(desc['nodes'], edges)
+    measure('topo', topo)
+    # A lazy description has its edges indexed, but nothing else done
+    sd = StaticDescription(desc, lazy=True)
+    measure('prepare', lambda: sd.prepare_nodes(desc))
+
+def time_phases(text, repeat):
+    best = dict()
+    for _ in range(repeat):
+        def measure(name, func):
+            gc.collect()
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best[name] = min(best.get(name, elapsed), elapsed)
+            return result
+        run_phases(text, measure)
+    return best
+
+def memory_phases(text):
+    peaks = dict()
+    def measure(name, func):
+        gc.collect()
+        tracemalloc.start()
+        try:
+            return func()
+        finally:
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    run_phases(text, measure)
+    return peaks
+
+def run(shapes, sizes, repeat, memory):
+    results = dict()
+    for shape in shapes:
+        for size in sizes:
+            desc = generators.SHAPES[shape](size)
+            text = generators.to_yaml(desc)
+            key = '{0}/{1}'.format(shape, size)
+            entry = dict(nodes=size, edges=len(desc['dependencies']),
+                         time=time_phases(text, repeat))
+            if memory:
+                entry['memory'] = memory_phases(text)
+            results[key] = entry
+            print('{0:<18} {1}{2}'.format(key, '  '.join(
+                '{0}={1:.4f}s'.format(p, entry['time'][p]) for p in PHASES),
+                '  peak={0:.1f}MB'.format(max(entry['memory'].values())
+                                          / 2.0**20) if memory else ''))
+            sys.stdout.flush()
+    return results
+
+def compare(results, baseline, tolerance):
+    """Lists the regressions of ``results`` compared to ``baseline``."""
+    regressions = list()
+    for key, entry in sorted(results.items()):
+        base = baseline.get(key)
+        if not base:
+            continue
+        for metric, floor in (('time', MIN_TIME_DIFF),
+                              ('memory', MIN_MEMORY_DIFF)):
+            for phase, value in entry.get(metric, {}).items():
+                old = base.get(metric, {}).get(phase)
+                if old is None:
+                    continue
+                if value > old * (1 + tolerance) and value - old > floor:
+                    regressions.append(
+                        '{0} {1} {2}: {3:.4g} -> {4:.4g} ({5:+.0%})'.format(
+                            key, phase, metric, old, value,
+                            float(value) / old - 1 if old else 0))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compiler benchmark suite')
+    parser.add_argument('--sizes', default='10,100,1000,10000')
+    parser.add_argument('--large', action='store_true')
+    parser.add_argument('--shapes', default=','.join(sorted(generators.SHAPES)))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', dest='memory', action='store_false')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', default='bench_baseline.json')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    # Schema check warnings would distort the measurement
+    logging.disable(logging.WARNING)
+    sizes = [int(i) for i in args.sizes.split(',')]
+    if args.large and LARGE not in sizes:
+        sizes.append(LARGE)
+    results = run(args.shapes.split(','), sizes, args.repeat, args.memory)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+        return 0
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except IOError:
+        print('No baseline ({0}); not comparing.'.format(args.baseline))
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for r in regressions:
+        print('REGRESSION: ' + r)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -44,21 +44,34 @@ The compiler may provide other services in the future, for example:
 
     .. autofunction:: altcall
     .. autofunction:: create_mapping
+    .. autofunction:: node_indexer
+    .. autofunction:: resolve_edge
     .. autoclass:: Edge
         :members:
     .. autoclass:: TopoLevel
         :members:
     .. autoclass:: TopologicalOrder
         :members:
+    .. autoclass:: LazyNodeLookup
 """
 
 __all__ = ['StaticDescription', 'SchemaError']
 
-from ruamel import yaml
+import array
+import functools
+import logging
+import types
 import uuid
 import occo.util as util
 from occo.exceptions import SchemaError
-from .schema_check import SchemaChecker
+from .schema_check import SchemaChecker, _iter_node_errors
+from . import loader, cycles
+from .variables import VariableView
+from .instrumentation import CompileStats
+from .synch import SynchIndex
+
+log = logging.getLogger('occo.compiler')
+
 def altcall(target, data):
     """
     Allows alternative calling of a function/method.
@@ -113,19 +126,77 @@ def create_mapping(attributes, synch=False, **kwargs):
     retval.update(kwargs)
     return retval
 
+def node_indexer(nodes):
+    """
+    Creates a function that maps nodes to their index in ``nodes``.
+
+    Nodes are looked up by name, in O(1), regardless of the size of the node
+    descriptions; either the name or the node description can be specified.
+    ``None`` is returned for unknown nodes.
+
+    :param nodes: The list of nodes to be indexed.
+    """
+    by_name = dict((n['name'], i) for i, n in enumerate(nodes))
+    def index_of(node):
+        return by_name.get(node if isinstance(node, str) else node['name'])
+    return index_of
+
+def resolve_edge(spec, lookup):
+    """
+    Creates an :class:`Edge` from its specification in the ``dependencies``
+    section of an infrastructure description.
+
+    The endpoints of the edge may be node names, or node descriptions (e.g.
+    YAML anchors); either way, they are resolved by name. Thus, the edge always
+    references the node descriptions of the infrastructure, even if the
+    description has been built programmatically, or parsed from JSON.
+
+    :param spec: The specification of the edge (see :func:`altcall`).
+    :param lookup: ``lookup(name)`` returns the node description, or
+        :data:`None` for unknown nodes (e.g. ``node_lookup.get``).
+    :raises SchemaError: if the specification is invalid, or it references an
+        unknown node.
+    """
+    connection = spec.get('connection') if type(spec) is dict else spec
+    if not isinstance(connection, (list, tuple)) or len(connection) != 2:
+        raise SchemaError('A dependency must connect two nodes', spec)
+    resolved = list()
+    for ref in connection:
+        name = ref.get('name') if isinstance(ref, dict) else ref
+        node = lookup(name) if isinstance(name, str) else None
+        if node is None:
+            raise SchemaError('Unknown node in dependency', name)
+        resolved.append(node)
+    if type(spec) is dict:
+        spec = dict(spec, connection=resolved)
+        return Edge(**spec)
+    return Edge(resolved)
+
+_NO_EXTRAS = types.MappingProxyType(dict())
+
 class Edge(object):
     """Represents an edge of the infrastructure graph.
 
-    :param connection: The two nodes connected.
+    Edges are numerous in large infrastructures, so they have no per-instance
+    :attr:`__dict__`; arbitrary information is kept in :attr:`extras`, but is
+    also accessible as attributes for convenience.
+
+    :param connection: The two nodes connected: the dependent, then the
+        dependee. See :func:`resolve_edge` about node references.
     :type connection: Pair (:class:`list` or :func:`tuple` of two nodes).
     :param mappings: The attribute mappings between the nodes.
     :param ** kwargs: Arbitrary information that can be used by mediating
         services (InfraProcessor, node Resolver, etc.)
     """
+    __slots__ = ('__dependent', '__dependee', '__mappings',
+                 '__attribute_mappings', '__extras')
+
     def __init__(self, connection, mappings=[], **kwargs):
         self.__dependent, self.__dependee = connection
         self.__mappings = mappings
-        self.__dict__.update(kwargs)
+        self.__attribute_mappings = None
+        # Most edges have no extras; they share _NO_EXTRAS
+        self.__extras = kwargs or None
     @property
     def dependent(self):
         """The node that depends on the other."""
@@ -138,6 +209,33 @@ class Edge(object):
     def mappings(self):
         """Attribute mappings between vertices."""
         return self.__mappings
+    @property
+    def attribute_mappings(self):
+        """Attribute mappings between vertices, normalized with
+        :func:`create_mapping`.
+
+        Calculated only once; the same list is used in the ``mappings`` of
+        both nodes, so it must not be modified.
+        """
+        if self.__attribute_mappings is None:
+            self.__attribute_mappings = \
+                [altcall(create_mapping, m) for m in self.__mappings]
+        return self.__attribute_mappings
+    @property
+    def extras(self):
+        """Arbitrary information specified for the edge (mapping).
+
+        Not copied, so it must not be modified.
+        """
+        return self.__extras or _NO_EXTRAS
+
+    def __getattr__(self, name):
+        # Only called if regular lookup fails. Private names are not looked
+        # up, which also protects against recursion while unpickling.
+        if not name.startswith('_') and self.__extras and \
+                name in self.__extras:
+            return self.__extras[name]
+        raise AttributeError(name)
 
 class TopoLevel(list):
     """Represents a topological level of the dependency graph.
@@ -186,13 +284,58 @@ class TopologicalOrder(list):
         """
         return '\n'.join(str(i) for i in self)
 
+def _swap_remove(items, i):
+    """Removes ``items[i]`` in O(1), moving the last item into its place.
+
+    :returns: The moved item, or :data:`None` if ``items[i]`` was the last.
+    """
+    last = items.pop()
+    if i < len(items):
+        items[i] = last
+        return last
+
+class LazyNodeLookup(dict):
+    """Node lookup table of a lazy :class:`StaticDescription`.
+
+    Node descriptions are prepared upon being retrieved; see
+    :meth:`StaticDescription.get_node`. Only indexing, :meth:`get`,
+    :meth:`values` and :meth:`items` prepare them; other :class:`dict`
+    methods and functions (``dict(lookup)``, ``copy()``, ``pop()``,
+    ``setdefault()``, etc.) see the raw node descriptions. Use
+    :meth:`StaticDescription.prepare_all` first where that matters.
+
+    Pickling stores the raw node descriptions, without preparing them.
+    """
+    def __init__(self, static_description, nodes):
+        dict.__init__(self, nodes)
+        self.static_description = static_description
+
+    def __reduce__(self):
+        # Pickle walks items() of dict subclasses, which would prepare nodes
+        # while the description (and its set of unprepared nodes) is being
+        # pickled.
+        return LazyNodeLookup, (self.static_description,
+                                dict(dict.items(self)))
+
+    def __getitem__(self, name):
+        return self.static_description.get_node(name)
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def values(self):
+        return [self[name] for name in self]
+
+    def items(self):
+        return [(name, self[name]) for name in self]
+
 class StaticDescription(object):
     """Represents a statical description of an infrastructure.
 
     :param infrastructure_description: The description of the infrastructure.
-        This can either be a YAML string, which will be parsed, or an already
-        parsed data structure (:class:`dict`). See :ref:`infradescription` for
-        details.
+        This can either be a YAML string, which will be parsed (see
+        :mod:`occo.compiler.loader`), or an already parsed data structure
+        (:class:`dict`). See :ref:`infradescription` for details.
 
     :raises SchemaError: if the schema is invalid.
     :raises KeyError: if the schema is invalid, until :meth:`schema_check` is
@@ -206,19 +349,51 @@ class StaticDescription(object):
     :var name: The name of the infrastructure
     :var nodes: Unordered list of all nodes.
     :var node_lookup: Lookup table for nodes based on their names.
-    :var dependencies: Unordered list of edges.
+
+        The lists of attribute mappings in the ``mappings`` of the node
+        descriptions are shared by the two nodes connected by each edge (see
+        :attr:`Edge.attribute_mappings`), to save memory. They must not be
+        modified in place; copy them, or replace them in the ``mappings`` of
+        the node.
+    :var dependencies: Unordered list of edges, as specified. Nodes may be
+        referenced by name (``connection: [D, C]``) or by YAML anchors.
+    :var edges: The :class:`Edge` objects, referencing the node descriptions in
+        :attr:`nodes`; see :func:`resolve_edge`.
     :var topological_order: The topological ordering of the graph; see
         :class:`TopologicalOrder` and method :meth:`topo_order`.
+    :var compile_stats: Timing of the compilation phases and the shape of the
+        graph; see :class:`~occo.compiler.instrumentation.CompileStats`.
+
+    :param bool lazy: Defer the topological ordering and the preparation of
+        nodes (:meth:`prepare_nodes`) until they are first accessed. Node
+        descriptions are prepared one by one, as they are looked up in
+        ``node_lookup`` (or through :meth:`get_node`). Accessing
+        ``topological_order`` prepares all nodes. Errors in the derived data
+        (e.g. cycles) are raised upon access, or by :meth:`validate`.
+    :param bool layered_variables: Instead of merging the infrastructure
+        variables into each node description (copying them), make the
+        ``variables`` of nodes a :class:`~occo.compiler.variables.VariableView`
+        over the shared infrastructure variables and the node's own variables.
+        Use :meth:`~occo.compiler.variables.VariableView.materialize` where a
+        plain :class:`dict` is needed (e.g. for serialization).
+    :param bool profile: Profile the compilation phases with :mod:`cProfile`;
+        see :class:`~occo.compiler.instrumentation.CompileStats`.
 
     .. todo:: The ``infra_id`` may be predefined?
     """
-    def __init__(self, infrastructure_description, infra_id=None):
+    def __init__(self, infrastructure_description, infra_id=None, lazy=False,
+                 layered_variables=False, profile=False):
+        self.compile_stats = stats = CompileStats(profile)
+
         # Deserialize description if necessary
-        desc = infrastructure_description \
-            if type(infrastructure_description) is dict \
-            else yaml.load(infrastructure_description,Loader=yaml.Loader)
+        if type(infrastructure_description) is dict:
+            desc = infrastructure_description
+        else:
+            with stats.phase('parse'):
+                desc = loader.load(infrastructure_description)
 
-        StaticDescription.schema_check(desc)
+        with stats.phase('schema_check'):
+            StaticDescription.schema_check(desc)
 
         if infra_id:
             self.infra_id = infra_id
@@ -228,15 +403,230 @@ class StaticDescription(object):
         self.user_id = desc.get('user_id',"undefined")
         self.nodes = desc['nodes']
 
-        self.node_lookup = dict((n['name'], n) for n in self.nodes)
-        self.dependencies = desc.get('dependencies', [])
-        self.edges = [altcall(Edge, e) for e in self.dependencies]
-        self.topological_order = \
-            StaticDescription.topo_order(self.nodes, self.edges)
-        self.prepare_nodes(desc)
+        with stats.phase('edges'):
+            self.node_lookup = dict((n['name'], n) for n in self.nodes)
+            if len(self.node_lookup) != len(self.nodes):
+                seen = set()
+                for n in self.nodes:
+                    if n['name'] in seen:
+                        raise SchemaError('Duplicate node', n['name'])
+                    seen.add(n['name'])
+            self.dependencies = desc.get('dependencies', [])
+            self.edges = [resolve_edge(e, self.node_lookup.get)
+                          for e in self.dependencies]
+            self.index_edges()
+        stats.nodes, stats.edges = len(self.nodes), len(self.edges)
+        self.lazy = lazy
+        self.layered_variables = layered_variables
+        if lazy:
+            self._unprepared = set(self.node_lookup)
+            self.node_lookup = LazyNodeLookup(self, self.node_lookup)
+        else:
+            self._unprepared = set()
+            self.topological_order = self._order
+            with stats.phase('prepare_nodes'):
+                self.prepare_nodes(desc)
         self.variables = desc.get('variables', dict())
         self.suspended = desc.get('init_suspended', False)
         self.userinfo_strategy = desc.get('userinfo_strategy')
+        stats.finished()
+
+    #: Infrastructure level attributes set by the constructor, besides the
+    #: graph. They are carried over by :meth:`_assemble` (and serialization),
+    #: so new ones must be listed here.
+    INFRA_ATTRIBUTES = ('infra_id', 'name', 'user_id', 'variables',
+                        'suspended', 'userinfo_strategy', 'layered_variables')
+
+    @classmethod
+    def _assemble(cls, attributes, nodes, connections, order=None):
+        """
+        Builds an eager description from parts of an already compiled one,
+        without schema checking.
+
+        :param attributes: A mapping containing the
+            :data:`INFRA_ATTRIBUTES`.
+        :param list nodes: The node descriptions, otherwise prepared; their
+            ``mappings`` are rebuilt from the edges.
+        :param connections: ``(dependent, dependee, mappings, extras)``
+            tuples; the endpoints are items of ``nodes``.
+        :param order: The topological order (list of lists of nodes), if
+            known; otherwise it is calculated.
+        """
+        sd = cls.__new__(cls)
+        sd.compile_stats = stats = CompileStats()
+        for attr in cls.INFRA_ATTRIBUTES:
+            setattr(sd, attr, attributes[attr])
+        sd.lazy = False
+        sd._unprepared = set()
+        with stats.phase('edges'):
+            sd.nodes = nodes
+            sd.node_lookup = dict((n['name'], n) for n in nodes)
+            sd.dependencies, sd.edges = list(), list()
+            for dependent, dependee, mappings, extras in connections:
+                connection, extras = [dependent, dependee], extras or dict()
+                if mappings or extras:
+                    spec = dict(connection=connection, mappings=mappings)
+                    spec.update(extras)
+                else:
+                    spec = connection
+                sd.dependencies.append(spec)
+                sd.edges.append(Edge(connection, mappings, **extras))
+            sd.index_edges()
+        stats.nodes, stats.edges = len(sd.nodes), len(sd.edges)
+        if order is not None:
+            sd._order = TopologicalOrder(order)
+            stats.set_order(order)
+        sd.topological_order = sd._order
+        with stats.phase('prepare_nodes'):
+            for node in nodes:
+                node['mappings'] = sd.merge_mappings(node)
+        stats.finished()
+        return sd
+
+    @functools.cached_property
+    def _order(self):
+        # The topological order, without preparing the nodes
+        with self.compile_stats.phase('topo_order'):
+            order = StaticDescription.topo_order(self.nodes, self.edges)
+        self.compile_stats.set_order(order)
+        return order
+
+    @functools.cached_property
+    def _level(self):
+        # Topological level of each node, by name
+        return dict((n['name'], i)
+                    for i, level in enumerate(self._order)
+                    for n in level)
+
+    # Position indexes maintained by apply_delta
+
+    @functools.cached_property
+    def _node_index(self):
+        # Position of each node in nodes, by name
+        return dict((n['name'], i) for i, n in enumerate(self.nodes))
+
+    @functools.cached_property
+    def _edge_index(self):
+        # Position of each edge in edges (and dependencies), by identity
+        return dict((id(e), i) for i, e in enumerate(self.edges))
+
+    @functools.cached_property
+    def _level_index(self):
+        # Position of each node in its topological level, by name
+        return dict((n['name'], i)
+                    for level in self._order for i, n in enumerate(level))
+
+    def __getstate__(self):
+        # The position indexes are rebuilt on demand; _edge_index is keyed by
+        # object identity.
+        state = dict(self.__dict__)
+        for attr in ('_node_index', '_edge_index', '_level_index'):
+            state.pop(attr, None)
+        return state
+
+    @functools.cached_property
+    def synch_index(self):
+        """The synchronized attribute mappings of the infrastructure, indexed
+        by node and by attribute; see :class:`~occo.compiler.synch.SynchIndex`.
+
+        Built upon first access; rebuilt after :meth:`apply_delta`.
+        """
+        return SynchIndex(self.edges)
+
+    @functools.cached_property
+    def topological_order(self):
+        # Only reached in lazy mode; otherwise it is set upon construction.
+        self.prepare_all()
+        return self._order
+
+    def validate(self):
+        """Calculates all derived data that may be invalid, so schema errors
+        are raised. Only relevant in lazy mode.
+
+        :raises SchemaError: if the graph contains a cycle.
+        """
+        self._order
+
+    def get_node(self, name):
+        """Returns the prepared description of a node.
+
+        :param str name: The name of the node.
+        :raises KeyError: if there is no such node.
+        """
+        node = dict.__getitem__(self.node_lookup, name)
+        if name in self._unprepared:
+            self.prepare_node(node, self._inherited())
+            self._unprepared.discard(name)
+        return node
+
+    def prepare_all(self):
+        """Prepares all nodes not prepared yet. Only relevant in lazy mode."""
+        if self._unprepared:
+            desc = self._inherited()
+            with self.compile_stats.phase('prepare_nodes'):
+                for n in self.nodes:
+                    if n['name'] in self._unprepared:
+                        self.prepare_node(n, desc)
+            self._unprepared.clear()
+
+    def _inherited(self):
+        # The information nodes inherit from the infrastructure description
+        return dict(infra_name=self.name, user_id=self.user_id,
+                    variables=self.variables)
+
+    @classmethod
+    def load_all(cls, stream):
+        """Compiles all infrastructure descriptions in a multi-document YAML
+        stream.
+
+        The stream is parsed in a single pass; each document is compiled as
+        soon as it has been parsed.
+
+        :param stream: The YAML stream (:class:`str` or file-like object).
+        :returns: The list of compiled descriptions, in the order of the
+            documents.
+        :raises SchemaError: if any of the descriptions is invalid.
+        """
+        return [cls(desc) for desc in loader.load_all(stream)]
+
+    def dumps(self):
+        """Serializes the compiled description; see
+        :mod:`occo.compiler.serialization`.
+
+        :rtype: :class:`bytes`
+        """
+        from .serialization import dumps
+        return dumps(self)
+
+    @staticmethod
+    def loads(buf):
+        """Rebuilds a compiled description serialized by :meth:`dumps`,
+        without schema checking and topological ordering.
+
+        :param buf: :class:`bytes` or any other object supporting the buffer
+            protocol (e.g. a memory mapped file).
+        """
+        from .serialization import loads
+        return loads(buf)
+
+    def deployment_plan(self, counts=None, max_parallel=None):
+        """Plans the deployment of the infrastructure, taking the scaling of
+        nodes into account; see :class:`~occo.compiler.plan.DeploymentPlan`.
+
+        :rtype: :class:`~occo.compiler.plan.DeploymentPlan`
+        """
+        from .plan import DeploymentPlan
+        return DeploymentPlan(self, counts, max_parallel)
+
+    def diff(self, other):
+        """Compares this description to an updated version of it; see
+        :mod:`occo.compiler.diff`.
+
+        :param other: The updated :class:`StaticDescription`.
+        :rtype: :class:`~occo.compiler.diff.DescriptionDiff`
+        """
+        from .diff import diff
+        return diff(self, other)
 
     def prepare_nodes(self, desc):
         """
@@ -252,37 +642,443 @@ class StaticDescription(object):
 
         The resulting node description should be completely self-contained.
 
+        In lazy mode, the nodes are not prepared again upon access.
         """
 
         for i in self.nodes:
-            i['infra_id'] = self.infra_id # Foreign key, if you like
-            i['infra_name'] = desc['infra_name']
+            self.prepare_node(i, desc)
+        self._unprepared.clear()
+
+    def prepare_node(self, node, desc):
+        """
+        Sets up a single node description; see :meth:`prepare_nodes`.
+        """
+        node['infra_id'] = self.infra_id # Foreign key, if you like
+        node['infra_name'] = desc['infra_name']
+
+        # Variables inherited from the infrastructure
+        # Variables specified in the node description are preferred
+        if self.layered_variables:
+            node['variables'] = VariableView(desc.get('variables'),
+                                             node.get('variables'))
+        else:
+            node['variables'] = util.dict_merge(desc.get('variables', dict()),
+                                                node.get('variables', dict()))
+
+        # Copying the user_id into all nodes' descriptions is an
+        # optimization, so IP::CreateNode does not need to resolve the
+        # containing infrastructure's static description.
+        node['user_id'] = desc['user_id']
+
+        # Setup attribute mappings based on infrastructure description; the
+        # lists of mappings are shared with the nodes on the other end
+        node['mappings'] = self.merge_mappings(node)
+
+    def index_edges(self):
+        """
+        Builds the per-node edge indexes used by :meth:`inbound_edges` and
+        :meth:`outbound_edges`.
+
+        The indexes are keyed by node name, and contain the edges in the order
+        they were specified.
+        """
+        inbound, outbound = dict(), dict()
+        for e in self.edges:
+            inbound.setdefault(e.dependent['name'], []).append(e)
+            outbound.setdefault(e.dependee['name'], []).append(e)
+        self._inbound = dict((k, tuple(v)) for k, v in inbound.items())
+        self._outbound = dict((k, tuple(v)) for k, v in outbound.items())
+
+    def inbound_edges(self, name):
+        """
+        The edges through which the given node depends on other nodes.
 
-            # Variables inherited from the infrastructure
-            # Variables specified in the node description are preferred
-            i['variables'] = util.dict_merge(desc.get('variables', dict()),
-                                             i.get('variables', dict()))
+        :param str name: The name of the node.
+        :rtype: :class:`tuple` of :class:`Edge` objects
+        """
+        return self._inbound.get(name, ())
 
-            # Copying the user_id into all nodes' descriptions is an
-            # optimization, so IP::CreateNode does not need to resolve the
-            # containing infrastructure's static description.
-            i['user_id'] = desc['user_id']
+    def outbound_edges(self, name):
+        """
+        The edges through which other nodes depend on the given node.
 
-            # Setup attribute mappings based on infrastructure description
-            i['mappings'] = self.merge_mappings(i)
+        :param str name: The name of the node.
+        :rtype: :class:`tuple` of :class:`Edge` objects
+        """
+        return self._outbound.get(name, ())
 
     def merge_mappings(self, node):
-        inbound, outbound = dict(), dict()
-        for e in self.edges:
-            if e.dependee is node:
-                dest, key = outbound, e.dependent['name']
-            elif e.dependent is node:
-                dest, key = inbound, e.dependee['name']
+        """
+        Collects the attribute mappings of all edges connected to the node.
+
+        Uses the edge indexes, so the cost is proportional to the degree of the
+        node. The lists of mappings are shared with the nodes at the other
+        end of the edges (see :attr:`Edge.attribute_mappings`).
+
+        :returns: ``dict(inbound=..., outbound=...)``, both mapping the name of
+            the node on the other end of the edge to the list of mappings.
+        """
+        inbound = dict((e.dependee['name'], e.attribute_mappings)
+                       for e in self.inbound_edges(node['name']))
+        outbound = dict((e.dependent['name'], e.attribute_mappings)
+                        for e in self.outbound_edges(node['name']))
+        return dict(inbound=inbound, outbound=outbound)
+
+    def subgraph(self, node_names, direction='both'):
+        """
+        Compiles the part of the infrastructure related to the given nodes.
+
+        The nodes are collected through the edge indexes, so the cost is
+        proportional to the size of the subgraph, not that of the whole
+        graph. In lazy mode, only the nodes of the subgraph are prepared.
+
+        :param node_names: The names of the selected nodes.
+        :param str direction: ``'upstream'``: the selected nodes and the nodes
+            they depend on, transitively; ``'downstream'``: the selected nodes
+            and the nodes depending on them, transitively; ``'both'``: the
+            union of the two.
+        :returns: A new :class:`StaticDescription` of the subgraph, with its
+            own topological order. Its node descriptions are shallow copies of
+            the ones in this description, with ``mappings`` trimmed to the
+            edges within the subgraph. Nodes are listed in the order they are
+            reached, starting with the selected ones.
+        :raises KeyError: if a node does not exist.
+        :raises ValueError: if ``direction`` is invalid.
+        """
+        if direction not in ('upstream', 'downstream', 'both'):
+            raise ValueError('Invalid direction', direction)
+        seeds = list()
+        for name in node_names:
+            if name not in self.node_lookup:
+                raise KeyError('Unknown node', name)
+            if name not in seeds:
+                seeds.append(name)
+
+        def closure(edges_of, endpoint):
+            reached, found = set(seeds), list(seeds)
+            for name in found:
+                for e in edges_of(name):
+                    other = endpoint(e)['name']
+                    if other not in reached:
+                        reached.add(other)
+                        found.append(other)
+            return found
+
+        names = list()
+        if direction != 'downstream':
+            names = closure(self.inbound_edges, lambda e: e.dependee)
+        if direction != 'upstream':
+            selected = set(names)
+            names.extend(
+                name for name in closure(self.outbound_edges,
+                                         lambda e: e.dependent)
+                if name not in selected)
+
+        nodes = [dict(self.get_node(name)) for name in names]
+        lookup = dict((n['name'], n) for n in nodes)
+        connections = [(node, lookup[e.dependee['name']], e.mappings, e.extras)
+                       for node in nodes
+                       for e in self.inbound_edges(node['name'])
+                       if e.dependee['name'] in lookup]
+        attributes = dict((attr, getattr(self, attr))
+                          for attr in self.INFRA_ATTRIBUTES)
+        return StaticDescription._assemble(attributes, nodes, connections)
+
+    def apply_delta(self, added_nodes=[], removed_nodes=[],
+                    added_edges=[], removed_edges=[]):
+        """
+        Updates the compiled description incrementally.
+
+        Only the affected region of the graph is recalculated: the mappings of
+        nodes connected to added or removed edges, and the topological levels
+        of nodes downstream of them. The change is atomic: if it is invalid,
+        the description is left intact.
+
+        Removing a node implicitly removes all edges connected to it.
+
+        The cost is proportional to the size of the change and of the region
+        downstream of it, not to the size of the graph. The :attr:`nodes` and
+        :attr:`dependencies` lists (those of the infrastructure description,
+        if it has been passed parsed) are updated in place; their order is not
+        kept. As in a fresh compilation from the updated :attr:`dependencies`,
+        the mappings of the last of parallel edges apply.
+
+        :param added_nodes: New node descriptions.
+        :param removed_nodes: Names of nodes to be removed.
+        :param added_edges: New dependencies, specified as in the
+            ``dependencies`` section of the infrastructure description. The
+            endpoints may be node descriptions or node names.
+        :param removed_edges: :class:`Edge` objects, or pairs of node names
+            ``(dependent, dependee)``; the latter removes all edges between
+            the two nodes.
+
+        :returns: ``dict(levels=..., mappings=...)``: the sets of the names of
+            (remaining) nodes whose topological level or mappings have changed,
+            respectively. Added nodes are included in both.
+
+        :raises SchemaError: if a new node or edge is invalid, or the change
+            would introduce a cycle.
+        :raises KeyError: if a node or edge to be removed does not exist.
+        """
+        removed_names = set()
+        for name in removed_nodes:
+            if name not in self.node_lookup:
+                raise KeyError('Unknown node', name)
+            removed_names.add(name)
+
+        new_nodes = dict()
+        for i, node in enumerate(added_nodes):
+            # Checked as in a fresh compilation
+            for msg, _ in _iter_node_errors(node, 'added_nodes[%d]' % i):
+                raise SchemaError(msg)
+            name = node['name']
+            if name in new_nodes or \
+                    (name in self.node_lookup and name not in removed_names):
+                raise SchemaError('Duplicate node', name)
+            new_nodes[name] = node
+
+        def lookup(name):
+            if name in new_nodes:
+                return new_nodes[name]
+            if name in self.node_lookup and name not in removed_names:
+                return dict.__getitem__(self.node_lookup, name)
+
+        new_edges = [(spec, resolve_edge(spec, lookup))
+                     for spec in added_edges]
+
+        dropped = dict()
+        for spec in removed_edges:
+            if isinstance(spec, Edge):
+                if spec not in self.inbound_edges(spec.dependent['name']):
+                    raise KeyError('Unknown edge', spec)
+                dropped[id(spec)] = spec
+            else:
+                dependent, dependee = spec
+                found = [e for e in self.inbound_edges(dependent)
+                         if e.dependee['name'] == dependee]
+                if not found:
+                    raise KeyError('Unknown edge', spec)
+                dropped.update((id(e), e) for e in found)
+        for name in removed_names:
+            dropped.update((id(e), e) for e in self.inbound_edges(name))
+            dropped.update((id(e), e) for e in self.outbound_edges(name))
+
+        # Update the edge indexes, remembering the previous state of the
+        # touched entries for rollback. Each entry is rebuilt only once.
+        changes = dict()
+        def change(index, name, slot, e):
+            key = (id(index), name)
+            if key not in changes:
+                changes[key] = (index, name, list(), list())
+            changes[key][slot].append(e)
+        for e in dropped.values():
+            change(self._inbound, e.dependent['name'], 2, e)
+            change(self._outbound, e.dependee['name'], 2, e)
+        for _, e in new_edges:
+            change(self._inbound, e.dependent['name'], 3, e)
+            change(self._outbound, e.dependee['name'], 3, e)
+        undo = list()
+        for index, name, remove, add in changes.values():
+            items = index.get(name, ())
+            undo.append((index, name, items))
+            if len(remove) < 8:
+                # Edges have no __eq__, so index() compares identities
+                for e in remove:
+                    i = items.index(e)
+                    items = items[:i] + items[i + 1:]
+            elif remove:
+                remove = set(map(id, remove))
+                items = tuple(e for e in items if id(e) not in remove)
+            items += tuple(add)
+            if items:
+                index[name] = items
             else:
+                index.pop(name, None)
+
+        mappings_changed = set(new_nodes)
+        for e in list(dropped.values()) + [e for _, e in new_edges]:
+            mappings_changed.add(e.dependent['name'])
+            mappings_changed.add(e.dependee['name'])
+        mappings_changed -= removed_names - set(new_nodes)
+        # The level of a dependee does not depend on its dependents
+        level_seeds = set(new_nodes)
+        level_seeds.update(e.dependent['name'] for e in dropped.values())
+        level_seeds.update(e.dependent['name'] for _, e in new_edges)
+        level_seeds -= removed_names - set(new_nodes)
+
+        try:
+            levels = self._relevel(level_seeds)
+        except SchemaError:
+            for index, name, items in undo:
+                if items:
+                    index[name] = items
+                else:
+                    index.pop(name, None)
+            raise
+
+        # Commit. The lists are unordered, so items are removed by moving the
+        # last item into their place, located through the position indexes;
+        # only the touched entries are processed.
+        if not isinstance(self.dependencies, list):
+            self.dependencies = list(self.dependencies)
+        node_index, edge_index = self._node_index, self._edge_index
+        level_index = self._level_index
+
+        def unlevel(name):
+            level, i = self._level.pop(name), level_index.pop(name)
+            moved = _swap_remove(self._order[level], i)
+            if moved is not None:
+                level_index[moved['name']] = i
+
+        moved_edges = dict()
+        for e in dropped.values():
+            i = edge_index.pop(id(e))
+            _swap_remove(self.dependencies, i)
+            moved = _swap_remove(self.edges, i)
+            if moved is not None:
+                edge_index[id(moved)] = i
+                moved_edges[id(moved)] = moved
+        for name in removed_names:
+            unlevel(name)
+            dict.pop(self.node_lookup, name)
+            self._unprepared.discard(name)
+            i = node_index.pop(name)
+            moved = _swap_remove(self.nodes, i)
+            if moved is not None:
+                node_index[moved['name']] = i
+        for name, node in new_nodes.items():
+            self.node_lookup[name] = node
+            node_index[name] = len(self.nodes)
+            self.nodes.append(node)
+        for spec, e in new_edges:
+            edge_index[id(e)] = len(self.edges)
+            self.dependencies.append(spec)
+            self.edges.append(e)
+        # The edge indexes are kept in the order of the edges (and
+        # dependencies), so the last of parallel edges is the same as in a
+        # fresh compilation. Only the entries of moved edges are out of order.
+        moved_edges = [e for e in moved_edges.values()
+                       if id(e) in edge_index]
+        resort = dict()
+        for e in moved_edges:
+            for index, name in ((self._inbound, e.dependent['name']),
+                                (self._outbound, e.dependee['name'])):
+                resort[(id(index), name)] = index, name
+        for index, name in resort.values():
+            index[name] = tuple(sorted(index[name],
+                                       key=lambda e: edge_index[id(e)]))
+
+        levels_changed = set()
+        for name, level in levels.items():
+            if self._level.get(name) == level:
+                continue
+            levels_changed.add(name)
+            if name in self._level:
+                unlevel(name)
+            while len(self._order) <= level:
+                self._order.add_level(TopoLevel())
+            level_index[name] = len(self._order[level])
+            self._order[level].append(dict.__getitem__(self.node_lookup, name))
+            self._level[name] = level
+        # Only trailing levels can become empty: each node on level k has a
+        # dependee on level k-1.
+        while self._order and not self._order[-1]:
+            self._order.pop()
+
+        desc = self._inherited()
+        for name in new_nodes:
+            if name not in self._unprepared:
+                self.prepare_node(new_nodes[name], desc)
+        # Only the mappings between the endpoints of the changed edges are
+        # updated, so the cost does not depend on the degree of the nodes.
+        pairs = set((e.dependent['name'], e.dependee['name'])
+                    for e in list(dropped.values()) + [e for _, e in new_edges])
+        def parallel(dependent, dependee):
+            inbound, outbound = \
+                self.inbound_edges(dependent), self.outbound_edges(dependee)
+            return [e for e in inbound if e.dependee['name'] == dependee] \
+                if len(inbound) <= len(outbound) else \
+                [e for e in outbound if e.dependent['name'] == dependent]
+        for dependent, dependee in pairs:
+            edges = parallel(dependent, dependee)
+            for name, direction, other in ((dependent, 'inbound', dependee),
+                                           (dependee, 'outbound', dependent)):
+                if name in new_nodes or name not in mappings_changed \
+                        or name in self._unprepared:
+                    # New nodes are prepared above; unprepared ones will be
+                    # prepared upon access, using the updated edges
+                    continue
+                mappings = dict.__getitem__(self.node_lookup, name) \
+                    ['mappings'][direction]
+                if edges:
+                    # As in merge_mappings, the last of parallel edges wins
+                    mappings[other] = edges[-1].attribute_mappings
+                else:
+                    mappings.pop(other, None)
+        # Moving an edge may change which of its parallel edges is the last
+        moved_pairs = set((e.dependent['name'], e.dependee['name'])
+                          for e in moved_edges)
+        for dependent, dependee in moved_pairs - pairs:
+            edges = parallel(dependent, dependee)
+            if len(edges) < 2:
                 continue
+            for name, direction, other in ((dependent, 'inbound', dependee),
+                                           (dependee, 'outbound', dependent)):
+                if name in self._unprepared:
+                    continue
+                mappings = dict.__getitem__(self.node_lookup, name) \
+                    ['mappings'][direction]
+                if mappings.get(other) is not edges[-1].attribute_mappings:
+                    mappings[other] = edges[-1].attribute_mappings
+                    mappings_changed.add(name)
+
+        self.__dict__.pop('synch_index', None)
+        return dict(levels=levels_changed, mappings=mappings_changed)
+
+    def _relevel(self, seeds):
+        """
+        Calculates the topological level of the seed nodes and all nodes
+        downstream of them, based on the edge indexes. The levels of other
+        nodes are taken from ``self._level``, as they cannot change.
 
-            dest[key] = [altcall(create_mapping, m) for m in e.mappings]
-        return dict(inbound=inbound, outbound=outbound)
+        :returns: The new levels of the affected nodes (:class:`dict`).
+        :raises ~occo.compiler.cycles.CycleError: if there is a cycle among
+            the affected nodes.
+        """
+        affected, stack = set(seeds), list(seeds)
+        while stack:
+            for e in self.outbound_edges(stack.pop()):
+                name = e.dependent['name']
+                if name not in affected:
+                    affected.add(name)
+                    stack.append(name)
+
+        indegree = dict((name, sum(1 for e in self.inbound_edges(name)
+                                   if e.dependee['name'] in affected))
+                        for name in affected)
+        ready = [name for name, d in indegree.items() if not d]
+        levels = dict()
+        while ready:
+            name = ready.pop()
+            levels[name] = max(
+                [levels.get(e.dependee['name'],
+                            self._level.get(e.dependee['name'])) + 1
+                 for e in self.inbound_edges(name)] or [0])
+            for e in self.outbound_edges(name):
+                dependent = e.dependent['name']
+                indegree[dependent] -= 1
+                if not indegree[dependent]:
+                    ready.append(dependent)
+
+        if len(levels) < len(affected):
+            remaining = affected.difference(levels)
+            raise cycles.cycle_error(
+                sorted(remaining),
+                lambda name: [e.dependee['name']
+                              for e in self.inbound_edges(name)
+                              if e.dependee['name'] in remaining],
+                lambda name: name)
+        return levels
 
     @staticmethod
     def schema_check(infrastructure_description):
@@ -296,7 +1092,7 @@ class StaticDescription(object):
         try:
             SchemaChecker.check_infra_desc(infrastructure_description)
         except SchemaError as e:
-            print((e.msg))
+            log.error(e.msg)
             raise SchemaError(e.msg)
 
     @staticmethod
@@ -304,42 +1100,95 @@ class StaticDescription(object):
         """Creates a topological ordering based on the list of nodes and
         the list of edges.
 
-        .. todo:: Using generators instead of lists  (``(...for...)`` instead
-            ``[...for...]``) in the generating phase should be more
-            memory-efficient. Should try it and use it if it works.
+        This is Kahn's algorithm, running in O(N+E). Nodes are indexed by
+        their position in ``all_nodes``; edge endpoints are resolved by name
+        (see :func:`node_indexer`), so no node dicts are compared during the
+        ordering itself.
+
+        The level of each node is the length of the longest path leading to it
+        from an independent node. Levels are filled in the original order of
+        ``all_nodes``.
+
+        If some nodes cannot be ordered, the strongly connected components
+        among them are searched for cycles (see :mod:`occo.compiler.cycles`),
+        which is also O(N+E).
+
+        :raises ~occo.compiler.cycles.CycleError: if there is a cycle in the
+            graph.
+        :raises SchemaError: if a node depends on a node missing from
+            ``all_nodes``. The context of the exception is the list of the
+            names of such nodes.
         """
 
-        # Create representation suitable for topological ordering
-        ## List of nodes
-        nodes = all_nodes
-        ## Convert pairs to Edges
-        edges = all_edges
+        nodes = list(all_nodes)
+        index_of = node_indexer(nodes)
+
+        # Integer-indexed adjacency in compressed sparse row form: the
+        # dependents of node i are targets[offsets[i]:offsets[i+1]]. Also, the
+        # number of unsatisfied dependencies of each node.
+        count = len(nodes)
+        indegree = array.array('l', [0]) * count
+        sources, targets = array.array('l'), array.array('l')
+        dangling = list()
+        for e in all_edges:
+            dependent = index_of(e.dependent)
+            if dependent is None:
+                # Nothing to order
+                continue
+            indegree[dependent] += 1
+            dependee = index_of(e.dependee)
+            if dependee is not None:
+                sources.append(dependee)
+                targets.append(dependent)
+            else:
+                # The dependency can never be satisfied
+                dangling.append(dependent)
+        offsets = array.array('l', [0]) * (count + 1)
+        for i in sources:
+            offsets[i + 1] += 1
+        for i in range(count):
+            offsets[i + 1] += offsets[i]
+        dependents = array.array('l', [0]) * len(targets)
+        cursor = offsets[:-1]
+        for i, j in zip(sources, targets):
+            dependents[cursor[i]] = j
+            cursor[i] += 1
+        del sources, targets, cursor
+
+        level_of = array.array('l', [-1]) * count
+        current = [i for i, d in enumerate(indegree) if not d]
+        depth = 0
+        while current:
+            upcoming = []
+            for i in current:
+                level_of[i] = depth
+                for j in dependents[offsets[i]:offsets[i + 1]]:
+                    indegree[j] -= 1
+                    if not indegree[j]:
+                        upcoming.append(j)
+            current = upcoming
+            depth += 1
+
+        # if some nodes could not be placed, there must be a circle among them
+        # through the edges, or they depend on an unknown node
+        remaining = [i for i, l in enumerate(level_of) if l < 0]
+        if remaining:
+            dependees = dict((i, []) for i in remaining)
+            for i in remaining:
+                for j in dependents[offsets[i]:offsets[i + 1]]:
+                    dependees[j].append(i)
+            error = cycles.cycle_error(remaining, dependees.__getitem__,
+                                       lambda i: nodes[i]['name'])
+            if error:
+                raise error
+            raise SchemaError("Dependency on unknown node.",
+                              sorted(set(nodes[i]['name'] for i in dangling)))
+
+        levels = [TopoLevel() for _ in range(depth)]
+        for n, l in zip(nodes, level_of):
+            levels[l].append(n)
 
-        # Return value:
         topo_order = TopologicalOrder()
-
-        # Move all nodes into topo_order, level by level
-        while nodes:
-            # Negative logic: we need all independent nodes, but it needs
-            # calculating a NotExists quantifier, which is always inefficient.
-            # So:
-            ## All nodes that _do_ depend on _something_
-            dependents = [i.dependent for i in edges]
-            ## Now it's simple: independent = all \ dependent
-            ## These nodes constitute a topological level
-            topo_level = TopoLevel(n for n in nodes if not n in dependents)
-            # if topo_level is empty while nodes are not, there must be a circle
-            # among the nodes through the edges
-            if not topo_level:
-                raise SchemaError("Cycle detected.",nodes)
-            # Remove nodes that were put in this topological level, as now they
-            # are satisfied dependencies.
-            nodes = [n for n in nodes if not n in topo_level]
-            # Remove half edges (edges connected with nodes just removed).
-            edges = [e for e in edges if not e.dependee in topo_level]
-
-            # Add to output
-            topo_order.add_level(topo_level)
-
-        # Done
+        for level in levels:
+            topo_order.add_level(level)
         return topo_order
@@ -0,0 +1,160 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Compiling infrastructure descriptions from :mod:`asyncio` code.
+
+Compilation is CPU-bound; :func:`compile_async` runs it (parsing, schema
+checking and compiling) in an executor, so the event loop is not blocked::
+
+    limits = CallerLimits(2)
+    ...
+    sd = await compile_async(text, timeout=10, caller=user_id, limits=limits)
+
+The default executor is a thread pool, which keeps the event loop responsive,
+but compilations still compete for the interpreter with the rest of the
+process. A :class:`concurrent.futures.ProcessPoolExecutor` runs them in
+parallel; the description and the result are then pickled. Lazy
+descriptions (``lazy=True``) are then ordered, validated and prepared
+completely in the worker, so the work is not left to the event loop's
+process.
+
+A compilation that has already started cannot be interrupted. Upon
+cancellation or timeout, the result is discarded, but the caller's slot in
+:class:`CallerLimits` is only released when the compilation has actually
+finished, so cancelling requests cannot be used to exceed the limit.
+
+.. autofunction:: compile_async
+.. autoclass:: CallerLimits
+    :members:
+"""
+
+__all__ = ['compile_async', 'CallerLimits']
+
+import asyncio
+import concurrent.futures
+import threading
+from occo.compiler import StaticDescription
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _default_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                thread_name_prefix='occo-compiler')
+        return _executor
+
+def _compile(description, kwargs, prepare=False):
+    # Runs in the executor; must be picklable.
+    sd = StaticDescription(description, **kwargs)
+    if prepare:
+        sd.validate()
+        sd.prepare_all()
+    return sd
+
+class CallerLimits(object):
+    """Limits the number of concurrent compilations of each caller.
+
+    Must only be used within a single event loop.
+
+    :param int limit: The maximum number of concurrent compilations per
+        caller. Further requests wait for a free slot.
+    """
+    def __init__(self, limit):
+        if limit < 1:
+            raise ValueError('Invalid limit', limit)
+        self.limit = limit
+        self._semaphores = dict()
+        self._users = dict()
+
+    def pending(self, caller):
+        """The number of compilations of the caller, running or waiting for a
+        slot."""
+        return self._users.get(caller, 0)
+
+    async def acquire(self, caller):
+        """Waits for a free slot of the caller."""
+        semaphore = self._semaphores.get(caller)
+        if semaphore is None:
+            semaphore = self._semaphores[caller] = asyncio.Semaphore(self.limit)
+        self._users[caller] = self._users.get(caller, 0) + 1
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            self._unuse(caller)
+            raise
+
+    def release(self, caller):
+        """Releases a slot acquired with :meth:`acquire`."""
+        self._semaphores[caller].release()
+        self._unuse(caller)
+
+    def _unuse(self, caller):
+        # Idle callers are forgotten, so they do not accumulate
+        self._users[caller] -= 1
+        if not self._users[caller]:
+            del self._users[caller], self._semaphores[caller]
+
+async def _run(loop, description, executor, caller, limits, kwargs):
+    if limits:
+        await limits.acquire(caller)
+    prepare = isinstance(executor, concurrent.futures.ProcessPoolExecutor)
+    try:
+        future = (executor or _default_executor()).submit(
+            _compile, description, kwargs, prepare)
+    except BaseException:
+        if limits:
+            limits.release(caller)
+        raise
+    if limits:
+        def finished(_):
+            try:
+                loop.call_soon_threadsafe(limits.release, caller)
+            except RuntimeError:
+                # The event loop has been closed meanwhile
+                pass
+        future.add_done_callback(finished)
+    try:
+        return await asyncio.wrap_future(future)
+    finally:
+        # No-op if it has already finished
+        future.cancel()
+
+async def compile_async(description, executor=None, timeout=None,
+                        caller=None, limits=None, **kwargs):
+    """Compiles an infrastructure description in an executor.
+
+    :param description: The infrastructure description; see
+        :class:`~occo.compiler.StaticDescription`.
+    :param executor: The :class:`concurrent.futures.Executor` to be used.
+        By default, a thread pool shared by all callers.
+    :param float timeout: Maximum time to wait, in seconds, including waiting
+        for a free slot in ``limits``.
+    :param caller: Identifies the caller (any hashable) for ``limits``.
+    :param limits: The :class:`CallerLimits` to be applied, if any.
+    :param ** kwargs: Further arguments of
+        :class:`~occo.compiler.StaticDescription` (e.g. ``lazy``). With a
+        :class:`~concurrent.futures.ProcessPoolExecutor`, lazy descriptions
+        are validated and prepared completely before being returned.
+
+    :rtype: :class:`~occo.compiler.StaticDescription`
+    :raises SchemaError: if the description is invalid.
+    :raises asyncio.TimeoutError: if the compilation has not finished in
+        time.
+    """
+    loop = asyncio.get_running_loop()
+    return await asyncio.wait_for(
+        _run(loop, description, executor, caller, limits, kwargs), timeout)
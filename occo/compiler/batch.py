@@ -0,0 +1,151 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Batch compilation of infrastructure descriptions.
+
+:func:`compile_many` parses, checks and compiles many descriptions in a process
+pool. Results are yielded as they become available, each wrapped in a
+:class:`CompileResult`; a failing description does not affect the others.
+
+.. autofunction:: compile_many
+.. autoclass:: CompileResult
+    :members:
+"""
+
+__all__ = ['compile_many', 'CompileResult']
+
+import concurrent.futures
+import copy
+import os
+import pickle
+from occo.compiler import StaticDescription
+from occo.exceptions import SchemaError
+
+class CompileResult(object):
+    """The outcome of compiling a single description in a batch.
+
+    :var index: The position of the description in the input.
+    :var description: The compiled :class:`~occo.compiler.StaticDescription`,
+        or :data:`None` on failure.
+    :var error: The exception raised while compiling, or :data:`None`.
+    """
+    def __init__(self, index, description=None, error=None):
+        self.index = index
+        self.description = description
+        self.error = error
+
+    @property
+    def ok(self):
+        """Whether the compilation was successful."""
+        return self.error is None
+
+    def __repr__(self):
+        return 'CompileResult({0!r}, {1!r}, {2!r})'.format(
+            self.index, self.description, self.error)
+
+def _portable(error):
+    # The exception itself if it survives pickling, so it can be sent back
+    # from a worker process as it is; otherwise a (kind, message) pair.
+    try:
+        pickle.loads(pickle.dumps(error, pickle.HIGHEST_PROTOCOL))
+        return error
+    except Exception:
+        if isinstance(error, SchemaError):
+            return ('SchemaError', error.msg)
+        return (type(error).__name__, str(error))
+
+def _compile_chunk(chunk, copy_input=False):
+    # Runs in the worker process, or inline with copy_input (descriptions
+    # sent to workers are copies already).
+    results = list()
+    for index, desc in chunk:
+        try:
+            if copy_input and isinstance(desc, dict):
+                desc = copy.deepcopy(desc)
+            results.append((index, StaticDescription(desc), None))
+        except Exception as e:
+            results.append((index, None, _portable(e)))
+    return results
+
+def _make_result(index, description, error):
+    if isinstance(error, tuple):
+        kind, msg = error
+        if kind == 'SchemaError':
+            error = SchemaError(msg)
+        else:
+            error = RuntimeError('{0}: {1}'.format(kind, msg))
+    return CompileResult(index, description, error)
+
+def compile_many(descriptions, workers=None, chunksize=1):
+    """Compiles many infrastructure descriptions in parallel.
+
+    Parsed descriptions passed here are not modified (unlike by
+    :class:`~occo.compiler.StaticDescription`); the compiled descriptions
+    contain copies of them.
+
+    Errors are reported as they were raised (e.g.
+    :exc:`~occo.compiler.cycles.CycleError`), unless they cannot be pickled;
+    then as :exc:`SchemaError` (with the message only) or
+    :exc:`RuntimeError`.
+
+    If a chunk cannot be processed by a worker at all (e.g. the worker
+    process dies, or a compiled description cannot be sent back), each
+    description in the chunk yields a failed :class:`CompileResult` carrying
+    the exception.
+
+    :param descriptions: Iterable of infrastructure descriptions; see
+        :class:`~occo.compiler.StaticDescription`.
+    :param int workers: Number of worker processes; defaults to the number of
+        CPUs. With ``workers=1``, descriptions are compiled in this process.
+    :param int chunksize: Number of descriptions sent to a worker at once.
+        Larger chunks amortize inter-process communication for small
+        descriptions.
+
+    :returns: An iterator of :class:`CompileResult`\\ s, in the order of
+        completion.
+    :raises ValueError: if ``workers`` or ``chunksize`` is invalid.
+    """
+    if workers is not None and workers < 1:
+        raise ValueError('workers must be positive', workers)
+    if chunksize < 1:
+        raise ValueError('chunksize must be positive', chunksize)
+    workers = workers or os.cpu_count() or 1
+    items = list(enumerate(descriptions))
+    chunks = [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+    return _compile_chunks(chunks, workers)
+
+def _compile_chunks(chunks, workers):
+    if workers == 1:
+        for chunk in chunks:
+            for result in _compile_chunk(chunk, copy_input=True):
+                yield _make_result(*result)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = dict((pool.submit(_compile_chunk, chunk), chunk)
+                       for chunk in chunks)
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    for index, _ in futures[future]:
+                        yield CompileResult(index, error=e)
+                    continue
+                for result in results:
+                    yield _make_result(*result)
+        finally:
+            # If the consumer stops early, do not wait for pending chunks.
+            for future in futures:
+                future.cancel()
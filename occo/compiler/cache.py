@@ -0,0 +1,241 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Content-addressed cache of compiled infrastructure descriptions.
+
+Compiling the same description repeatedly (on restart, on resubmission, etc.)
+yields the same topological order, mappings and prepared nodes; only the
+``infra_id`` differs. :class:`CompileCache` stores compiled
+:class:`~occo.compiler.StaticDescription` objects keyed by a canonical hash of
+the description, and re-stamps the ``infra_id`` on retrieval.
+
+Entries are stored pickled, so each retrieval yields an independent copy that
+the caller may modify freely. The optional on-disk tier uses the same format;
+its directory must only be writable by trusted parties.
+
+.. autofunction:: description_key
+.. autoclass:: CompileCache
+    :members:
+"""
+
+__all__ = ['CompileCache', 'description_key']
+
+import collections
+import copy
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import uuid
+from occo.compiler import StaticDescription
+from occo.compiler.canonical import canonical
+
+log = logging.getLogger('occo.compiler')
+
+#: Bumped whenever the compiled representation changes, so stale on-disk
+#: entries are not picked up.
+CACHE_FORMAT = 6
+
+def description_key(infrastructure_description):
+    """
+    Calculates the cache key of an infrastructure description.
+
+    YAML strings are hashed as they are, without parsing them (that is what the
+    cache tries to spare). Parsed descriptions (:class:`dict`) are hashed based
+    on their canonical form, so key order does not matter.
+
+    :param infrastructure_description: See :class:`StaticDescription`.
+    :rtype: str
+    """
+    if isinstance(infrastructure_description, dict):
+        kind, text = 'dict', canonical(infrastructure_description)
+    else:
+        kind, text = 'yaml', infrastructure_description
+    h = hashlib.sha256('{0}:{1}:'.format(CACHE_FORMAT, kind).encode('utf-8'))
+    h.update(text.encode('utf-8') if not isinstance(text, bytes) else text)
+    return h.hexdigest()
+
+def restamp(static_description, infra_id):
+    """Sets the ``infra_id`` of a compiled description and all its nodes."""
+    static_description.infra_id = infra_id
+    for n in static_description.nodes:
+        n['infra_id'] = infra_id
+    return static_description
+
+class CompileCache(object):
+    """
+    Bounded LRU cache of compiled infrastructure descriptions, with an optional
+    on-disk tier.
+
+    :param int maxsize: The maximum number of entries kept in memory.
+    :param str directory: If specified, compiled descriptions are also stored
+        in this directory, and are looked up there upon an in-memory miss.
+        Entries evicted from memory remain available on disk until
+        invalidated.
+
+    :var hits: Number of lookups served from the cache (either tier).
+    :var disk_hits: Number of lookups served from the on-disk tier.
+    :var misses: Number of lookups that required compilation.
+    :var evictions: Number of entries evicted from memory.
+    """
+    def __init__(self, maxsize=128, directory=None):
+        if maxsize < 1:
+            raise ValueError('maxsize must be positive', maxsize)
+        self.maxsize = maxsize
+        self.directory = directory
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+    def compile(self, infrastructure_description, infra_id=None):
+        """
+        Returns the compiled form of the description, compiling it only if
+        it is not cached yet.
+
+        The parameters are the same as those of :class:`StaticDescription`.
+        Parsed descriptions are not modified; a copy of them is compiled.
+        Schema errors are not cached; they are raised on each attempt.
+
+        The ``compile_stats`` of a description served from the cache records
+        no phases, only the shape of the graph.
+
+        :rtype: :class:`StaticDescription`
+        """
+        key = description_key(infrastructure_description)
+        infra_id = infra_id or str(uuid.uuid4())
+
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if blob is None:
+            blob = self._load(key)
+            if blob is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._insert(key, blob)
+        if blob is not None:
+            try:
+                sd = restamp(pickle.loads(blob), infra_id)
+                sd.compile_stats.phases = dict()
+                return sd
+            except Exception:
+                log.warning('Dropping unreadable cache entry %r', key,
+                            exc_info=True)
+                self.invalidate_key(key)
+
+        with self._lock:
+            self.misses += 1
+        if isinstance(infrastructure_description, dict):
+            # Compilation modifies parsed descriptions in place, which would
+            # change their key
+            infrastructure_description = \
+                copy.deepcopy(infrastructure_description)
+        compiled = StaticDescription(infrastructure_description, infra_id)
+        blob = pickle.dumps(compiled, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._insert(key, blob)
+        self._store(key, blob)
+        return compiled
+
+    def invalidate(self, infrastructure_description):
+        """Removes the given description from the cache (both tiers).
+
+        :returns: Whether there was such an entry.
+        """
+        return self.invalidate_key(
+            description_key(infrastructure_description))
+
+    def invalidate_key(self, key):
+        """Removes an entry from the cache (both tiers) based on its key.
+
+        :returns: Whether there was such an entry.
+        """
+        with self._lock:
+            found = self._entries.pop(key, None) is not None
+        if self.directory:
+            try:
+                os.remove(self._path(key))
+                found = True
+            except OSError:
+                pass
+        return found
+
+    def clear(self):
+        """Removes all entries from the cache (both tiers)."""
+        with self._lock:
+            self._entries.clear()
+        if self.directory:
+            for fname in os.listdir(self.directory):
+                if fname.endswith('.sdc'):
+                    os.remove(os.path.join(self.directory, fname))
+
+    def stats(self):
+        """The cache counters as a :class:`dict`."""
+        with self._lock:
+            return dict(hits=self.hits, disk_hits=self.disk_hits,
+                        misses=self.misses, evictions=self.evictions,
+                        size=len(self._entries), maxsize=self.maxsize)
+
+    def __contains__(self, infrastructure_description):
+        key = description_key(infrastructure_description)
+        with self._lock:
+            if key in self._entries:
+                return True
+        return bool(self.directory) and os.path.exists(self._path(key))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _insert(self, key, blob):
+        # Must be called holding the lock
+        self._entries[key] = blob
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.sdc')
+
+    def _load(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except (IOError, OSError):
+            return None
+
+    def _store(self, key, blob):
+        if not self.directory:
+            return
+        # Write atomically, so concurrent readers never see partial entries
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp, self._path(key))
+        except (IOError, OSError):
+            log.exception('Cannot store compiled description %r', key)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
@@ -0,0 +1,35 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Canonical form of parsed descriptions, for content hashing.
+
+.. autofunction:: canonical
+"""
+
+__all__ = ['canonical']
+
+import collections.abc
+
+def canonical(data):
+    """Stable textual representation of a parsed description: mappings are
+    ordered by key, and scalars are ``repr``-ed so types are kept apart
+    (``1`` vs ``'1'``)."""
+    if isinstance(data, collections.abc.Mapping):
+        return '{{{0}}}'.format(','.join(sorted(
+            '{0}:{1}'.format(canonical(k), canonical(v))
+            for k, v in data.items())))
+    elif isinstance(data, (list, tuple)):
+        return '[{0}]'.format(','.join(canonical(i) for i in data))
+    else:
+        return repr(data)
@@ -0,0 +1,154 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Cycle detection in the dependency graph.
+
+The strongly connected components of the graph are found with Tarjan's
+algorithm in O(N+E). Each component that contains a cycle is reported,
+together with a shortest cycle through its first node, found with a
+breadth-first search restricted to the component.
+
+.. autoclass:: CycleError
+.. autofunction:: find_cycles
+.. autofunction:: strongly_connected_components
+"""
+
+__all__ = ['CycleError', 'find_cycles', 'strongly_connected_components']
+
+import collections
+from occo.exceptions import SchemaError
+
+class CycleError(SchemaError):
+    """Raised when the dependency graph contains a cycle.
+
+    The context of the exception is :attr:`cycle`.
+
+    :var components: The names of the nodes of each strongly connected
+        component containing a cycle (:class:`list` of :class:`list`\\ s).
+    :var cycle: A shortest cycle in the first component: the names of the
+        nodes, each of which depends on the next one, while the last one
+        depends on the first one.
+    """
+    def __init__(self, components, cycle):
+        self.components = components
+        self.cycle = cycle
+        SchemaError.__init__(
+            self,
+            'Cycle detected: {0}'.format(' -> '.join(cycle + cycle[:1])),
+            cycle)
+
+    def __reduce__(self):
+        return CycleError, (self.components, self.cycle)
+
+def strongly_connected_components(vertices, successors):
+    """Finds the strongly connected components of a graph, using an iterative
+    version of Tarjan's algorithm.
+
+    :param vertices: The vertices of the graph (hashable items).
+    :param successors: ``successors(v)`` returns the vertices ``v`` points to;
+        it must only return items of ``vertices``.
+    :returns: The list of components (:class:`list`\\ s of vertices), in
+        reverse topological order.
+    """
+    index, low = dict(), dict()
+    stack, on_stack = list(), set()
+    components = list()
+    for root in vertices:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(successors(root)))]
+        while work:
+            v, it = work[-1]
+            for w in it:
+                if w not in index:
+                    index[w] = low[w] = len(index)
+                    stack.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(successors(w))))
+                    break
+                elif w in on_stack:
+                    low[v] = min(low[v], index[w])
+            else:
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    low[u] = min(low[u], low[v])
+                if low[v] == index[v]:
+                    component = list()
+                    while True:
+                        w = stack.pop()
+                        on_stack.discard(w)
+                        component.append(w)
+                        if w == v:
+                            break
+                    components.append(component)
+    return components
+
+def _shortest_cycle(start, members, successors):
+    # Breadth-first search from start back to itself, within members
+    parent = {start: None}
+    queue = collections.deque([start])
+    while queue:
+        v = queue.popleft()
+        for w in successors(v):
+            if w == start:
+                path = [v]
+                while path[-1] != start:
+                    path.append(parent[path[-1]])
+                path.reverse()
+                return path
+            if w in members and w not in parent:
+                parent[w] = v
+                queue.append(w)
+
+def find_cycles(vertices, successors):
+    """Finds the cycles of a graph.
+
+    :param list vertices: The vertices of the graph (hashable items).
+    :param successors: ``successors(v)`` returns the vertices ``v`` points to;
+        it must only return items of ``vertices``.
+    :returns: A ``(component, cycle)`` pair for each strongly connected
+        component containing a cycle (including a vertex pointing to itself),
+        ordered by the position of their first vertex in ``vertices``.
+        ``component`` is the list of the vertices of the component, in the
+        order of ``vertices``; ``cycle`` is a shortest cycle through the first
+        of them, following ``successors``.
+    """
+    position = dict((v, i) for i, v in enumerate(vertices))
+    found = list()
+    for component in strongly_connected_components(vertices, successors):
+        if len(component) == 1 and component[0] not in successors(component[0]):
+            continue
+        component.sort(key=position.__getitem__)
+        cycle = _shortest_cycle(component[0], set(component), successors)
+        found.append((component, cycle))
+    found.sort(key=lambda item: position[item[0][0]])
+    return found
+
+def cycle_error(vertices, dependees, name):
+    """Creates a :class:`CycleError` describing the cycles among
+    ``vertices``; or returns :data:`None` if there are none.
+
+    :param dependees: ``dependees(v)`` returns the vertices ``v`` depends on,
+        within ``vertices``.
+    :param name: ``name(v)`` returns the name of the node ``v``.
+    """
+    found = find_cycles(vertices, dependees)
+    if not found:
+        return None
+    return CycleError([[name(v) for v in component] for component, _ in found],
+                      [name(v) for v in found[0][1]])
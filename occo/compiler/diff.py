@@ -0,0 +1,153 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Structural difference of two compiled infrastructure descriptions.
+
+Nodes are matched by name and compared by a content hash of their prepared
+description (:func:`node_hash`); edges are matched by the names of their
+endpoints. The comparison is O(N+E), apart from hashing the node descriptions.
+
+A node has to be redeployed if it is new or its description has changed, or
+if its inbound mappings have changed (an inbound edge has been added, removed
+or modified). Nodes downstream of these (through outbound edges) depend on
+them, so they have to be redeployed too.
+
+.. autofunction:: diff
+.. autofunction:: node_hash
+.. autoclass:: DescriptionDiff
+    :members:
+"""
+
+__all__ = ['diff', 'node_hash', 'DescriptionDiff']
+
+import hashlib
+from occo.compiler.canonical import canonical
+
+# Node keys that are not compared: identifiers of the infrastructure, and
+# mappings (compared through the edges)
+IGNORED_KEYS = frozenset(['infra_id', 'infra_name', 'mappings'])
+
+def node_hash(node):
+    """Content hash of a prepared node description; independent of key order,
+    the identity of the infrastructure, and the mappings of the node.
+
+    :rtype: :class:`bytes`
+    """
+    content = dict((k, v) for k, v in node.items() if k not in IGNORED_KEYS)
+    return hashlib.blake2b(canonical(content).encode('utf-8'),
+                           digest_size=16).digest()
+
+def _node_hashes(sd):
+    # node_lookup prepares the nodes of lazy descriptions
+    return dict((name, node_hash(sd.node_lookup[name]))
+                for name in sd.node_lookup)
+
+def _edge_contents(sd):
+    # The mappings and extras of the edges between each pair of nodes; there
+    # may be several edges between two nodes.
+    contents = dict()
+    for e in sd.edges:
+        key = e.dependent['name'], e.dependee['name']
+        contents.setdefault(key, []).append(
+            canonical([e.attribute_mappings, e.extras]))
+    for items in contents.values():
+        items.sort()
+    return contents
+
+class DescriptionDiff(object):
+    """The difference of two compiled infrastructure descriptions; see
+    :func:`diff`.
+
+    Nodes are identified by name; edges by ``(dependent, dependee)`` pairs of
+    node names.
+
+    :var added_nodes: Nodes only in the new description.
+    :var removed_nodes: Nodes only in the old description.
+    :var modified_nodes: Nodes whose description has changed.
+    :var added_edges: Pairs of nodes only connected in the new description.
+    :var removed_edges: Pairs of nodes only connected in the old description.
+    :var modified_mappings: Pairs of nodes connected in both descriptions,
+        with different mappings (or other edge information).
+    :var redeploy: The nodes of the new description that have to be
+        redeployed.
+    :var levels: The topological levels of the new description containing
+        nodes to be redeployed (sorted :class:`list` of level indexes).
+    """
+    def __init__(self):
+        self.added_nodes, self.removed_nodes = set(), set()
+        self.modified_nodes = set()
+        self.added_edges, self.removed_edges = set(), set()
+        self.modified_mappings = set()
+        self.redeploy = set()
+        self.levels = list()
+
+    def __bool__(self):
+        return bool(self.added_nodes or self.removed_nodes
+                    or self.modified_nodes or self.added_edges
+                    or self.removed_edges or self.modified_mappings)
+
+    def as_dict(self):
+        """The difference as a :class:`dict` of sorted lists, e.g. for
+        reporting."""
+        return dict((key, sorted(getattr(self, key))) for key in (
+            'added_nodes', 'removed_nodes', 'modified_nodes', 'added_edges',
+            'removed_edges', 'modified_mappings', 'redeploy', 'levels'))
+
+    def __repr__(self):
+        return 'DescriptionDiff({0!r})'.format(self.as_dict())
+
+def diff(old, new):
+    """Compares two compiled infrastructure descriptions.
+
+    Lazy descriptions are prepared as necessary.
+
+    :param old: The current :class:`~occo.compiler.StaticDescription`.
+    :param new: The updated :class:`~occo.compiler.StaticDescription`.
+    :rtype: :class:`DescriptionDiff`
+    """
+    result = DescriptionDiff()
+
+    old_hashes, new_hashes = _node_hashes(old), _node_hashes(new)
+    for name, h in new_hashes.items():
+        if name not in old_hashes:
+            result.added_nodes.add(name)
+        elif old_hashes[name] != h:
+            result.modified_nodes.add(name)
+    result.removed_nodes.update(
+        name for name in old_hashes if name not in new_hashes)
+
+    old_edges, new_edges = _edge_contents(old), _edge_contents(new)
+    for key, contents in new_edges.items():
+        if key not in old_edges:
+            result.added_edges.add(key)
+        elif old_edges[key] != contents:
+            result.modified_mappings.add(key)
+    result.removed_edges.update(
+        key for key in old_edges if key not in new_edges)
+
+    seeds = result.added_nodes | result.modified_nodes
+    seeds.update(dependent for dependent, _ in result.added_edges)
+    seeds.update(dependent for dependent, _ in result.modified_mappings)
+    seeds.update(dependent for dependent, _ in result.removed_edges
+                 if dependent in new_hashes)
+    redeploy, stack = set(seeds), list(seeds)
+    while stack:
+        for e in new.outbound_edges(stack.pop()):
+            name = e.dependent['name']
+            if name not in redeploy:
+                redeploy.add(name)
+                stack.append(name)
+    result.redeploy = redeploy
+    result.levels = sorted(set(new._level[name] for name in redeploy))
+    return result
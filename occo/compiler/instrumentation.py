@@ -0,0 +1,170 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Compilation statistics and profiling hooks.
+
+Each :class:`~occo.compiler.StaticDescription` carries a :class:`CompileStats`
+object (``compile_stats``) recording the wall time of each compilation phase:
+
+``parse``
+    YAML parsing (only if the description is specified as a string)
+``schema_check``
+    :meth:`~occo.compiler.StaticDescription.schema_check`
+``edges``
+    Edge construction and indexing
+``topo_order``
+    Topological ordering
+``prepare_nodes``
+    Preparation of node descriptions (variables, mappings)
+
+In lazy mode, the last two phases are recorded when they actually happen.
+
+Hooks registered with :func:`add_hook` are called after each phase, and once
+more with the phase ``'total'`` when the construction of the description is
+finished. :func:`trace` collects the statistics of the descriptions compiled
+within a ``with`` block.
+
+.. autoclass:: CompileStats
+    :members:
+.. autofunction:: add_hook
+.. autofunction:: remove_hook
+.. autofunction:: trace
+"""
+
+__all__ = ['CompileStats', 'add_hook', 'remove_hook', 'trace']
+
+import contextlib
+import logging
+import threading
+import time
+
+log = logging.getLogger('occo.compiler')
+
+_hooks = list()
+_hooks_lock = threading.Lock()
+
+def add_hook(hook):
+    """Registers a hook to be called after each compilation phase.
+
+    :param hook: ``hook(phase, elapsed, stats)``: the name of the phase, its
+        wall time in seconds and the :class:`CompileStats` of the description
+        being compiled. Exceptions raised by hooks are logged and ignored.
+    """
+    with _hooks_lock:
+        _hooks.append(hook)
+
+def remove_hook(hook):
+    """Unregisters a hook registered with :func:`add_hook`."""
+    with _hooks_lock:
+        _hooks.remove(hook)
+
+def _notify(phase, elapsed, stats):
+    for hook in list(_hooks):
+        try:
+            hook(phase, elapsed, stats)
+        except Exception:
+            log.exception('Compile hook %r failed', hook)
+
+@contextlib.contextmanager
+def trace():
+    """Collects the :class:`CompileStats` of all descriptions compiled (in any
+    thread) within the ``with`` block::
+
+        with trace() as collected:
+            StaticDescription(...)
+        for stats in collected:
+            ...
+    """
+    collected = list()
+    def hook(phase, elapsed, stats):
+        if phase == 'total':
+            collected.append(stats)
+    add_hook(hook)
+    try:
+        yield collected
+    finally:
+        remove_hook(hook)
+
+class CompileStats(object):
+    """Statistics of compiling an infrastructure description.
+
+    :param bool profile: Run each phase under :mod:`cProfile`.
+
+    :var phases: Wall time of each phase, in seconds, in the order they were
+        run (:class:`dict`).
+    :var profiles: The :class:`cProfile.Profile` of each phase, if profiling
+        is enabled. Profiles are not kept when the description is pickled.
+    :var nodes: Number of nodes.
+    :var edges: Number of edges.
+    :var levels: Number of topological levels; the depth of the graph.
+    :var width: Number of nodes on the widest topological level.
+    """
+    def __init__(self, profile=False):
+        self.profile = profile
+        self.phases = dict()
+        self.profiles = dict()
+        self.nodes = self.edges = self.levels = self.width = None
+
+    @property
+    def depth(self):
+        """The depth of the graph; same as :attr:`levels`."""
+        return self.levels
+
+    @property
+    def total(self):
+        """The sum of the wall time of all phases recorded so far."""
+        return sum(self.phases.values())
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Measures (and profiles) the phase run in the ``with`` block, and
+        notifies the hooks."""
+        profiler = None
+        if self.profile:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiler:
+                profiler.disable()
+                self.profiles[name] = profiler
+            self.phases[name] = self.phases.get(name, 0) + elapsed
+        _notify(name, elapsed, self)
+
+    def finished(self):
+        """Notifies the hooks that the compilation has finished."""
+        _notify('total', self.total, self)
+
+    def set_order(self, topological_order):
+        """Records the shape of the topological order."""
+        self.levels = len(topological_order)
+        self.width = max([len(l) for l in topological_order] or [0])
+
+    def as_dict(self):
+        """The statistics as a :class:`dict`, e.g. for metrics."""
+        return dict(phases=dict(self.phases), total=self.total,
+                    nodes=self.nodes, edges=self.edges, levels=self.levels,
+                    width=self.width, depth=self.depth)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['profiles'] = dict()
+        return state
+
+    def __repr__(self):
+        return 'CompileStats({0!r})'.format(self.as_dict())
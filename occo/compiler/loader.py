@@ -0,0 +1,87 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""YAML ingestion for the compiler.
+
+Infrastructure descriptions are parsed with the *safe* loader of
+:mod:`ruamel.yaml`, which only constructs plain data (:class:`dict`,
+:class:`list`, scalars). If the C extension of ``ruamel.yaml`` is installed,
+the C parser is used; otherwise the pure Python implementation.
+
+Anchors and aliases are resolved to the very same object.
+
+:mod:`ruamel.yaml` is only imported when the first document is parsed (or
+``HAVE_CPARSER`` is accessed).
+
+.. autofunction:: load
+.. autofunction:: load_all
+"""
+
+# HAVE_CPARSER is provided by the module __getattr__, so it is not listed
+__all__ = ['load', 'load_all']
+
+import threading
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def _yaml_backend():
+    # ruamel.yaml is imported on first use, so importing the compiler stays
+    # cheap for code that does not parse YAML. Returns (YAML, HAVE_CPARSER).
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                from ruamel.yaml import YAML
+                try:
+                    from ruamel.yaml.cyaml import CParser
+                except ImportError:
+                    CParser = None
+                _backend = YAML, CParser is not None
+    return _backend
+
+def __getattr__(name):
+    # HAVE_CPARSER: Whether the C accelerated parser is available.
+    if name == 'HAVE_CPARSER':
+        return _yaml_backend()[1]
+    raise AttributeError(name)
+
+def yaml_processor(pure=False):
+    """Creates a safe YAML processor.
+
+    A new one is created each time, as they are not thread-safe.
+
+    :param bool pure: Use the pure Python parser even if the C parser is
+        available.
+    """
+    YAML, have_cparser = _yaml_backend()
+    return YAML(typ='safe', pure=pure or not have_cparser)
+
+def load(stream, pure=False):
+    """Parses a single YAML document.
+
+    :param stream: The YAML document (:class:`str` or file-like object).
+    :param bool pure: See :func:`yaml_processor`.
+    """
+    return yaml_processor(pure).load(stream)
+
+def load_all(stream, pure=False):
+    """Parses all documents of a multi-document YAML stream, lazily.
+
+    :param stream: The YAML stream (:class:`str` or file-like object).
+    :param bool pure: See :func:`yaml_processor`.
+    :returns: A generator yielding the parsed documents.
+    """
+    for document in yaml_processor(pure).load_all(stream):
+        yield document
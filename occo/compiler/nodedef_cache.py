@@ -0,0 +1,289 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Persistent cache of node definition validation results.
+
+Node definition catalogs change rarely, but checking them imports and runs
+the schema checker of each plugin involved. :class:`NodeDefCache` stores the
+result of checking each ``node_def:<name>`` entry (the list of errors, empty
+if it is valid), keyed by a content hash of the entry and the fingerprints of
+the plugin modules it is checked with. Only new or modified entries, or those
+whose plugins have changed, are checked again::
+
+    cache = NodeDefCache('nodedefs.cache')
+    SchemaChecker.check_node_def(node_defs, cache=cache)
+    cache.save()
+
+Plugin modules are fingerprinted by the size and modification time of their
+source file, located on :data:`sys.path` without importing them. Entries
+involving a plugin whose source cannot be located are not cached.
+
+The cache can be warmed from the command line, which also reports the hit
+rate::
+
+    python -m occo.compiler.nodedef_cache CACHE CATALOG.yaml...
+        [--workers N] [--prune]
+
+.. autoclass:: NodeDefCache
+    :members:
+"""
+
+__all__ = ['NodeDefCache']
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+from occo.compiler.canonical import canonical
+from occo.compiler.schema_check import NODE_DEF_SECTIONS, plugin_modules, \
+    check_node_def_entries, set_node_def_defaults
+
+log = logging.getLogger('occo.compiler')
+
+#: Bumped whenever the results of checking change, so stale entries are not
+#: picked up.
+CACHE_FORMAT = 1
+
+def _module_file(name):
+    # The source file of a module, without importing it
+    module = sys.modules.get(name)
+    if module is not None:
+        return getattr(module, '__file__', None)
+    parts = name.split('.')
+    for entry in sys.path:
+        base = os.path.join(entry or os.curdir, *parts)
+        for candidate in (os.path.join(base, '__init__.py'), base + '.py'):
+            if os.path.isfile(candidate):
+                return candidate
+    return None
+
+def _fingerprint(name):
+    # [name, path, size, mtime] of a module; None if it cannot be located
+    path = _module_file(name)
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [name, os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+class NodeDefCache(object):
+    """
+    Validation results of node definition entries, stored in a JSON file.
+
+    Results are looked up and stored in memory; :meth:`save` writes them to
+    the file. The cache can be shared by threads.
+
+    :param str path: The file the cache is loaded from (if it exists) and
+        saved to. If not specified, the cache is kept in memory only.
+
+    :var hits: Number of entries whose results have been found in the cache.
+    :var misses: Number of entries that have been checked.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = dict()
+        self._used = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get('format') == CACHE_FORMAT:
+                self._entries = dict(data['entries'])
+            else:
+                log.info('Ignoring node definition cache %r of format %r',
+                         self.path, data.get('format'))
+        except Exception:
+            log.warning('Ignoring unreadable node definition cache %r',
+                        self.path, exc_info=True)
+
+    def entry_key(self, nodename, node_def, _fingerprints=None):
+        """Calculates the cache key of a node definition entry.
+
+        Defaults must have been filled in already (see
+        :func:`~occo.compiler.schema_check.set_node_def_defaults`).
+
+        :returns: The key (:class:`str`); or :data:`None` if the entry cannot
+            be cached, because the source of a plugin cannot be located.
+        """
+        fingerprints = _fingerprints if _fingerprints is not None else dict()
+        modules = set()
+        if isinstance(node_def, list):
+            for node in node_def:
+                if not isinstance(node, dict):
+                    continue
+                for section, _, _, _ in NODE_DEF_SECTIONS:
+                    data = node.get(section)
+                    if not isinstance(data, dict) or 'type' not in data:
+                        continue
+                    if not isinstance(data['type'], str):
+                        return None
+                    module, _, libname = \
+                        plugin_modules(section, data['type'])
+                    modules.update((module, libname))
+        plugins = list()
+        for name in sorted(modules):
+            if name not in fingerprints:
+                fingerprints[name] = _fingerprint(name)
+            if fingerprints[name] is None:
+                return None
+            plugins.append(fingerprints[name])
+        text = canonical([CACHE_FORMAT, nodename, node_def, plugins])
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def check_entries(self, items, workers=None, processes=False):
+        """Checks node definition entries, unless their results are cached.
+
+        The parameters and the result are the same as those of
+        :func:`~occo.compiler.schema_check.check_node_def_entries`. Defaults
+        must have been filled in already.
+        """
+        fingerprints = dict()
+        keys = [self.entry_key(nodename, node_def, fingerprints)
+                for nodename, node_def in items]
+        results = [None] * len(items)
+        todo = list()
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._entries.get(key) if key else None
+                if cached is None:
+                    todo.append(i)
+                    continue
+                results[i] = [tuple(error) for error in cached]
+                self._used.add(key)
+                self.hits += 1
+            self.misses += len(todo)
+
+        checked = check_node_def_entries(
+            [items[i] for i in todo], workers, processes)
+        with self._lock:
+            for i, errors in zip(todo, checked):
+                results[i] = errors
+                key = keys[i]
+                if key and all(isinstance(msg, str) and isinstance(ctx, str)
+                               for msg, ctx in errors):
+                    self._entries[key] = [list(error) for error in errors]
+                    self._used.add(key)
+                    self._dirty = True
+        return results
+
+    def warm(self, node_defs, workers=None, processes=False):
+        """Checks the node definitions not cached yet, and stores the results.
+
+        Unlike :meth:`~occo.compiler.schema_check.SchemaChecker.check_node_def`,
+        errors are not raised.
+
+        :param dict node_defs: The node definitions, ``node_def:<name>`` keys
+            mapped to the list of implementations.
+        :returns: The names of the invalid entries, in order.
+        """
+        items = list(node_defs.items())
+        for _, node_def in items:
+            set_node_def_defaults(node_def)
+        results = self.check_entries(items, workers, processes)
+        return [nodename for (nodename, _), errors in zip(items, results)
+                if errors]
+
+    def save(self, prune=False):
+        """Writes the cache to its file, atomically.
+
+        :param bool prune: Drop the entries that have not been used since the
+            cache has been loaded.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            if prune:
+                self._entries = dict((k, v) for k, v in self._entries.items()
+                                     if k in self._used)
+            elif not self._dirty:
+                return
+            text = json.dumps(dict(format=CACHE_FORMAT,
+                                   entries=self._entries),
+                              sort_keys=True)
+            self._dirty = False
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+            os.replace(tmp, self.path)
+        except (IOError, OSError):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def clear(self):
+        """Removes all entries from the cache (in memory; see :meth:`save`)."""
+        with self._lock:
+            self._entries.clear()
+            self._used.clear()
+            self._dirty = True
+
+    def stats(self):
+        """The cache counters as a :class:`dict`; ``hit_rate`` is
+        :data:`None` if nothing has been looked up yet."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return dict(hits=self.hits, misses=self.misses,
+                        entries=len(self._entries),
+                        hit_rate=self.hits / lookups if lookups else None)
+
+    def __len__(self):
+        return len(self._entries)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Warm the node definition validation cache')
+    parser.add_argument('cache', help='The cache file')
+    parser.add_argument('catalogs', nargs='+', metavar='catalog',
+                        help='YAML files of node definitions')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--prune', action='store_true',
+                        help='Drop entries not in the catalogs')
+    args = parser.parse_args(argv)
+
+    from occo.compiler import loader
+    cache = NodeDefCache(args.cache)
+    invalid = list()
+    for catalog in args.catalogs:
+        with open(catalog) as f:
+            node_defs = loader.load(f)
+        invalid.extend(cache.warm(node_defs or dict(), args.workers))
+    cache.save(args.prune)
+
+    stats = cache.stats()
+    rate = stats['hit_rate']
+    print('entries: {0}  hits: {1}  misses: {2}  hit rate: {3}'.format(
+        stats['entries'], stats['hits'], stats['misses'],
+        '-' if rate is None else '{0:.1%}'.format(rate)))
+    for nodename in invalid:
+        print('INVALID: ' + nodename)
+    return 1 if invalid else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
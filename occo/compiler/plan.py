@@ -0,0 +1,174 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Scaling-aware deployment planning.
+
+The ``scaling`` of a node specifies the number of its instances: ``min``
+(default: 1) and ``max`` (default: ``min``). A :class:`DeploymentPlan`
+calculates the number of instances of each node and each topological level,
+without creating anything per instance. Per-instance descriptors are
+generated lazily, and they all reference the same prepared node description::
+
+    plan = DeploymentPlan(static_description, max_parallel=100)
+    for batch in plan.batches():
+        for instance in batch:
+            start(instance.node, instance.index)
+
+.. autoclass:: DeploymentPlan
+    :members:
+.. autoclass:: InstanceDescriptor
+    :members:
+.. autofunction:: scaling_limits
+"""
+
+__all__ = ['DeploymentPlan', 'InstanceDescriptor', 'scaling_limits']
+
+import itertools
+from occo.exceptions import SchemaError
+
+def scaling_limits(node):
+    """The ``(min, max)`` number of instances of a node.
+
+    :raises SchemaError: if the scaling of the node is invalid.
+    """
+    scaling = node.get('scaling') or dict()
+    low = scaling.get('min', 1)
+    high = scaling.get('max', low)
+    for value in (low, high):
+        if type(value) is not int or value < 0:
+            raise SchemaError('Invalid scaling of node {0!r}: {1!r}'.format(
+                node['name'], value))
+    if low > high:
+        raise SchemaError('Invalid scaling of node {0!r}: min > max'.format(
+            node['name']))
+    return low, high
+
+class InstanceDescriptor(object):
+    """A single instance of a node to be deployed.
+
+    :var node: The prepared node description; shared by all instances of the
+        node, so it must not be modified.
+    :var index: The index of the instance among the instances of the node.
+    :var level: The topological level of the node.
+    """
+    __slots__ = ('node', 'index', 'level')
+
+    def __init__(self, node, index, level):
+        self.node = node
+        self.index = index
+        self.level = level
+
+    @property
+    def name(self):
+        """The name of the node."""
+        return self.node['name']
+
+    def __repr__(self):
+        return 'InstanceDescriptor({0!r}, {1}, {2})'.format(
+            self.name, self.index, self.level)
+
+class DeploymentPlan(object):
+    """Deployment plan of an infrastructure, taking scaling into account.
+
+    Only the scaling of the nodes is accessed upon construction; lazy
+    descriptions are not prepared until the descriptors are generated.
+
+    :param static_description: The compiled infrastructure.
+    :type static_description: :class:`~occo.compiler.StaticDescription`
+    :param dict counts: The number of instances of some of the nodes, by
+        name; e.g. for scaling out. By default, the ``min`` number of
+        instances are planned.
+    :param int max_parallel: The maximum number of instances to be deployed
+        at once, if limited.
+
+    :raises SchemaError: if the scaling of a node is invalid.
+    :raises ValueError: if a count is out of the scaling limits of the node.
+    :raises KeyError: if ``counts`` references an unknown node.
+
+    :var instances: The number of instances of each node, by name.
+    :var level_instances: The number of instances on each topological level.
+    :var parallelism: The number of instances that can be deployed at once on
+        each topological level.
+    """
+    def __init__(self, static_description, counts=None, max_parallel=None):
+        if max_parallel is not None and max_parallel < 1:
+            raise ValueError('Invalid max_parallel', max_parallel)
+        sd = self.static_description = static_description
+        self.max_parallel = max_parallel
+        counts = counts or dict()
+        for name in counts:
+            if name not in sd.node_lookup:
+                raise KeyError('Unknown node', name)
+
+        # Raw node descriptions: the scaling is not affected by preparation
+        self._levels = [[n['name'] for n in level] for level in sd._order]
+        self.instances = dict()
+        self.level_instances = list()
+        for level in self._levels:
+            total = 0
+            for name in level:
+                node = dict.__getitem__(sd.node_lookup, name)
+                low, high = scaling_limits(node)
+                count = counts.get(name, low)
+                if not low <= count <= high:
+                    raise ValueError(
+                        'Instance count out of scaling limits', name, count)
+                self.instances[name] = count
+                total += count
+            self.level_instances.append(total)
+        self.parallelism = [min(total, max_parallel) if max_parallel
+                            else total
+                            for total in self.level_instances]
+
+    @property
+    def total(self):
+        """The total number of instances."""
+        return sum(self.level_instances)
+
+    def descriptors(self, level=None):
+        """Generates the descriptors of the instances, level by level.
+
+        :param int level: Only generate the instances of this level.
+        :returns: A generator yielding :class:`InstanceDescriptor`\\ s.
+        """
+        sd = self.static_description
+        levels = enumerate(self._levels) if level is None \
+            else [(level, self._levels[level])]
+        for l, names in levels:
+            for name in names:
+                node = sd.get_node(name)
+                for i in range(self.instances[name]):
+                    yield InstanceDescriptor(node, i, l)
+
+    def batches(self):
+        """Generates the instances in batches that can be deployed at once:
+        each batch contains instances of a single level, at most
+        ``max_parallel`` of them.
+
+        :returns: A generator yielding :class:`list`\\ s of
+            :class:`InstanceDescriptor`\\ s.
+        """
+        for level, parallelism in enumerate(self.parallelism):
+            instances = self.descriptors(level)
+            while True:
+                batch = list(itertools.islice(instances, parallelism))
+                if not batch:
+                    break
+                yield batch
+
+    def __iter__(self):
+        return self.descriptors()
+
+    def __len__(self):
+        return self.total
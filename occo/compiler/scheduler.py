@@ -0,0 +1,139 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Dependency-driven scheduling of node deployment.
+
+Processing the :class:`~occo.compiler.TopologicalOrder` level by level means
+that no node on level *k+1* can be started before *all* nodes on level *k* are
+done. :class:`DependencyScheduler` releases each node as soon as the nodes *it*
+depends on are done, so a slow node only delays its own dependents.
+
+Synchronous use::
+
+    scheduler = DependencyScheduler(static_description)
+    while not scheduler.finished:
+        for node in scheduler.ready():
+            start(node)
+        ...
+        scheduler.mark_done(finished_node)
+
+Asynchronous use::
+
+    async for node in DependencyScheduler(static_description):
+        start(node)   # must eventually call scheduler.mark_done(node)
+
+.. autoclass:: DependencyScheduler
+    :members:
+"""
+
+__all__ = ['DependencyScheduler']
+
+import asyncio
+import collections
+import threading
+
+class DependencyScheduler(object):
+    """Releases nodes of an infrastructure as their dependencies are done.
+
+    :param static_description: The compiled infrastructure.
+    :type static_description: :class:`~occo.compiler.StaticDescription`
+
+    :meth:`mark_done` may be called from any thread.
+    """
+    def __init__(self, static_description):
+        self.static_description = static_description
+        self._pending = dict(
+            (name, len(static_description.inbound_edges(name)))
+            for name in static_description.node_lookup)
+        self._queue = collections.deque(
+            name for name, count in self._pending.items() if not count)
+        self._running = set()
+        self._done = set()
+        self._lock = threading.Lock()
+        self._event = None
+        self._loop = None
+
+    @property
+    def levels(self):
+        """The level-based view of the same graph
+        (:class:`~occo.compiler.TopologicalOrder`)."""
+        return self.static_description.topological_order
+
+    @property
+    def finished(self):
+        """Whether all nodes are done."""
+        return len(self._done) == len(self._pending)
+
+    @property
+    def running(self):
+        """Names of the nodes that have been released but are not done yet."""
+        return frozenset(self._running)
+
+    def ready(self):
+        """Releases all nodes whose dependencies are done.
+
+        Each node is released only once.
+
+        :returns: The list of released node descriptions.
+        """
+        with self._lock:
+            names = list(self._queue)
+            self._queue.clear()
+            self._running.update(names)
+        return [self.static_description.node_lookup[n] for n in names]
+
+    def mark_done(self, node):
+        """Marks a released node as done.
+
+        :param node: The node description or its name.
+        :returns: The node descriptions that have become ready because of
+            this; they are released by the next :meth:`ready` call.
+        :raises ValueError: if the node has not been released, or it is done
+            already.
+        """
+        name = node if isinstance(node, str) else node['name']
+        with self._lock:
+            if name not in self._running:
+                raise ValueError('Node is not running', name)
+            self._running.remove(name)
+            self._done.add(name)
+            newly_ready = list()
+            for e in self.static_description.outbound_edges(name):
+                dependent = e.dependent['name']
+                self._pending[dependent] -= 1
+                if not self._pending[dependent]:
+                    newly_ready.append(dependent)
+            self._queue.extend(newly_ready)
+            loop, event = self._loop, self._event
+        if event is not None and (newly_ready or self.finished):
+            loop.call_soon_threadsafe(event.set)
+        return [self.static_description.node_lookup[n] for n in newly_ready]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._event is None:
+            self._loop = asyncio.get_running_loop()
+            self._event = asyncio.Event()
+        while True:
+            with self._lock:
+                if self._queue:
+                    name = self._queue.popleft()
+                    self._running.add(name)
+                    return self.static_description.node_lookup[name]
+                if self.finished:
+                    raise StopAsyncIteration
+                self._event.clear()
+            await self._event.wait()
@@ -1,152 +1,364 @@
-from occo.resourcehandler import RHSchemaChecker
-from occo.configmanager import CMSchemaChecker
 from occo.exceptions import SchemaError
-from occo.infraprocessor.node_resolution import ContextSchemaChecker
-from occo.infraprocessor.synchronization import HCSchemaChecker
 import importlib
-
+import logging
 import re
+import threading
+
+log = logging.getLogger('occo')
+
+_HOSTNAME = re.compile(r"[a-z0-9-]{1,63}$", re.IGNORECASE)
+
 def is_valid_hostname(hostname):
     if "." in hostname:
         return "cannot contain \'.\' character"
     if len(hostname) > 64:
         return "is too long"
-    allowed = re.compile(r"[a-z0-9-]{1,63}$", re.IGNORECASE)
-    if not allowed.match(hostname):
+    if not _HOSTNAME.match(hostname):
         return "may contain only [a-z,0-9,-] characters"
     return None
 
+class SchemaErrorReport(SchemaError):
+    """Aggregated report of several schema errors.
+
+    :param errors: The list of ``(msg, context)`` pairs describing the errors,
+        in the order they were found.
+    """
+    def __init__(self, errors):
+        self.errors = errors
+        msg = "%d schema error(s) found" % len(errors)
+        SchemaError.__init__(self, msg,
+                             '\n'.join(context + m for m, context in errors))
+
+    def __reduce__(self):
+        return SchemaErrorReport, (self.errors,)
+
+# Plugin library and schema checker class of each node definition section.
+# The checker classes are specified by name, and imported on first use (see
+# get_checker), so importing the compiler does not import the whole stack.
+NODE_DEF_SECTIONS = [
+    ('resource', "occo.plugins.resourcehandler.",
+        "occo.resourcehandler", "RHSchemaChecker"),
+    ('config_management', "occo.plugins.configmanager.",
+        "occo.configmanager", "CMSchemaChecker"),
+    ('contextualisation', "occo.plugins.infraprocessor.node_resolution.",
+        "occo.infraprocessor.node_resolution", "ContextSchemaChecker"),
+    ('health_check', "occo.infraprocessor.synchronization.",
+        "occo.infraprocessor.synchronization", "HCSchemaChecker"),
+]
+
+_checkers = dict()
+_checkers_lock = threading.Lock()
+
+# Plugin libraries registered with register_plugin, by (section, protocol)
+_plugins = dict()
+
+def register_plugin(section, protocol, libname):
+    """Registers the plugin library implementing a protocol, overriding the
+    module of the standard plugin package (e.g.
+    ``occo.plugins.resourcehandler.<protocol>``).
+
+    The library is imported when the protocol is first checked; it must
+    register its schema checker with the checker class of the section.
+    Registrations are not inherited by spawned worker processes.
+    """
+    plugin_modules(section, protocol)
+    with _checkers_lock:
+        _plugins[(section, protocol)] = libname
+        _checkers.pop((section, protocol), None)
+
+def plugin_modules(section, protocol):
+    """The modules needed to check a node definition section.
+
+    :returns: ``(module, classname, libname)``: the module and the name of the
+        schema checker class, and the plugin library implementing the
+        protocol.
+    """
+    for name, libprefix, module, classname in NODE_DEF_SECTIONS:
+        if name == section:
+            break
+    else:
+        raise ValueError('Unknown node definition section', section)
+    if (section, protocol) in _plugins:
+        libname = _plugins[(section, protocol)]
+    elif section == 'health_check' and protocol == 'basic':
+        libname = libprefix.rstrip('.')
+    else:
+        libname = libprefix + protocol
+    return module, classname, libname
+
+def get_checker(section, protocol):
+    """Returns the schema checker of a node definition section, importing the
+    checker class and the plugin if necessary.
+
+    Checkers are instantiated only once per ``(section, protocol)``.
+    """
+    key = (section, protocol)
+    checker = _checkers.get(key)
+    if checker is None:
+        with _checkers_lock:
+            checker = _checkers.get(key)
+            if checker is None:
+                module, classname, libname = \
+                    plugin_modules(section, protocol)
+                checkerclass = getattr(importlib.import_module(module),
+                                       classname)
+                importlib.import_module(libname)
+                checker = checkerclass.instantiate(protocol=protocol)
+                _checkers[key] = checker
+    return checker
+
+def set_node_def_defaults(node_def):
+    """Fills in default values of a node definition entry in place."""
+    if isinstance(node_def, list):
+        for node in node_def:
+            if isinstance(node, dict) and \
+                    isinstance(node.get('health_check'), dict):
+                node['health_check'].setdefault('type', 'basic')
+
+def iter_node_def_errors(nodename, node_def):
+    """Checks a single node definition entry.
+
+    All sections of each implementation are checked, even if some of them
+    are invalid; a protocol without a plugin is reported as an error of its
+    section.
+
+    :returns: A generator yielding ``(msg, context)`` pairs; one for each
+        error found, in order.
+    """
+    if ':' not in nodename or nodename.split(':', 1)[0] != 'node_def':
+        context = "[SchemaCheck] ERROR in node %r: " % nodename
+        msg = "Node definition must begin with 'node_def:<nodename>'!"
+        yield msg, context
+        return
+    realnodename = nodename.split(':', 1)[1]
+    if type(node_def) != list:
+        context = "[SchemaCheck] ERROR in node %r: " % realnodename
+        msg = "Node definition has to be a list of dictionaries!"
+        yield msg, context
+        return
+    for nodeindex, node in enumerate(node_def):
+        #check for invalid sections:
+        invalid = [key for key in node
+                   if key not in ["resource", "config_management",
+                                  "contextualisation", "health_check"]]
+        for key in invalid:
+            context = "[SchemaCheck] ERROR in node %r: " % realnodename
+            yield "Invalid section %r" % key, context
+        for section, _, _, _ in NODE_DEF_SECTIONS:
+            try:
+                if section not in node:
+                    if section == 'resource':
+                        raise SchemaError("Missing 'resource' section!")
+                    continue
+                data = node[section]
+                if section == 'health_check':
+                    data.setdefault('type', 'basic')
+                if 'type' not in data:
+                    raise SchemaError("Missing key \'type\'" +
+                                      ("" if section == 'resource' else "!"))
+                try:
+                    checker = get_checker(section, data['type'])
+                except ImportError as e:
+                    raise SchemaError("Unknown type %r: %s"
+                                      % (data['type'], e))
+                checker.perform_check(data)
+            except SchemaError as e:
+                context = "[SchemaCheck] ERROR in %r section of node %r[%d]: " \
+                    % (section, realnodename, nodeindex)
+                yield e.msg, context
+
+def _check_node_def_entry(item):
+    # Worker function for the pool; must be picklable.
+    nodename, node_def = item
+    return list(iter_node_def_errors(nodename, node_def))
+
+def check_node_def_entries(items, workers=None, processes=False):
+    """Checks node definition entries completely.
+
+    :param items: ``(nodename, node_def)`` pairs.
+    :param int workers: If greater than one, the entries are checked in
+        parallel using this many workers.
+    :param bool processes: Use a process pool instead of a thread pool.
+    :returns: The list of the ``(msg, context)`` error pairs of each entry.
+    """
+    if workers and workers > 1:
+        import concurrent.futures as cf
+        poolclass = cf.ProcessPoolExecutor if processes \
+            else cf.ThreadPoolExecutor
+        with poolclass(max_workers=workers) as pool:
+            return list(pool.map(_check_node_def_entry, items))
+    return [_check_node_def_entry(item) for item in items]
+
+# Schema of infrastructure descriptions
+INFRA_KEYS = frozenset(['user_id', 'infra_name', 'nodes', 'dependencies',
+                        'variables'])
+NODE_KEYS = frozenset(['name', 'type', 'scaling', 'filter', 'variables'])
+SCALING_KEYS = frozenset(['min', 'max'])
+
+def _check_scaling(name, scaling, path):
+    if not isinstance(scaling, dict):
+        yield ("[SchemaCheck] ERROR: scaling of node %r has to be a dict!"
+               % name), path
+        return
+    for key in scaling:
+        if key not in SCALING_KEYS:
+            yield ("[SchemaCheck] ERROR: unknown key \"%r\" in scaling of "
+                   "node %r" % (key, name)), '%s.%s' % (path, key)
+
+def _check_filter(name, value, path):
+    if not isinstance(value, dict):
+        yield ("[SchemaCheck] ERROR: unknown type of filter in node %r - has "
+               "to be a dict!" % name), path
+
+# Checkers of the values of node keys, in the order they are checked
+NODE_VALUE_CHECKS = [
+    ('scaling', _check_scaling),
+    ('filter', _check_filter),
+]
+
+def _check_hostname(value, path, what):
+    if not isinstance(value, str):
+        yield ("[SchemaCheck] ERROR: %s %r has to be a string"
+               % (what, value)), path
+        return
+    error = is_valid_hostname(value)
+    if error:
+        yield ("[SchemaCheck] ERROR: {0} \"{1}\" {2}"
+               .format(what, value, error)), path
+
+def _iter_node_errors(node, path):
+    if not isinstance(node, dict):
+        yield "[SchemaCheck] ERROR: node has to be a dict!", path
+        return
+    name = node.get('name')
+    if name is None:
+        yield "[SchemaCheck] ERROR: missing key \"name\" in node", path
+    else:
+        for error in _check_hostname(name, path + '.name', 'node'):
+            yield error
+    if 'type' not in node:
+        yield ("[SchemaCheck] ERROR: missing key \"type\" in node %r"
+               % name), path
+    if 'scaling' not in node:
+        log.warning("[SchemaCheck] WARNING: missing \"scaling\" parameter "
+                    "in node %r, using default scaling (single instance)",
+                    name)
+    for key, check in NODE_VALUE_CHECKS:
+        if key in node:
+            for error in check(name, node[key], '%s.%s' % (path, key)):
+                yield error
+    for key in node:
+        if key not in NODE_KEYS:
+            yield ("[SchemaCheck] ERROR: unknown key \"%r\" in node %r"
+                   % (key, name)), '%s.%s' % (path, key)
+
+def iter_infra_desc_errors(infra_desc):
+    """Checks an infrastructure description in a single pass.
+
+    Warnings are logged.
+
+    :returns: A generator yielding ``(msg, path)`` pairs; one for each error
+        found, in order. ``path`` locates the offending item in the
+        description, e.g. ``nodes[2].scaling``.
+    """
+    if 'user_id' not in infra_desc:
+        log.warning("[SchemaCheck] WARNING: user_id is not defined in "
+                    "infrastructure description")
+    if 'infra_name' not in infra_desc:
+        yield ("[SchemaCheck] ERROR: infra_name must be defined in "
+               "infrastructure description"), 'infra_name'
+    else:
+        for error in _check_hostname(infra_desc['infra_name'], 'infra_name',
+                                     'infra_name'):
+            yield error
+    if 'nodes' not in infra_desc:
+        yield ("[SchemaCheck] ERROR: nodes section must be defined in "
+               "infrastructure description"), 'nodes'
+    else:
+        for i, node in enumerate(infra_desc['nodes'] or ()):
+            for error in _iter_node_errors(node, 'nodes[%d]' % i):
+                yield error
+    if 'dependencies' not in infra_desc:
+        log.warning("[SchemaCheck] WARNING: no dependencies specified - "
+                    "using sequential ordering")
+    else:
+        for i, dep in enumerate(infra_desc['dependencies'] or ()):
+            if isinstance(dep, dict) and 'connection' not in dep:
+                yield ("[SchemaCheck] ERROR: undefined connection "), \
+                    'dependencies[%d]' % i
+    for key in infra_desc:
+        if key not in INFRA_KEYS:
+            yield ("[SchemaCheck] ERROR: unknown key %r in infastructure "
+                   "description" % key), key
+
 class SchemaChecker(object):
     @staticmethod
-    def check_infra_desc(infra_desc):
-        import logging
-        log = logging.getLogger('occo')
-
-        keys = list(infra_desc.keys())
-        if 'user_id' not in keys:
-            log.warning("[SchemaCheck] WARNING: user_id is not defined in infrastructure description")
-        if 'infra_name' not in keys:
-            raise SchemaError("[SchemaCheck] ERROR: infra_name must be defined in infrastructure description")
-        error = is_valid_hostname(infra_desc['infra_name'])
-        if error:
-            raise SchemaError("[SchemaCheck] ERROR: infra_name \"{0}\" {1}".format(infra_desc['infra_name'],str(error)))
-        if 'nodes' not in keys:
-            raise SchemaError("[SchemaCheck] ERROR: nodes section must be defined in infrastructure description")
-        for node in infra_desc['nodes']:
-            nodekeys = list(node.keys())
-            if 'name' not in nodekeys:
-                raise SchemaError("[SchemaCheck] ERROR: missing key \"name\" in node")
-            error = is_valid_hostname(node['name'])
-            if error:
-                raise SchemaError("[SchemaCheck] ERROR: node \"{0}\" {1}".format(node['name'],str(error)))
-            if 'type' not in nodekeys:
-                raise SchemaError("[SchemaCheck] ERROR: missing key \"type\" in node %r" % node['name'])
-            if 'scaling' not in nodekeys:
-                log.warning("[SchemaCheck] WARNING: missing \"scaling\" parameter in node %r, using default scaling (single instance)",node['name'])
-            else:
-                for key in node['scaling']:
-                    if key not in ['min', 'max']:
-                        raise SchemaError("[SchemaCheck] ERROR: unknown key \"%r\" in scaling of node %r" % (key, node['name']))
-            if 'filter' in nodekeys and not isinstance(node['filter'], dict):
-                raise SchemaError("[SchemaCheck] ERROR: unknown type of filter in node %r - has to be a dict!" % node['name'])
-            for key in nodekeys:
-                if key not in ['name', 'type', 'scaling', 'filter', 'variables']:
-                    raise SchemaError("[SchemaCheck] ERROR: unknown key \"%r\" in node %r" % (key, node['name']))
-        if 'dependencies' not in keys:
-            log.warning("[SchemaCheck] WARNING: no dependencies specified - using sequential ordering")
+    def check_infra_desc(infra_desc, aggregate=False):
+        """Checks an infrastructure description.
+
+        :param bool aggregate: Check the whole description and report all
+            errors at once (:exc:`SchemaErrorReport`) instead of stopping at
+            the first one. The context of each error is its path in the
+            description (see :func:`iter_infra_desc_errors`).
+
+        :raises SchemaError: if the description is invalid. With
+            ``aggregate``, this is a :exc:`SchemaErrorReport`.
+        """
+        errors = iter_infra_desc_errors(infra_desc)
+        if aggregate:
+            errors = [(msg, path + ': ') for msg, path in errors]
+            if errors:
+                raise SchemaErrorReport(errors)
         else:
-            for dep in infra_desc['dependencies']:
-                if isinstance(dep, dict):
-                    depkeys = list(dep.keys())
-                    if 'connection' not in depkeys:
-                        raise SchemaError("[SchemaCheck] ERROR: undefined connection ")
-        for key in keys:
-            if key not in ['user_id', 'infra_name', 'nodes', 'dependencies', 'variables']:
-                raise SchemaError("[SchemaCheck] ERROR: unknown key %r in infastructure description" % key)
-    
+            for msg, _ in errors:
+                raise SchemaError(msg)
+
     @staticmethod
-    def check_node_def(node_defs):
-        for nodename, node_def in list(node_defs.items()):
-            if ':' not in nodename or nodename.split(':', 1)[0] != 'node_def':
-                context = "[SchemaCheck] ERROR in node %r: " % nodename
-                msg = "Node definition must begin with 'node_def:<nodename>'!"
-                raise SchemaError(msg, context)
-            realnodename = nodename.split(':', 1)[1]
-            if type(node_def) != list:
-                context = "[SchemaCheck] ERROR in node %r: " % realnodename
-                msg = "Node definition has to be a list of dictionaries!"
-                raise SchemaError(msg, context)
-            for node in node_def:
-                #check for invalid sections:
-                for key in node:
-                    if key not in ["resource", "config_management",
-                            "contextualisation", "health_check"]:
-                        context = "[SchemaCheck] ERROR in node %r: " % realnodename
-                        msg = "Invalid section %r" % key
-                        raise SchemaError(msg, context)
-                nodeindex = node_def.index(node)
-                #resource section
-                try:
-                    if 'resource' not in node:
-                        raise SchemaError("Missing 'resource' section!")
-                    else:
-                        resource = node['resource']
-                        if 'type' not in resource:
-                            raise SchemaError("Missing key \'type\'")
-                        else:
-                            protocol = resource['type']
-                            libname = "occo.plugins.resourcehandler." + protocol
-                            importlib.import_module(libname)
-                            checker = RHSchemaChecker.instantiate(protocol=protocol)
-                            checker.perform_check(resource)
-                except SchemaError as e:
-                    context = "[SchemaCheck] ERROR in 'resource' section of node %r[%d]: " % (realnodename, nodeindex)
-                    raise SchemaError(e.msg, context)
-                #config_manager section
-                try:
-                    if 'config_management' in node:
-                        cm = node['config_management']
-                        if 'type' not in cm:
-                            raise SchemaError("Missing key \'type\'!")
-                        else:
-                            protocol = cm['type']
-                            libname = "occo.plugins.configmanager." + protocol
-                            importlib.import_module(libname)
-                            checker = CMSchemaChecker.instantiate(protocol=protocol)
-                            checker.perform_check(cm)
-                except SchemaError as e:
-                    context = "[SchemaCheck] ERROR in 'config_management' section of node %r[%d]: " % (realnodename, nodeindex)
-                    raise SchemaError(e.msg, context)
-                
-                #contextualization section
-                try:
-                    if 'contextualisation' in node:
-                        cont = node['contextualisation']
-                        if 'type' not in cont:
-                            raise SchemaError("Missing key \'type\'!")
-                        else:
-                            protocol = cont['type']
-                            libname = "occo.plugins.infraprocessor.node_resolution." + protocol
-                            importlib.import_module(libname)
-                            checker = ContextSchemaChecker.instantiate(protocol=protocol)
-                            checker.perform_check(cont)
-                except SchemaError as e:
-                    context = "[SchemaCheck] ERROR in 'contextualisation' section of node %r[%d]: " % (realnodename, nodeindex)
-                    raise SchemaError(e.msg, context)
-                        
-                #health_check section
-                try:
-                    if 'health_check' in node:
-                        hc = node['health_check']
-                        if 'type' not in hc:
-                            hc['type'] = 'basic'
-                        if hc['type'] == 'basic':
-                            libname = "occo.infraprocessor.synchronization"
-                        else:
-                            libname = "occo.infraprocessor.synchronization." + hc['type']
-                        importlib.import_module(libname)
-                        checker = HCSchemaChecker.instantiate(protocol=hc['type'])
-                        checker.perform_check(hc)
-                except SchemaError as e:
-                    context = "[SchemaCheck] ERROR in 'health_check' section of node %r[%d]: " % (realnodename, nodeindex)
-                    raise SchemaError(e.msg, context)
+    def check_node_def(node_defs, aggregate=False, workers=None,
+                       processes=False, cache=None):
+        """Checks node definitions.
+
+        Plugin schema checkers are instantiated once per section and protocol
+        (see :func:`get_checker`).
+
+        :param dict node_defs: The node definitions, ``node_def:<name>`` keys
+            mapped to the list of implementations.
+        :param bool aggregate: Check all node definitions and report all errors
+            at once (:exc:`SchemaErrorReport`) instead of stopping at the first
+            one.
+        :param int workers: If greater than one, node definitions are checked
+            in parallel using this many workers.
+        :param bool processes: Use a process pool instead of a thread pool.
+        :param cache: A :class:`~occo.compiler.nodedef_cache.NodeDefCache`;
+            only entries not found in it are checked (completely, so their
+            results can be stored).
+
+        :raises SchemaError: if a node definition is invalid. With
+            ``aggregate``, this is a :exc:`SchemaErrorReport`.
+        """
+        items = list(node_defs.items())
+        for _, node_def in items:
+            set_node_def_defaults(node_def)
+
+        if cache is not None or (workers and workers > 1):
+            results = cache.check_entries(items, workers, processes) \
+                if cache is not None \
+                else check_node_def_entries(items, workers, processes)
+            errors = [e for result in results for e in result]
+        elif aggregate:
+            errors = [e for item in items
+                      for e in iter_node_def_errors(*item)]
+        else:
+            errors = list()
+            for item in items:
+                for error in iter_node_def_errors(*item):
+                    errors.append(error)
+                    break
+                if errors:
+                    break
+
+        if errors:
+            if aggregate:
+                raise SchemaErrorReport(errors)
+            msg, context = errors[0]
+            raise SchemaError(msg, context)
@@ -0,0 +1,190 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Binary serialization of compiled infrastructure descriptions.
+
+Loading a serialized :class:`~occo.compiler.StaticDescription` rebuilds it
+without schema checking and topological ordering.
+
+Format (little endian):
+
+================  =========================================================
+header            ``<6sHHIIIQQQ``: magic (``OCCOSD``), format version,
+                  flags (reserved), number of nodes, edges and levels, and
+                  the length of the three data blocks.
+edges             ``int32[2 * edges]``: (dependent, dependee) node index
+                  pairs.
+levels            ``int32[nodes]``: topological level of each node.
+meta block        Infrastructure level data.
+node block        Node descriptions (without ``mappings``, which are
+                  rebuilt from the edges). Layered variables are stored
+                  as exported by :meth:`VariableView.export`.
+edge block        Mappings and extra information of the edges.
+================  =========================================================
+
+Data blocks are pickled, so serialized descriptions must only be loaded from
+trusted sources. Only the two arrays are read directly from the buffer (on
+little endian hosts); the data blocks are unpickled, i.e. copied into new
+objects, even when loading from a memory mapped file (:func:`load_file`).
+
+.. autofunction:: dumps
+.. autofunction:: loads
+.. autofunction:: load_file
+"""
+
+__all__ = ['dumps', 'loads', 'load_file', 'FORMAT_VERSION']
+
+import array
+import mmap
+import pickle
+import struct
+import sys
+from occo.compiler import StaticDescription, TopoLevel
+from occo.compiler.variables import VariableView
+
+MAGIC = b'OCCOSD'
+FORMAT_VERSION = 2
+HEADER = struct.Struct('<6sHHIIIQQQ')
+
+def _pack(data):
+    return pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+def _int32_array(values):
+    a = array.array('i', values)
+    if sys.byteorder != 'little':
+        a.byteswap()
+    return a.tobytes()
+
+def _int32_view(buf, offset, count, view):
+    data = view(buf[offset:offset + 4 * count])
+    if sys.byteorder != 'little':
+        a = array.array('i')
+        a.frombytes(data)
+        a.byteswap()
+        return a
+    return view(data.cast('i'))
+
+def dumps(static_description):
+    """Serializes a compiled infrastructure description.
+
+    Lazy descriptions are fully prepared first.
+
+    :rtype: :class:`bytes`
+    """
+    sd = static_description
+    sd.prepare_all()
+    index = dict((id(n), i) for i, n in enumerate(sd.nodes))
+
+    nodes, layered = list(), list()
+    for i, n in enumerate(sd.nodes):
+        n = dict(n)
+        n.pop('mappings', None)
+        variables = n.get('variables')
+        if isinstance(variables, VariableView):
+            # The shared infrastructure variables are stored only once
+            n['variables'] = variables.export()
+            layered.append(i)
+        nodes.append(n)
+
+    pairs, edges = list(), list()
+    for e in sd.edges:
+        pairs.extend((index[id(e.dependent)], index[id(e.dependee)]))
+        edges.append((e.mappings, e.extras or None))
+
+    levels = [0] * len(sd.nodes)
+    for l, level in enumerate(sd._order):
+        for n in level:
+            levels[index[id(n)]] = l
+
+    meta = dict((attr, getattr(sd, attr))
+                for attr in StaticDescription.INFRA_ATTRIBUTES)
+    meta['layered_nodes'] = layered
+    meta = _pack(meta)
+    nodes, edges = _pack(nodes), _pack(edges)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0,
+                         len(sd.nodes), len(sd.edges), len(sd._order),
+                         len(meta), len(nodes), len(edges))
+    return b''.join([header, _int32_array(pairs), _int32_array(levels),
+                     meta, nodes, edges])
+
+def loads(buf):
+    """Rebuilds a compiled infrastructure description.
+
+    :param buf: The serialized description; any object supporting the buffer
+        protocol (:class:`bytes`, :class:`memoryview`, :class:`mmap.mmap`,
+        ...).
+    :rtype: :class:`~occo.compiler.StaticDescription`
+    :raises ValueError: if the data is not a serialized description or its
+        format version is not supported.
+
+    The data blocks are unpickled: never load data from untrusted sources.
+    """
+    views = list()
+    def view(v):
+        views.append(v)
+        return v
+    try:
+        return _loads(view(memoryview(buf)), view)
+    finally:
+        # Views left to a traceback would keep a memory mapped file from being
+        # closed (BufferError), hiding the original error
+        for v in reversed(views):
+            v.release()
+
+def _loads(buf, view):
+    if len(buf) < HEADER.size:
+        raise ValueError('Truncated data')
+    magic, version, _, node_count, edge_count, level_count, \
+        meta_len, nodes_len, edges_len = HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise ValueError('Not a serialized infrastructure description')
+    if version != FORMAT_VERSION:
+        raise ValueError('Unsupported format version', version)
+    offset = HEADER.size
+    pairs = _int32_view(buf, offset, 2 * edge_count, view)
+    offset += 8 * edge_count
+    levels = _int32_view(buf, offset, node_count, view)
+    offset += 4 * node_count
+    if len(buf) != offset + meta_len + nodes_len + edges_len:
+        raise ValueError('Truncated data')
+    meta = pickle.loads(view(buf[offset:offset + meta_len]))
+    offset += meta_len
+    nodes = pickle.loads(view(buf[offset:offset + nodes_len]))
+    offset += nodes_len
+    edge_data = pickle.loads(view(buf[offset:offset + edges_len]))
+
+    for i in meta['layered_nodes']:
+        nodes[i]['variables'] = VariableView.from_layers(
+            meta['variables'], *nodes[i]['variables'])
+    connections = [(nodes[pairs[2 * i]], nodes[pairs[2 * i + 1]],
+                    mappings, extras)
+                   for i, (mappings, extras) in enumerate(edge_data)]
+    order = [TopoLevel() for _ in range(level_count)]
+    for n, l in zip(nodes, levels):
+        order[l].append(n)
+    return StaticDescription._assemble(meta, nodes, connections, order)
+
+def load_file(path):
+    """Loads a serialized description from a file, memory mapping it.
+
+    Only the edge and level arrays are read in place; the data blocks are
+    unpickled (see :func:`loads`), so the file must be trusted.
+    """
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            view = memoryview(m)
+            try:
+                return loads(view)
+            finally:
+                view.release()
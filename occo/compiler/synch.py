@@ -0,0 +1,66 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Synchronization index of attribute mappings.
+
+An attribute mapping with ``synch=True`` (see
+:func:`~occo.compiler.create_mapping`) means that the dependent node must wait
+until the dependee node exports the attribute. :class:`SynchIndex` collects
+these once, so the waits of a node, and the nodes waiting for an exported
+attribute, are looked up in O(1) instead of scanning the mappings of nodes.
+
+The first item of ``attributes`` in a mapping is the attribute of the
+dependee (upstream) node.
+
+.. autoclass:: SynchIndex
+    :members:
+"""
+
+__all__ = ['SynchIndex']
+
+_EMPTY = frozenset()
+
+class SynchIndex(object):
+    """Index of the synchronized attribute mappings of an infrastructure.
+
+    :param edges: The :class:`~occo.compiler.Edge`\\ s of the infrastructure.
+
+    :var waits: The name of each node that has to wait, mapped to the
+        :class:`frozenset` of the ``(upstream node, attribute)`` pairs it has
+        to wait for.
+    :var waiters: Each ``(upstream node, attribute)`` pair, mapped to the
+        :class:`frozenset` of the names of the nodes waiting for it.
+    """
+    def __init__(self, edges):
+        waits, waiters = dict(), dict()
+        for e in edges:
+            dependent = e.dependent['name']
+            for m in e.attribute_mappings:
+                if not m.get('synch'):
+                    continue
+                key = e.dependee['name'], m['attributes'][0]
+                waits.setdefault(dependent, set()).add(key)
+                waiters.setdefault(key, set()).add(dependent)
+        self.waits = dict((k, frozenset(v)) for k, v in waits.items())
+        self.waiters = dict((k, frozenset(v)) for k, v in waiters.items())
+
+    def waits_for(self, name):
+        """The ``(upstream node, attribute)`` pairs the node has to wait
+        for."""
+        return self.waits.get(name, _EMPTY)
+
+    def waiting_for(self, node, attribute):
+        """The names of the nodes waiting for the node to export the
+        attribute."""
+        return self.waiters.get((node, attribute), _EMPTY)
@@ -0,0 +1,189 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Layered, copy-on-write variable inheritance.
+
+Nodes inherit the variables of the infrastructure; variables specified in the
+node description are preferred (see :func:`occo.util.dict_merge`). Merging
+copies the infrastructure variables into each node, which is expensive if they
+are large. A :class:`VariableView` presents the same merged content, but it
+only references the two layers, and copies values only when they are
+accessed (mutable values) or modified.
+
+.. autoclass:: VariableView
+    :members:
+"""
+
+__all__ = ['VariableView']
+
+import collections.abc
+import copy
+
+_EMPTY = dict()
+
+# Immutable values need not be copied upon access
+_IMMUTABLE = (str, bytes, int, float, bool, type(None), tuple, frozenset)
+
+class VariableView(collections.abc.MutableMapping):
+    """A mapping merging two layers of variables like
+    :func:`occo.util.dict_merge` would: items of ``own`` are preferred, and
+    nested mappings present in both layers are merged recursively.
+
+    Neither layer is ever modified. Modifications are stored in the view
+    itself. Mutable values (other than mappings, which are represented by
+    nested views) are copied upon first access, so modifying them in place
+    does not affect the shared layers either.
+
+    Memory and construction time are constant, regardless of the size of the
+    layers. However, the copies of mutable values (e.g. lists) are kept in
+    the view, so reading them (also e.g. by ``dict(view)``) costs memory in
+    each node, proportional to their size. :meth:`materialize` does not keep
+    copies.
+
+    :param dict base: The inherited (shared) variables.
+    :param dict own: The variables specified for this node.
+    """
+    __slots__ = ('base', 'own', '_local', '_deleted')
+
+    def __init__(self, base, own):
+        self.base = base if base is not None else _EMPTY
+        self.own = own if own is not None else _EMPTY
+        self._local = None
+        self._deleted = None
+
+    def _merged(self, key):
+        # The merged value of ``key``, from the two layers; nested mappings
+        # are represented by new views, other values are not copied. Raises
+        # KeyError.
+        in_own, in_base = key in self.own, key in self.base
+        if in_own:
+            value = self.own[key]
+            if isinstance(value, dict):
+                base = self.base[key] if in_base else None
+                return VariableView(base if isinstance(base, dict) else None,
+                                    value)
+        elif in_base:
+            value = self.base[key]
+            if isinstance(value, dict):
+                return VariableView(value, None)
+        else:
+            raise KeyError(key)
+        return value
+
+    def __getitem__(self, key):
+        if self._local and key in self._local:
+            return self._local[key]
+        if self._deleted and key in self._deleted:
+            raise KeyError(key)
+        value = self._merged(key)
+        if isinstance(value, _IMMUTABLE):
+            return value
+        if not isinstance(value, VariableView):
+            value = copy.deepcopy(value)
+        # Keep the copy (or view), so modifications made to it persist
+        if self._local is None:
+            self._local = dict()
+        self._local[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        if self._local is None:
+            self._local = dict()
+        self._local[key] = value
+        if self._deleted:
+            self._deleted.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if self._local:
+            self._local.pop(key, None)
+        if key in self.own or key in self.base:
+            if self._deleted is None:
+                self._deleted = set()
+            self._deleted.add(key)
+
+    def __contains__(self, key):
+        if self._local and key in self._local:
+            return True
+        if self._deleted and key in self._deleted:
+            return False
+        return key in self.own or key in self.base
+
+    def __iter__(self):
+        # Same order as dict_merge: inherited keys first
+        deleted = self._deleted or ()
+        local = self._local or _EMPTY
+        for key in self.base:
+            if key not in deleted:
+                yield key
+        for key in self.own:
+            if key not in self.base and key not in deleted:
+                yield key
+        for key in local:
+            if key not in self.base and key not in self.own:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return 'VariableView({0!r})'.format(self.materialize())
+
+    def export(self):
+        """The node specific layers of the view, e.g. for serialization.
+
+        :returns: ``(own, local, deleted)``: the ``own`` layer; the values set
+            in the view or copied upon access (:class:`dict`, with nested
+            views materialized); and the keys deleted (:class:`list`). The
+            latter two are :data:`None` if empty. The shared ``base`` layer
+            is not included; see :meth:`from_layers`.
+        """
+        local = None
+        if self._local:
+            local = dict((key, value.materialize()
+                          if isinstance(value, VariableView) else value)
+                         for key, value in self._local.items())
+        deleted = list(self._deleted) if self._deleted else None
+        return self.own, local, deleted
+
+    @classmethod
+    def from_layers(cls, base, own, local=None, deleted=None):
+        """Rebuilds a view from the shared ``base`` layer and the layers
+        returned by :meth:`export`."""
+        view = cls(base, own)
+        if local:
+            view._local = dict(local)
+        if deleted:
+            view._deleted = set(deleted)
+        return view
+
+    def materialize(self):
+        """Creates a plain, independent :class:`dict` of the merged content.
+
+        Nested views are materialized recursively.
+        """
+        result = dict()
+        for key in self:
+            # Values are not kept in the view, unlike upon access
+            if self._local and key in self._local:
+                value = self._local[key]
+            else:
+                value = self._merged(key)
+            if isinstance(value, VariableView):
+                value = value.materialize()
+            elif not isinstance(value, _IMMUTABLE):
+                value = copy.deepcopy(value)
+            result[key] = value
+        return result
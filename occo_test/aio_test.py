@@ -0,0 +1,128 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import asyncio
+import concurrent.futures
+import threading
+import time
+import occo.compiler as compiler
+from occo.compiler.aio import compile_async, CallerLimits
+from occo.compiler.cycles import CycleError
+from occo.exceptions import SchemaError
+from occo_test.static_description_test import diamond
+from occo_test.loader_test import infra
+
+def names(sd):
+    return [[n['name'] for n in l] for l in sd.topological_order]
+
+def cyclic():
+    desc = diamond()
+    A, D = desc['nodes'][0], desc['nodes'][3]
+    desc['dependencies'].append([A, D])
+    return desc
+
+class CountingExecutor(concurrent.futures.ThreadPoolExecutor):
+    """Records the maximum number of jobs running at once; each job is
+    delayed."""
+    def __init__(self, delay):
+        concurrent.futures.ThreadPoolExecutor.__init__(self, max_workers=8)
+        self.delay, self.running, self.peak = delay, 0, 0
+        self.lock = threading.Lock()
+    def submit(self, fn, *args):
+        def job():
+            with self.lock:
+                self.running += 1
+                self.peak = max(self.peak, self.running)
+            try:
+                time.sleep(self.delay)
+                return fn(*args)
+            finally:
+                with self.lock:
+                    self.running -= 1
+        return concurrent.futures.ThreadPoolExecutor.submit(self, job)
+
+class CompileAsyncTest(unittest.TestCase):
+    def test_compile(self):
+        sd = asyncio.run(compile_async(infra.format('x'), lazy=True))
+        self.assertIsInstance(sd, compiler.StaticDescription)
+        self.assertTrue(sd.lazy)
+        self.assertEqual(sd.name, 'x')
+        self.assertEqual(names(sd), [['A'], ['B']])
+
+    def test_schema_error(self):
+        with self.assertRaises(SchemaError):
+            asyncio.run(compile_async(dict(nodes=[])))
+        with self.assertRaises(CycleError):
+            asyncio.run(compile_async(cyclic()))
+
+    def test_processes(self):
+        with concurrent.futures.ProcessPoolExecutor(1) as executor:
+            sd = asyncio.run(compile_async(diamond(), executor))
+            self.assertEqual(names(sd), [['A'], ['B', 'C'], ['D']])
+            with self.assertRaises(CycleError) as ctx:
+                asyncio.run(compile_async(cyclic(), executor))
+        self.assertEqual(ctx.exception.cycle, ['A', 'D', 'B'])
+
+    def test_processes_lazy(self):
+        with concurrent.futures.ProcessPoolExecutor(1) as executor:
+            sd = asyncio.run(compile_async(diamond(), executor, lazy=True))
+            with self.assertRaises(CycleError):
+                asyncio.run(compile_async(cyclic(), executor, lazy=True))
+        self.assertIn('_order', sd.__dict__)
+        self.assertEqual(sd._unprepared, set())
+        D = dict.__getitem__(sd.node_lookup, 'D')
+        self.assertEqual(sorted(D['mappings']['inbound']), ['B', 'C'])
+        self.assertEqual(D['infra_id'], sd.infra_id)
+        self.assertEqual(names(sd), [['A'], ['B', 'C'], ['D']])
+
+    def test_timeout(self):
+        limits = CallerLimits(1)
+        with CountingExecutor(0.3) as executor:
+            async def main():
+                with self.assertRaises(asyncio.TimeoutError):
+                    await compile_async(diamond(), executor, timeout=0.05,
+                                        caller='a', limits=limits)
+                # The slot is held until the compilation has finished
+                self.assertEqual(limits.pending('a'), 1)
+                with self.assertRaises(asyncio.TimeoutError):
+                    await compile_async(diamond(), executor, timeout=0.05,
+                                        caller='a', limits=limits)
+                sd = await compile_async(diamond(), executor, caller='a',
+                                         limits=limits)
+                self.assertEqual(limits.pending('a'), 0)
+                return sd
+            self.assertEqual(len(asyncio.run(main()).nodes), 4)
+            self.assertEqual(executor.peak, 1)
+
+    def test_limits(self):
+        limits = CallerLimits(2)
+        with CountingExecutor(0.05) as executor:
+            async def main():
+                jobs = [compile_async(diamond(), executor, caller=caller,
+                                      limits=limits)
+                        for caller in 'aaaaab']
+                return await asyncio.gather(*jobs)
+            self.assertEqual(len(asyncio.run(main())), 6)
+        self.assertEqual(executor.peak, 3)
+
+    def test_cancel(self):
+        with CountingExecutor(0.2) as executor:
+            async def main():
+                task = asyncio.ensure_future(compile_async(diamond(),
+                                                           executor))
+                await asyncio.sleep(0.01)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+            asyncio.run(main())
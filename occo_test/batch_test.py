@@ -0,0 +1,101 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import os
+from occo.compiler.batch import compile_many, _portable, _make_result
+from occo.exceptions import SchemaError
+from occo.compiler.cycles import CycleError
+from occo_test.static_description_test import diamond
+
+def descriptions():
+    descs = [dict(diamond(), infra_name='d{0}'.format(i)) for i in range(7)]
+    descs[3]['infra_name'] = 'invalid.name'
+    return descs
+
+class Unpicklable(object):
+    """Can only be pickled in the process that created it."""
+    def __init__(self, pid=None):
+        self.pid = pid or os.getpid()
+    def __reduce__(self):
+        if os.getpid() != self.pid:
+            raise TypeError('Cannot pickle in another process')
+        return Unpicklable, (self.pid,)
+
+class BadError(Exception):
+    """Cannot be unpickled: the constructor has extra arguments."""
+    def __init__(self, msg, code):
+        Exception.__init__(self, msg)
+
+class CompileManyTest(unittest.TestCase):
+    def assertBatch(self, **kwargs):
+        results = sorted(compile_many(descriptions(), **kwargs),
+                         key=lambda r: r.index)
+        self.assertEqual([r.index for r in results], list(range(7)))
+        self.assertEqual([r.ok for r in results],
+                         [True, True, True, False, True, True, True])
+        self.assertIsInstance(results[3].error, SchemaError)
+        self.assertIsNone(results[3].description)
+        self.assertEqual(results[6].description.name, 'd6')
+        self.assertEqual(len(results[0].description.topological_order), 3)
+
+    def test_inline(self):
+        self.assertBatch(workers=1)
+    def test_pool(self):
+        self.assertBatch(workers=2)
+    def test_chunks(self):
+        self.assertBatch(workers=2, chunksize=3)
+
+    def test_input_unchanged(self):
+        for workers in (1, 2):
+            descs = descriptions()
+            list(compile_many(descs, workers=workers))
+            self.assertNotIn('mappings', descs[0]['nodes'][0])
+
+    def test_error_types(self):
+        descs = descriptions()
+        A, D = descs[1]['nodes'][0], descs[1]['nodes'][3]
+        descs[1]['dependencies'].append([A, D])
+        for workers in (1, 2):
+            results = sorted(compile_many(descs, workers=workers),
+                             key=lambda r: r.index)
+            self.assertIsInstance(results[1].error, CycleError)
+            self.assertEqual(results[1].error.cycle, ['A', 'D', 'B'])
+            self.assertIs(type(results[3].error), SchemaError)
+
+    def test_unpicklable_error(self):
+        error = _portable(BadError('x', 1))
+        self.assertEqual(error, ('BadError', 'x'))
+        result = _make_result(0, None, error)
+        self.assertIsInstance(result.error, RuntimeError)
+        self.assertEqual(str(result.error), 'BadError: x')
+
+    def test_chunk_failure(self):
+        descs = descriptions()
+        descs[4]['dependencies'][0]['probe'] = Unpicklable()
+        results = sorted(compile_many(descs, workers=2, chunksize=2),
+                         key=lambda r: r.index)
+        self.assertEqual([r.ok for r in results],
+                         [True, True, True, False, False, False, True])
+        self.assertIsInstance(results[4].error, Exception)
+        self.assertIs(results[4].error, results[5].error)
+        self.assertIsInstance(results[3].error, SchemaError)
+
+    def test_invalid_chunksize(self):
+        with self.assertRaises(ValueError):
+            compile_many(descriptions(), chunksize=0)
+
+    def test_invalid_workers(self):
+        for workers in (0, -1):
+            with self.assertRaises(ValueError):
+                compile_many(descriptions(), workers=workers)
@@ -0,0 +1,110 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import shutil
+import tempfile
+from occo.compiler.cache import CompileCache, description_key
+from occo_test.static_description_test import diamond
+
+def levels(sd):
+    return [sorted(n['name'] for n in l) for l in sd.topological_order]
+
+class CompileCacheTest(unittest.TestCase):
+    def test_key_is_canonical(self):
+        a = dict(infra_name='x', user_id='u', nodes=[])
+        b = dict(nodes=[], user_id='u', infra_name='x')
+        self.assertEqual(description_key(a), description_key(b))
+        self.assertNotEqual(description_key(a),
+                            description_key(dict(a, user_id=1)))
+
+    def test_hit_restamps_infra_id(self):
+        cache = CompileCache()
+        first = cache.compile(diamond(), 'id-1')
+        second = cache.compile(diamond(), 'id-2')
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(second.infra_id, 'id-2')
+        self.assertTrue(all(n['infra_id'] == 'id-2' for n in second.nodes))
+        self.assertEqual(first.infra_id, 'id-1')
+        self.assertEqual(levels(first), levels(second))
+        self.assertEqual(second.node_lookup['D']['mappings'],
+                         first.node_lookup['D']['mappings'])
+        # Edges still reference the node objects
+        self.assertIs(second.inbound_edges('D')[0].dependent,
+                      second.node_lookup['D'])
+
+    def test_same_dict(self):
+        cache = CompileCache()
+        desc = diamond()
+        first = cache.compile(desc)
+        self.assertEqual(desc, diamond())
+        second = cache.compile(desc)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertIsNot(second.nodes[0], desc['nodes'][0])
+        self.assertTrue(first.compile_stats.phases)
+        self.assertEqual(second.compile_stats.phases, dict())
+        self.assertEqual(second.compile_stats.nodes, 4)
+
+    def test_hits_are_independent(self):
+        cache = CompileCache()
+        cache.compile(diamond())
+        one, other = cache.compile(diamond()), cache.compile(diamond())
+        self.assertIsNot(one.node_lookup['A'], other.node_lookup['A'])
+
+    def test_eviction(self):
+        cache = CompileCache(maxsize=2)
+        desc = lambda i: dict(diamond(), infra_name='d{0}'.format(i))
+        for i in range(3):
+            cache.compile(desc(i))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(len(cache), 2)
+        self.assertNotIn(desc(0), cache)
+        self.assertIn(desc(2), cache)
+
+    def test_invalidate(self):
+        cache = CompileCache()
+        cache.compile(diamond())
+        self.assertTrue(cache.invalidate(diamond()))
+        self.assertFalse(cache.invalidate(diamond()))
+        cache.compile(diamond())
+        self.assertEqual(cache.stats()['misses'], 2)
+
+class DiskCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_disk_tier(self):
+        CompileCache(directory=self.directory).compile(diamond(), 'id-1')
+        cache = CompileCache(directory=self.directory)
+        sd = cache.compile(diamond(), 'id-2')
+        self.assertEqual(cache.stats()['disk_hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 0)
+        self.assertEqual(sd.infra_id, 'id-2')
+        self.assertEqual(levels(sd), [['A'], ['B', 'C'], ['D']])
+
+    def test_invalidate_disk(self):
+        CompileCache(directory=self.directory).compile(diamond())
+        cache = CompileCache(directory=self.directory)
+        cache.clear()
+        cache.compile(diamond())
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_corrupt_entry(self):
+        cache = CompileCache(directory=self.directory)
+        with open(cache._path(description_key(diamond())), 'wb') as f:
+            f.write(b'garbage')
+        sd = cache.compile(diamond())
+        self.assertEqual(levels(sd), [['A'], ['B', 'C'], ['D']])
@@ -0,0 +1,216 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import random
+import occo.compiler as compiler
+from occo.exceptions import SchemaError
+from occo.compiler.cycles import CycleError
+from occo_test.static_description_test import diamond
+
+def levels(sd):
+    return [sorted(n['name'] for n in l) for l in sd.topological_order]
+
+def recompile(sd):
+    """Compiles the current graph of ``sd`` from scratch."""
+    nodes = dict((n['name'], dict(name=n['name'], type=n['type']))
+                 for n in sd.nodes)
+    deps = [dict(connection=[nodes[e.dependent['name']],
+                             nodes[e.dependee['name']]],
+                 mappings=e.mappings)
+            for e in sd.edges]
+    return compiler.StaticDescription(dict(
+        infra_name=sd.name, user_id=sd.user_id, variables=sd.variables,
+        nodes=[nodes[n['name']] for n in sd.nodes], dependencies=deps))
+
+class ApplyDeltaTest(unittest.TestCase):
+    def setUp(self):
+        self.sd = compiler.StaticDescription(diamond())
+
+    def assertConsistent(self):
+        fresh = recompile(self.sd)
+        self.assertEqual(levels(self.sd), levels(fresh))
+        for n in self.sd.nodes:
+            self.assertEqual(n['mappings'],
+                             fresh.node_lookup[n['name']]['mappings'])
+        sd = self.sd
+        self.assertEqual(len(sd.dependencies), len(sd.edges))
+        self.assertEqual(sd._node_index, dict(
+            (n['name'], i) for i, n in enumerate(sd.nodes)))
+        self.assertEqual(sd._edge_index, dict(
+            (id(e), i) for i, e in enumerate(sd.edges)))
+        self.assertEqual(sd._level_index, dict(
+            (n['name'], i) for l in sd._order for i, n in enumerate(l)))
+        for index in (sd._inbound, sd._outbound):
+            for edges in index.values():
+                positions = [sd._edge_index[id(e)] for e in edges]
+                self.assertEqual(positions, sorted(positions))
+
+    def test_add_node(self):
+        E = dict(name='E', type='t')
+        changes = self.sd.apply_delta(added_nodes=[E],
+                                      added_edges=[['E', 'D']])
+        self.assertEqual(changes['levels'], set(['E']))
+        self.assertEqual(changes['mappings'], set(['D', 'E']))
+        self.assertIs(self.sd.node_lookup['E'], E)
+        self.assertEqual(E['infra_id'], self.sd.infra_id)
+        self.assertEqual(E['variables'], dict(x=1))
+        self.assertEqual(levels(self.sd), [['A'], ['B', 'C'], ['D'], ['E']])
+        self.assertConsistent()
+
+    def test_remove_node(self):
+        changes = self.sd.apply_delta(removed_nodes=['C'])
+        self.assertEqual(changes['levels'], set())
+        self.assertEqual(changes['mappings'], set(['A', 'D']))
+        self.assertNotIn('C', self.sd.node_lookup)
+        self.assertEqual(len(self.sd.edges), 2)
+        self.assertEqual(levels(self.sd), [['A'], ['B'], ['D']])
+        self.assertConsistent()
+
+    def test_replace_node(self):
+        for lazy in (False, True):
+            self.sd = compiler.StaticDescription(diamond(), lazy=lazy)
+            D = dict(name='D', type='u')
+            changes = self.sd.apply_delta(
+                added_nodes=[D], removed_nodes=['D'],
+                added_edges=[['D', 'B']])
+            self.assertEqual(changes['levels'], set(['D']))
+            self.assertEqual(changes['mappings'], set(['B', 'C', 'D']))
+            self.assertIs(self.sd.node_lookup['D'], D)
+            self.assertEqual(D['infra_id'], self.sd.infra_id)
+            self.assertIn('mappings', D)
+            self.assertEqual(levels(self.sd), [['A'], ['B', 'C'], ['D']])
+            self.assertConsistent()
+
+    def test_relevel_dependents_only(self):
+        nodes = [dict(name='hub', type='t')] + \
+            [dict(name='n{0}'.format(i), type='t') for i in range(50)]
+        desc = dict(infra_name='star', user_id='u', nodes=nodes,
+                    dependencies=[[n['name'], 'hub'] for n in nodes[1:]])
+        self.sd = compiler.StaticDescription(desc)
+        seeds = list()
+        relevel = self.sd._relevel
+        self.sd._relevel = lambda s: seeds.append(set(s)) or relevel(s)
+        changes = self.sd.apply_delta(added_nodes=[dict(name='x', type='t')],
+                                      added_edges=[['x', 'hub']])
+        self.assertEqual(changes['levels'], set(['x']))
+        self.assertEqual(changes['mappings'], set(['x', 'hub']))
+        self.sd.apply_delta(removed_nodes=['x'])
+        self.sd.apply_delta(removed_edges=[('n7', 'hub')])
+        self.assertEqual(seeds, [set(['x']), set(), set(['n7'])])
+        self.assertConsistent()
+
+    def test_lists_updated_in_place(self):
+        desc = diamond()
+        self.sd = compiler.StaticDescription(desc)
+        self.sd.apply_delta(removed_edges=[('D', 'B')],
+                            added_edges=[['D', 'A']])
+        self.assertIs(self.sd.dependencies, desc['dependencies'])
+        self.assertIs(self.sd.nodes, desc['nodes'])
+        self.assertEqual(len(desc['dependencies']), 4)
+        self.sd.apply_delta(removed_nodes=['B'])
+        self.assertEqual(sorted(n['name'] for n in desc['nodes']),
+                         ['A', 'C', 'D'])
+        self.assertConsistent()
+
+    def test_remove_edge(self):
+        changes = self.sd.apply_delta(removed_edges=[('D', 'C'), ('D', 'B')])
+        self.assertEqual(changes['levels'], set(['D']))
+        self.assertEqual(levels(self.sd), [['A', 'D'], ['B', 'C']])
+        self.assertConsistent()
+
+    def test_add_edge(self):
+        changes = self.sd.apply_delta(added_edges=[['C', 'B']])
+        self.assertEqual(changes['levels'], set(['C', 'D']))
+        self.assertEqual(levels(self.sd), [['A'], ['B'], ['C'], ['D']])
+        self.assertConsistent()
+
+    def test_parallel_edges(self):
+        A, B, C, D = [dict(name=n, type='t') for n in 'ABCD']
+        self.sd = compiler.StaticDescription(dict(
+            infra_name='p', user_id='u', nodes=[A, B, C, D],
+            dependencies=[[B, A],
+                          dict(connection=[D, C], mappings=[['a', 'b']]),
+                          [C, A], [D, B],
+                          dict(connection=[D, C], mappings=[['x', 'y']])]))
+        self.assertEqual(D['mappings']['inbound']['C'][0]['attributes'],
+                         ['x', 'y'])
+        # The last edge takes the place of the removed first one
+        changes = self.sd.apply_delta(removed_edges=[('B', 'A')])
+        self.assertEqual(self.sd.dependencies[0]['mappings'], [['x', 'y']])
+        self.assertEqual(D['mappings']['inbound']['C'][0]['attributes'],
+                         ['a', 'b'])
+        self.assertEqual(C['mappings']['outbound']['D'][0]['attributes'],
+                         ['a', 'b'])
+        self.assertTrue(set(['C', 'D']) <= changes['mappings'])
+        self.assertConsistent()
+
+    def test_cycle_rolls_back(self):
+        before = levels(self.sd)
+        with self.assertRaises(CycleError) as ctx:
+            self.sd.apply_delta(added_nodes=[dict(name='E', type='t')],
+                                added_edges=[['A', 'D'], ['E', 'A']])
+        self.assertEqual(ctx.exception.cycle, ['A', 'D', 'C'])
+        self.assertEqual(ctx.exception.components, [['A', 'B', 'C', 'D']])
+        self.assertEqual(levels(self.sd), before)
+        self.assertNotIn('E', self.sd.node_lookup)
+        self.assertEqual(self.sd.inbound_edges('A'), ())
+        self.assertEqual(self.sd.inbound_edges('E'), ())
+        self.assertConsistent()
+
+    def test_invalid(self):
+        with self.assertRaises(SchemaError):
+            self.sd.apply_delta(added_nodes=[dict(name='A', type='t')])
+        with self.assertRaises(SchemaError):
+            self.sd.apply_delta(added_edges=[['A', 'X']])
+        for node in [dict(name='E'), dict(name='E.x', type='t'),
+                     dict(name='E', type='t', scaling=dict(count=3)),
+                     dict(name='E', type='t', filter=[]),
+                     dict(name='E', type='t', foo=1)]:
+            with self.assertRaises(SchemaError):
+                self.sd.apply_delta(added_nodes=[node])
+            self.assertNotIn('E', self.sd.node_lookup)
+        with self.assertRaises(KeyError):
+            self.sd.apply_delta(removed_nodes=['X'])
+        with self.assertRaises(KeyError):
+            self.sd.apply_delta(removed_edges=[('A', 'D')])
+
+    def test_random(self):
+        rnd = random.Random(5)
+        nodes = [dict(name='n{0}'.format(i), type='t') for i in range(40)]
+        deps = [[nodes[j], nodes[i]] for i in range(40) for j in range(i+1, 40)
+                if rnd.random() < 0.1]
+        self.sd = compiler.StaticDescription(dict(
+            infra_name='r', user_id='u', nodes=nodes, dependencies=deps))
+        counter = 40
+        for _ in range(100):
+            names = sorted(self.sd.node_lookup)
+            action = rnd.randrange(4)
+            try:
+                if action == 0:
+                    name = 'n{0}'.format(counter)
+                    counter += 1
+                    self.sd.apply_delta(
+                        added_nodes=[dict(name=name, type='t')],
+                        added_edges=[[name, rnd.choice(names)]])
+                elif action == 1 and len(names) > 5:
+                    self.sd.apply_delta(removed_nodes=[rnd.choice(names)])
+                elif action == 2 and self.sd.edges:
+                    self.sd.apply_delta(
+                        removed_edges=[rnd.choice(self.sd.edges)])
+                else:
+                    self.sd.apply_delta(
+                        added_edges=[rnd.sample(names, 2)])
+            except SchemaError:
+                pass
+            self.assertConsistent()
@@ -0,0 +1,85 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import occo.compiler as compiler
+from occo.compiler.diff import node_hash
+from occo_test.static_description_test import diamond, diamond_by_name
+
+def compiled(desc, *args, **kwargs):
+    return compiler.StaticDescription(desc, *args, **kwargs)
+
+class DiffTest(unittest.TestCase):
+    def setUp(self):
+        self.old = compiled(diamond())
+
+    def test_same(self):
+        d = self.old.diff(compiled(diamond_by_name()))
+        self.assertFalse(d)
+        self.assertEqual(d.redeploy, set())
+        self.assertEqual(d.levels, [])
+
+    def test_modified_node(self):
+        desc = diamond()
+        desc['nodes'][1]['variables'] = dict(y=2)
+        d = self.old.diff(compiled(desc))
+        self.assertEqual(d.modified_nodes, set(['B']))
+        self.assertEqual(d.redeploy, set(['B', 'D']))
+        self.assertEqual(d.levels, [1, 2])
+        self.assertEqual(d.added_edges | d.removed_edges, set())
+
+    def test_infra_variables(self):
+        desc = diamond()
+        desc['variables'] = dict(x=2)
+        d = self.old.diff(compiled(desc))
+        self.assertEqual(d.modified_nodes, set('ABCD'))
+
+    def test_mappings(self):
+        desc = diamond()
+        desc['dependencies'][3]['mappings'] = [['Cfqdn', 'other']]
+        d = self.old.diff(compiled(desc))
+        self.assertEqual(d.modified_nodes, set())
+        self.assertEqual(d.modified_mappings, set([('C', 'A')]))
+        self.assertEqual(d.redeploy, set(['C', 'D']))
+
+    def test_nodes_and_edges(self):
+        desc = diamond()
+        A, B, C, D = desc['nodes']
+        E = dict(name='E', type='t')
+        desc['nodes'] = [A, B, C, E]
+        desc['dependencies'] = [[B, A], [C, A], [E, B]]
+        d = self.old.diff(compiled(desc))
+        self.assertEqual(d.added_nodes, set(['E']))
+        self.assertEqual(d.removed_nodes, set(['D']))
+        self.assertEqual(d.added_edges, set([('E', 'B')]))
+        self.assertEqual(d.removed_edges, set([('D', 'C'), ('D', 'B')]))
+        self.assertEqual(d.modified_mappings, set([('C', 'A')]))
+        self.assertEqual(d.redeploy, set(['C', 'E']))
+        self.assertEqual(d.as_dict()['removed_edges'],
+                         [('D', 'B'), ('D', 'C')])
+
+    def test_lazy(self):
+        desc = diamond()
+        desc['nodes'][0]['type'] = 'u'
+        d = compiled(diamond(), lazy=True).diff(compiled(desc, lazy=True))
+        self.assertEqual(d.modified_nodes, set(['A']))
+        self.assertEqual(d.redeploy, set('ABCD'))
+        self.assertEqual(d.levels, [0, 1, 2])
+
+    def test_node_hash(self):
+        sd = compiled(diamond(), 'id')
+        other = compiled(diamond(), 'other', layered_variables=True)
+        self.assertEqual(node_hash(sd.node_lookup['D']),
+                         node_hash(other.node_lookup['D']))
+        self.assertNotEqual(node_hash(sd.node_lookup['D']),
+                            node_hash(sd.node_lookup['C']))
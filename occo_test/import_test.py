@@ -0,0 +1,54 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import subprocess
+import sys
+from occo_test.nodedef_cache_test import plugin_env
+
+deferred = ['ruamel.yaml', 'occo.resourcehandler', 'occo.configmanager',
+            'occo.infraprocessor']
+
+def imported_after(code):
+    """Modules (among ``deferred``) imported by ``code`` in a new
+    interpreter, which can use the fixture plugin."""
+    out = subprocess.check_output([sys.executable, '-c', '''
+import sys
+{0}
+print('\\n'.join(m for m in sys.modules
+                if any(m == d or m.startswith(d + '.') for d in {1!r})))
+'''.format(code, deferred)], env=plugin_env(), universal_newlines=True)
+    return set(out.split())
+
+class LazyImportTest(unittest.TestCase):
+    def test_compiler(self):
+        self.assertEqual(imported_after('import occo.compiler'), set())
+
+    def test_topo_order(self):
+        code = '''
+import occo.compiler as c
+nodes = [dict(name='A', type='t'), dict(name='B', type='t')]
+c.StaticDescription.topo_order(nodes, [c.Edge(['B', 'A'])])
+'''
+        self.assertEqual(imported_after(code), set())
+
+    def test_on_first_use(self):
+        modules = imported_after('''
+import occo.compiler as c
+c.loader.load('a: 1')
+c.schema_check.register_plugin('resource', 'fixture', 'fixture_plugin')
+c.schema_check.get_checker('resource', 'fixture')
+''')
+        self.assertIn('ruamel.yaml', modules)
+        self.assertIn('occo.resourcehandler', modules)
+        self.assertNotIn('occo.configmanager', modules)
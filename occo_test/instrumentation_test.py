@@ -0,0 +1,76 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import pickle
+import occo.compiler as compiler
+from occo.compiler import instrumentation
+from occo_test.static_description_test import diamond
+from occo_test.loader_test import infra
+
+class CompileStatsTest(unittest.TestCase):
+    def test_phases(self):
+        sd = compiler.StaticDescription(infra.format('x'))
+        stats = sd.compile_stats
+        self.assertEqual(list(stats.phases), ['parse', 'schema_check', 'edges',
+                                              'topo_order', 'prepare_nodes'])
+        self.assertTrue(all(t >= 0 for t in stats.phases.values()))
+        self.assertEqual((stats.nodes, stats.edges), (2, 1))
+        self.assertEqual((stats.levels, stats.width, stats.depth), (2, 1, 2))
+        self.assertEqual(stats.as_dict()['nodes'], 2)
+
+    def test_shape(self):
+        stats = compiler.StaticDescription(diamond()).compile_stats
+        self.assertNotIn('parse', stats.phases)
+        self.assertEqual((stats.nodes, stats.edges, stats.levels, stats.width),
+                         (4, 4, 3, 2))
+
+    def test_lazy(self):
+        sd = compiler.StaticDescription(diamond(), lazy=True)
+        self.assertNotIn('topo_order', sd.compile_stats.phases)
+        sd.topological_order
+        self.assertIn('topo_order', sd.compile_stats.phases)
+        self.assertIn('prepare_nodes', sd.compile_stats.phases)
+
+    def test_hooks(self):
+        calls = []
+        hook = lambda phase, elapsed, stats: calls.append(phase)
+        instrumentation.add_hook(hook)
+        try:
+            compiler.StaticDescription(diamond())
+        finally:
+            instrumentation.remove_hook(hook)
+        self.assertEqual(calls, ['schema_check', 'edges', 'topo_order',
+                                 'prepare_nodes', 'total'])
+
+    def test_failing_hook(self):
+        def hook(phase, elapsed, stats):
+            raise Exception('failing hook')
+        instrumentation.add_hook(hook)
+        try:
+            compiler.StaticDescription(diamond())
+        finally:
+            instrumentation.remove_hook(hook)
+
+    def test_trace(self):
+        with instrumentation.trace() as collected:
+            sds = [compiler.StaticDescription(diamond()) for _ in range(3)]
+        compiler.StaticDescription(diamond())
+        self.assertEqual(collected, [sd.compile_stats for sd in sds])
+
+    def test_profile(self):
+        sd = compiler.StaticDescription(diamond(), profile=True)
+        self.assertEqual(sorted(sd.compile_stats.profiles),
+                         sorted(sd.compile_stats.phases))
+        loaded = pickle.loads(pickle.dumps(sd))
+        self.assertEqual(loaded.compile_stats.profiles, {})
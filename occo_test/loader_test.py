@@ -0,0 +1,76 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import occo.compiler as compiler
+from occo.compiler import loader
+from occo.exceptions import SchemaError
+
+infra = """
+infra_name: {0}
+user_id: u
+nodes:
+  - &A
+    name: A
+    type: t
+  - &B
+    name: B
+    type: t
+dependencies:
+  - [ *B, *A ]
+"""
+
+class LoaderTest(unittest.TestCase):
+    def assertAliasesKept(self, pure):
+        desc = loader.load(infra.format('x'), pure=pure)
+        A, B = desc['nodes']
+        self.assertIs(desc['dependencies'][0][0], B)
+        self.assertIs(desc['dependencies'][0][1], A)
+        self.assertIs(type(desc), dict)
+
+    def test_aliases_pure(self):
+        self.assertAliasesKept(True)
+    def test_aliases_fast(self):
+        self.assertAliasesKept(False)
+
+    def test_pure_and_fast_agree(self):
+        text = infra.format('x')
+        self.assertEqual(loader.load(text, pure=True), loader.load(text))
+
+    def test_safe(self):
+        with self.assertRaises(Exception):
+            loader.load('!!python/object/apply:os.getcwd []')
+
+    def test_compile_string(self):
+        sd = compiler.StaticDescription(infra.format('x'))
+        self.assertEqual([[n['name'] for n in l]
+                          for l in sd.topological_order],
+                         [['A'], ['B']])
+        self.assertEqual(list(sd.node_lookup['B']['mappings']['inbound']),
+                         ['A'])
+
+class LoadAllTest(unittest.TestCase):
+    def test_load_all(self):
+        stream = '---\n'.join(infra.format('i{0}'.format(i))
+                              for i in range(5))
+        sds = compiler.StaticDescription.load_all(stream)
+        self.assertEqual([sd.name for sd in sds],
+                         ['i{0}'.format(i) for i in range(5)])
+        self.assertEqual(len(set(sd.infra_id for sd in sds)), 5)
+        for sd in sds:
+            self.assertEqual(len(sd.topological_order), 2)
+
+    def test_load_all_invalid(self):
+        stream = infra.format('ok') + '---\n' + infra.format('not.ok')
+        with self.assertRaises(SchemaError):
+            compiler.StaticDescription.load_all(stream)
@@ -0,0 +1,142 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from occo.compiler.nodedef_cache import NodeDefCache, main
+from occo.compiler.schema_check import SchemaChecker, SchemaErrorReport, \
+    register_plugin
+from occo.exceptions import SchemaError
+
+#: Directory of the plugin used by the tests (fixture_plugin)
+PLUGINS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plugins')
+
+def use_fixture_plugin():
+    """Makes the ``fixture`` resource protocol available."""
+    if PLUGINS not in sys.path:
+        sys.path.insert(0, PLUGINS)
+    register_plugin('resource', 'fixture', 'fixture_plugin')
+
+def plugin_env():
+    """Environment for subprocesses, with :data:`PLUGINS` on their path."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [PLUGINS] + [p for p in [env.get('PYTHONPATH')] if p])
+    return env
+
+use_fixture_plugin()
+import fixture_plugin
+
+def node_defs():
+    return {
+        'node_def:A': [dict(resource=dict(type='fixture'))],
+        'node_def:B': [dict(resource=dict(type='fixture', size=1))],
+        'node_def:bad': [dict(resource=dict(type='fixture', bad=True))],
+    }
+
+class NodeDefCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'nodedefs.cache')
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def check(self, cache, defs, **kwargs):
+        with self.assertRaises(SchemaErrorReport) as ctx:
+            SchemaChecker.check_node_def(defs, aggregate=True, cache=cache,
+                                         **kwargs)
+        return ctx.exception.errors
+
+    def test_persistent(self):
+        cache = NodeDefCache(self.path)
+        self.assertEqual(cache.warm(node_defs()), ['node_def:bad'])
+        cache.save()
+        self.assertEqual(cache.stats()['misses'], 3)
+
+        cache = NodeDefCache(self.path)
+        self.assertEqual(len(cache), 3)
+        defs = node_defs()
+        defs['node_def:B'][0]['resource']['size'] = 2
+        errors = self.check(cache, defs)
+        self.assertEqual(errors, [(
+            fixture_plugin.ERROR,
+            "[SchemaCheck] ERROR in 'resource' section of node 'bad'[0]: ")])
+        self.assertEqual(cache.stats(), dict(hits=2, misses=1, entries=4,
+                                             hit_rate=2 / 3.0))
+
+    def test_same_errors(self):
+        uncached = self.check(None, node_defs())
+        cache = NodeDefCache()
+        self.assertEqual(self.check(cache, node_defs()), uncached)
+        self.assertEqual(self.check(cache, node_defs(), workers=2), uncached)
+        self.assertEqual(cache.stats()['hits'], 3)
+
+    def test_first_error(self):
+        cache = NodeDefCache()
+        cache.warm(node_defs())
+        with self.assertRaises(SchemaError) as ctx:
+            SchemaChecker.check_node_def(node_defs(), cache=cache)
+        self.assertNotIsInstance(ctx.exception, SchemaErrorReport)
+        self.assertEqual(ctx.exception.msg, fixture_plugin.ERROR)
+        SchemaChecker.check_node_def({'node_def:A': node_defs()['node_def:A']},
+                                     cache=cache)
+
+    def test_unknown_plugin(self):
+        cache = NodeDefCache()
+        defs = {'node_def:X': [dict(resource=dict(type='nonexistent'))]}
+        self.assertIsNone(cache.entry_key(*list(defs.items())[0]))
+
+    def test_prune(self):
+        cache = NodeDefCache(self.path)
+        cache.warm(node_defs())
+        cache.save()
+        cache = NodeDefCache(self.path)
+        cache.warm({'node_def:A': node_defs()['node_def:A']})
+        cache.save(prune=True)
+        self.assertEqual(len(NodeDefCache(self.path)), 1)
+
+    def test_no_plugin_imports(self):
+        cache = NodeDefCache(self.path)
+        cache.warm(node_defs())
+        cache.save()
+        out = subprocess.check_output([sys.executable, '-c', '''
+import sys
+from occo.compiler.nodedef_cache import NodeDefCache
+from occo.compiler.schema_check import register_plugin
+register_plugin('resource', 'fixture', 'fixture_plugin')
+cache = NodeDefCache({0!r})
+cache.warm({1!r})
+print(cache.stats()['hits'])
+print(any(m.startswith('occo.resourcehandler') or m.startswith('occo.plugins')
+          or m == 'fixture_plugin' for m in sys.modules))
+'''.format(self.path, node_defs())], env=plugin_env(),
+            universal_newlines=True)
+        self.assertEqual(out.split(), ['3', 'False'])
+
+    def test_main(self):
+        catalog = os.path.join(self.dir, 'catalog.yaml')
+        with open(catalog, 'w') as f:
+            f.write("'node_def:A':\n  - resource:\n      type: fixture\n")
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(main([self.path, catalog]), 0)
+            self.assertEqual(main([self.path, catalog]), 0)
+        lines = out.getvalue().splitlines()
+        self.assertIn('misses: 1', lines[0])
+        self.assertIn('hit rate: 100.0%', lines[1])
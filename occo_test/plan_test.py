@@ -0,0 +1,77 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import occo.compiler as compiler
+from occo.exceptions import SchemaError
+from occo_test.static_description_test import diamond
+
+def scaled_diamond(**scaling):
+    desc = diamond()
+    for n in desc['nodes']:
+        if n['name'] in scaling:
+            n['scaling'] = scaling[n['name']]
+    return desc
+
+class DeploymentPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.sd = compiler.StaticDescription(scaled_diamond(
+            B=dict(min=2, max=5), C=dict(min=3), D=dict(max=4)))
+
+    def test_counts(self):
+        plan = self.sd.deployment_plan()
+        self.assertEqual(plan.instances, dict(A=1, B=2, C=3, D=1))
+        self.assertEqual(plan.level_instances, [1, 5, 1])
+        self.assertEqual(plan.parallelism, [1, 5, 1])
+        self.assertEqual(plan.total, 7)
+        self.assertEqual(len(plan), 7)
+
+    def test_descriptors(self):
+        plan = self.sd.deployment_plan(counts=dict(B=5))
+        instances = list(plan)
+        self.assertEqual([(i.name, i.index, i.level) for i in instances][:4],
+                         [('A', 0, 0), ('B', 0, 1), ('B', 1, 1), ('B', 2, 1)])
+        self.assertEqual(len(instances), 10)
+        B = [i for i in instances if i.name == 'B']
+        for i in B:
+            self.assertIs(i.node, self.sd.node_lookup['B'])
+        self.assertEqual([i.name for i in plan.descriptors(2)], ['D'])
+
+    def test_batches(self):
+        plan = self.sd.deployment_plan(max_parallel=2)
+        self.assertEqual(plan.parallelism, [1, 2, 1])
+        self.assertEqual([[i.name for i in b] for b in plan.batches()],
+                         [['A'], ['B', 'B'], ['C', 'C'], ['C'], ['D']])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.sd.deployment_plan(counts=dict(B=6))
+        with self.assertRaises(ValueError):
+            self.sd.deployment_plan(counts=dict(A=2))
+        with self.assertRaises(KeyError):
+            self.sd.deployment_plan(counts=dict(X=1))
+        for scaling in (dict(min=2, max=1), dict(min='1'), dict(max=-1)):
+            sd = compiler.StaticDescription(scaled_diamond(A=scaling))
+            with self.assertRaises(SchemaError):
+                sd.deployment_plan()
+
+    def test_lazy(self):
+        sd = compiler.StaticDescription(
+            scaled_diamond(D=dict(min=10000, max=10000)), lazy=True)
+        plan = sd.deployment_plan()
+        self.assertEqual(plan.level_instances, [1, 2, 10000])
+        self.assertEqual(sd._unprepared, set('ABCD'))
+        first = next(plan.descriptors(2))
+        self.assertEqual(sd._unprepared, set('ABC'))
+        self.assertEqual(first.node['variables'], dict(x=1))
+        self.assertEqual(sum(1 for _ in plan.descriptors()), 10003)
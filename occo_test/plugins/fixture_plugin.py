@@ -0,0 +1,39 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+
+"""Resource handler plugin used by the tests.
+
+Its schema checker accepts any resource section, except those with
+``bad: true``. The tests register it for the ``fixture`` protocol (see
+:func:`occo_test.nodedef_cache_test.use_fixture_plugin`).
+"""
+
+import occo.util.factory as factory
+from occo.exceptions import SchemaError
+from occo.resourcehandler import RHSchemaChecker
+
+PROTOCOL_ID = 'fixture'
+
+#: The message of the error reported for bad sections
+ERROR = 'bad fixture resource'
+
+@factory.register(RHSchemaChecker, PROTOCOL_ID)
+class FixtureSchemaChecker(RHSchemaChecker):
+    def __init__(self):
+        return
+
+    def perform_check(self, data):
+        if data.get('bad'):
+            raise SchemaError(ERROR)
+        return True
@@ -0,0 +1,77 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import asyncio
+import occo.compiler as compiler
+from occo.compiler.scheduler import DependencyScheduler
+from occo_test.static_description_test import diamond
+
+def names(nodes):
+    return sorted(n['name'] for n in nodes)
+
+def uneven():
+    """ A <- B <- D and A <- C; B is slow, C and its dependent E are not. """
+    A, B, C, D, E = [dict(name=n, type='t') for n in 'ABCDE']
+    return compiler.StaticDescription(dict(
+        infra_name='uneven', user_id='u', nodes=[A, B, C, D, E],
+        dependencies=[[B, A], [C, A], [D, B], [E, C]]))
+
+class DependencySchedulerTest(unittest.TestCase):
+    def test_sync(self):
+        s = DependencyScheduler(compiler.StaticDescription(diamond()))
+        self.assertEqual(names(s.ready()), ['A'])
+        self.assertEqual(s.ready(), [])
+        self.assertEqual(names(s.mark_done('A')), ['B', 'C'])
+        self.assertEqual(names(s.ready()), ['B', 'C'])
+        self.assertEqual(s.mark_done('B'), [])
+        self.assertEqual(names(s.mark_done('C')), ['D'])
+        self.assertFalse(s.finished)
+        s.mark_done(s.ready()[0])
+        self.assertTrue(s.finished)
+
+    def test_no_level_barrier(self):
+        s = DependencyScheduler(uneven())
+        s.ready()
+        s.mark_done('A')
+        s.ready()
+        # E is released while B (same level as C) is still running
+        self.assertEqual(names(s.mark_done('C')), ['E'])
+        self.assertEqual(s.running, frozenset(['B']))
+        self.assertEqual(len(s.levels), 3)
+
+    def test_not_running(self):
+        s = DependencyScheduler(uneven())
+        with self.assertRaises(ValueError):
+            s.mark_done('A')
+        s.ready()
+        s.mark_done('A')
+        with self.assertRaises(ValueError):
+            s.mark_done('A')
+
+    def test_async(self):
+        s = DependencyScheduler(uneven())
+        durations = dict(A=0, B=0.2, C=0, D=0, E=0)
+        started, tasks = [], []
+        async def deploy(node):
+            await asyncio.sleep(durations[node['name']])
+            s.mark_done(node)
+        async def run():
+            async for node in s:
+                started.append(node['name'])
+                tasks.append(asyncio.ensure_future(deploy(node)))
+            await asyncio.gather(*tasks)
+        asyncio.run(run())
+        self.assertTrue(s.finished)
+        self.assertEqual(started[0], 'A')
+        self.assertLess(started.index('E'), started.index('D'))
@@ -0,0 +1,140 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+from occo.compiler.schema_check import SchemaChecker, SchemaErrorReport, \
+    is_valid_hostname, plugin_modules, register_plugin
+from occo.exceptions import SchemaError
+from occo_test.nodedef_cache_test import use_fixture_plugin
+import fixture_plugin
+
+def invalid_node_defs():
+    return {
+        'node_def:ok_so_far': [dict(resource=dict())],
+        'nodedef:badname': [],
+        'node_def:notalist': dict(resource=dict(type='x')),
+        'node_def:badsection': [dict(resource=dict(type='x'), foo=1, bar=2)],
+        'node_def:noresource': [dict(), dict(config_management=dict())],
+    }
+
+class CheckNodeDefTest(unittest.TestCase):
+    def test_first_error(self):
+        with self.assertRaises(SchemaError) as ctx:
+            SchemaChecker.check_node_def(invalid_node_defs())
+        self.assertNotIsInstance(ctx.exception, SchemaErrorReport)
+        self.assertEqual(ctx.exception.msg, "Missing key 'type'")
+
+    def assertReport(self, **kwargs):
+        with self.assertRaises(SchemaErrorReport) as ctx:
+            SchemaChecker.check_node_def(invalid_node_defs(), aggregate=True,
+                                         **kwargs)
+        msgs = [msg for msg, _ in ctx.exception.errors]
+        self.assertEqual(msgs, [
+            "Missing key 'type'",
+            "Node definition must begin with 'node_def:<nodename>'!",
+            "Node definition has to be a list of dictionaries!",
+            "Invalid section 'foo'",
+            "Invalid section 'bar'",
+            "Unknown type 'x': "
+            "No module named 'occo.plugins.resourcehandler.x'",
+            "Missing 'resource' section!",
+            "Missing 'resource' section!",
+            "Missing key 'type'!",
+        ])
+        self.assertEqual(
+            ctx.exception.errors[-1][1],
+            "[SchemaCheck] ERROR in 'config_management' section of node "
+            "'noresource'[1]: ")
+
+    def test_aggregate(self):
+        self.assertReport()
+    def test_threads(self):
+        self.assertReport(workers=4)
+    def test_processes(self):
+        self.assertReport(workers=2, processes=True)
+
+    def test_parallel_first_error(self):
+        with self.assertRaises(SchemaError) as ctx:
+            SchemaChecker.check_node_def(invalid_node_defs(), workers=4)
+        self.assertEqual(ctx.exception.msg, "Missing key 'type'")
+
+    def test_registered_plugin(self):
+        use_fixture_plugin()
+        self.assertEqual(plugin_modules('resource', 'fixture')[2],
+                         'fixture_plugin')
+        with self.assertRaises(SchemaError) as ctx:
+            SchemaChecker.check_node_def(
+                {'node_def:x': [dict(resource=dict(type='fixture', bad=1))]})
+        self.assertEqual(ctx.exception.msg, fixture_plugin.ERROR)
+        with self.assertRaises(ValueError):
+            register_plugin('nonexistent', 'fixture', 'fixture_plugin')
+
+    def test_health_check_default(self):
+        node_defs = {'node_def:x': [dict(health_check=dict())]}
+        with self.assertRaises(SchemaError):
+            SchemaChecker.check_node_def(node_defs, workers=2, processes=True)
+        self.assertEqual(node_defs['node_def:x'][0]['health_check'],
+                         dict(type='basic'))
+
+def invalid_infra_desc():
+    return dict(
+        infra_name='bad.name',
+        nodes=[dict(name='A', type='t', scaling=dict(min=1)),
+               dict(type='t'),
+               dict(name='B_', scaling=dict(min=1, count=2), filter=[],
+                    foo=1),
+               'C'],
+        dependencies=[['A', 'B'], dict(mappings=[])],
+        bar=1)
+
+class CheckInfraDescTest(unittest.TestCase):
+    def test_valid(self):
+        SchemaChecker.check_infra_desc(
+            dict(user_id='u', infra_name='x',
+                 nodes=[dict(name='A', type='t', scaling=dict(min=1))],
+                 dependencies=[]))
+
+    def test_first_error(self):
+        with self.assertRaises(SchemaError) as ctx:
+            SchemaChecker.check_infra_desc(invalid_infra_desc())
+        self.assertNotIsInstance(ctx.exception, SchemaErrorReport)
+        self.assertEqual(ctx.exception.msg,
+                         "[SchemaCheck] ERROR: infra_name \"bad.name\" "
+                         "cannot contain '.' character")
+
+    def test_aggregate(self):
+        with self.assertRaises(SchemaErrorReport) as ctx:
+            SchemaChecker.check_infra_desc(invalid_infra_desc(),
+                                           aggregate=True)
+        self.assertEqual([context for _, context in ctx.exception.errors], [
+            'infra_name: ',
+            'nodes[1]: ',
+            'nodes[2].name: ',
+            'nodes[2]: ',
+            'nodes[2].scaling.count: ',
+            'nodes[2].filter: ',
+            'nodes[2].foo: ',
+            'nodes[3]: ',
+            'dependencies[1]: ',
+            'bar: ',
+        ])
+        self.assertEqual(
+            ctx.exception.errors[4][0],
+            "[SchemaCheck] ERROR: unknown key \"'count'\" in scaling of "
+            "node 'B_'")
+
+    def test_hostname(self):
+        self.assertIsNone(is_valid_hostname('node-1'))
+        self.assertEqual(is_valid_hostname('a' * 65), 'is too long')
+        self.assertEqual(is_valid_hostname('a_b'),
+                         'may contain only [a-z,0-9,-] characters')
@@ -0,0 +1,125 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import os
+import sys
+import tempfile
+from unittest import mock
+import occo.compiler as compiler
+from occo.compiler import serialization
+from occo.compiler.variables import VariableView
+from occo_test.static_description_test import diamond
+from occo_test.topo_test import random_dag
+
+def levels(sd):
+    return [[n['name'] for n in l] for l in sd.topological_order]
+
+class SerializationTest(unittest.TestCase):
+    def assertRoundTrip(self, sd, loaded):
+        self.assertEqual(loaded.infra_id, sd.infra_id)
+        self.assertEqual(loaded.name, sd.name)
+        self.assertEqual(loaded.user_id, sd.user_id)
+        self.assertEqual(loaded.variables, sd.variables)
+        self.assertEqual(levels(loaded), levels(sd))
+        self.assertEqual(loaded.nodes, sd.nodes)
+        self.assertEqual([(e.dependent['name'], e.dependee['name'],
+                           e.mappings, e.extras) for e in loaded.edges],
+                         [(e.dependent['name'], e.dependee['name'],
+                           e.mappings, e.extras) for e in sd.edges])
+        for e in loaded.edges:
+            self.assertIs(e.dependent, loaded.node_lookup[e.dependent['name']])
+        self.assertEqual(loaded._level, sd._level)
+
+    def test_round_trip(self):
+        desc = diamond()
+        desc['dependencies'][0]['backend_hint'] = 'x'
+        sd = compiler.StaticDescription(desc)
+        self.assertRoundTrip(sd, compiler.StaticDescription.loads(sd.dumps()))
+
+    def test_random(self):
+        nodes, deps = random_dag(300, 0.05, 3)
+        sd = compiler.StaticDescription(dict(
+            infra_name='r', user_id='u', nodes=nodes, dependencies=deps))
+        self.assertRoundTrip(sd, compiler.StaticDescription.loads(sd.dumps()))
+
+    def test_layered(self):
+        sd = compiler.StaticDescription(diamond(), layered_variables=True)
+        sd.node_lookup['B']['variables']['y'] = 2
+        loaded = compiler.StaticDescription.loads(sd.dumps())
+        self.assertRoundTrip(sd, loaded)
+        A = loaded.node_lookup['A']['variables']
+        self.assertIsInstance(A, VariableView)
+        self.assertIs(A.base, loaded.variables)
+        self.assertEqual(loaded.node_lookup['B']['variables'], dict(x=1, y=2))
+        B = loaded.node_lookup['B']['variables']
+        self.assertIsInstance(B, VariableView)
+        self.assertIs(B.base, loaded.variables)
+
+    def test_lazy(self):
+        sd = compiler.StaticDescription(diamond(), 'id', lazy=True)
+        loaded = compiler.StaticDescription.loads(sd.dumps())
+        self.assertRoundTrip(compiler.StaticDescription(diamond(), 'id'),
+                             loaded)
+
+    def test_usable_after_load(self):
+        sd = compiler.StaticDescription(diamond())
+        loaded = compiler.StaticDescription.loads(sd.dumps())
+        loaded.apply_delta(added_nodes=[dict(name='E', type='t')],
+                           added_edges=[['E', 'D']])
+        self.assertEqual(levels(loaded)[-1], ['E'])
+
+    def test_file(self):
+        sd = compiler.StaticDescription(diamond())
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(sd.dumps())
+            self.assertRoundTrip(sd, serialization.load_file(path))
+        finally:
+            os.remove(path)
+
+    def test_byteswap(self):
+        # On big endian hosts, the arrays are swapped when dumping and loading
+        sd = compiler.StaticDescription(diamond())
+        with mock.patch.object(sys, 'byteorder',
+                               'big' if sys.byteorder == 'little'
+                               else 'little'):
+            data = sd.dumps()
+            self.assertRoundTrip(sd, serialization.loads(data))
+        self.assertNotEqual(data, sd.dumps())
+
+    def test_corrupt_file(self):
+        data = compiler.StaticDescription(diamond()).dumps()
+        data = data[:-5] + b'\xff' * 5
+        with self.assertRaises(Exception) as expected:
+            serialization.loads(data)
+        self.assertNotIsInstance(expected.exception, BufferError)
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            with self.assertRaises(Exception) as cm:
+                serialization.load_file(path)
+            self.assertIs(type(cm.exception), type(expected.exception))
+        finally:
+            os.remove(path)
+
+    def test_invalid(self):
+        data = compiler.StaticDescription(diamond()).dumps()
+        with self.assertRaises(ValueError):
+            serialization.loads(b'garbage')
+        with self.assertRaises(ValueError):
+            serialization.loads(data[:-1])
+        with self.assertRaises(ValueError):
+            serialization.loads(data[:6] + b'\xff' + data[7:])
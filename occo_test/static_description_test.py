@@ -0,0 +1,219 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import occo.compiler as compiler
+from occo.exceptions import SchemaError
+
+def diamond():
+    """ A <- B, C <- D; with mappings on some of the edges. """
+    A, B, C, D = [dict(name=n, type='t') for n in 'ABCD']
+    return dict(
+        infra_name='diamond',
+        user_id='u',
+        variables=dict(x=1),
+        nodes=[A, B, C, D],
+        dependencies=[
+            dict(connection=[D, C],
+                 mappings=[dict(attributes=['fqdn', 'db_host'], synch=True),
+                           ['from', 'to']]),
+            [D, B],
+            [B, A],
+            dict(connection=[C, A],
+                 mappings=[['Cfqdn', 'host']]),
+        ])
+
+class EdgeIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.sd = compiler.StaticDescription(diamond())
+
+    def test_inbound(self):
+        self.assertEqual(
+            [e.dependee['name'] for e in self.sd.inbound_edges('D')],
+            ['C', 'B'])
+        self.assertEqual(self.sd.inbound_edges('A'), ())
+    def test_outbound(self):
+        self.assertEqual(
+            [e.dependent['name'] for e in self.sd.outbound_edges('A')],
+            ['B', 'C'])
+        self.assertEqual(self.sd.outbound_edges('D'), ())
+    def test_unknown(self):
+        self.assertEqual(self.sd.inbound_edges('X'), ())
+    def test_mappings(self):
+        D = self.sd.node_lookup['D']
+        self.assertEqual(sorted(D['mappings']['inbound']), ['B', 'C'])
+        self.assertEqual(D['mappings']['outbound'], {})
+        self.assertEqual(
+            D['mappings']['inbound']['C'],
+            [dict(attributes=['fqdn', 'db_host'], synch=True),
+             dict(attributes=['from', 'to'], synch=False)])
+        C = self.sd.node_lookup['C']
+        self.assertEqual(C['mappings']['outbound']['D'],
+                         D['mappings']['inbound']['C'])
+        self.assertEqual(C['mappings']['inbound']['A'],
+                         [dict(attributes=['Cfqdn', 'host'], synch=False)])
+    def test_mappings_shared(self):
+        # The lists of mappings are shared by the endpoints of the edge;
+        # replacing them in one node does not affect the other.
+        C, D = self.sd.node_lookup['C'], self.sd.node_lookup['D']
+        self.assertIs(C['mappings']['outbound']['D'],
+                      D['mappings']['inbound']['C'])
+        D['mappings']['inbound']['C'] = []
+        self.assertEqual(len(C['mappings']['outbound']['D']), 2)
+
+class LazyTest(unittest.TestCase):
+    def test_deferred(self):
+        sd = compiler.StaticDescription(diamond(), lazy=True)
+        self.assertEqual(sd.name, 'diamond')
+        self.assertNotIn('topological_order', sd.__dict__)
+        raw = sd.nodes[3]
+        self.assertNotIn('mappings', raw)
+        D = sd.node_lookup['D']
+        self.assertIs(D, raw)
+        self.assertEqual(sorted(D['mappings']['inbound']), ['B', 'C'])
+        self.assertEqual(D['variables'], dict(x=1))
+        self.assertEqual(D['infra_id'], sd.infra_id)
+        self.assertNotIn('mappings', sd.nodes[0])
+
+    def test_same_as_eager(self):
+        eager = compiler.StaticDescription(diamond(), 'id')
+        lazy = compiler.StaticDescription(diamond(), 'id', lazy=True)
+        self.assertEqual(
+            [[n['name'] for n in l] for l in lazy.topological_order],
+            [[n['name'] for n in l] for l in eager.topological_order])
+        self.assertEqual(lazy.nodes, eager.nodes)
+
+    def test_cycle_on_demand(self):
+        desc = diamond()
+        A, D = desc['nodes'][0], desc['nodes'][3]
+        desc['dependencies'].append([A, D])
+        sd = compiler.StaticDescription(desc, lazy=True)
+        self.assertEqual(sd.node_lookup['A']['mappings']['inbound'],
+                         dict(D=[]))
+        with self.assertRaises(SchemaError):
+            sd.validate()
+        with self.assertRaises(SchemaError):
+            sd.topological_order
+
+    def test_delta(self):
+        sd = compiler.StaticDescription(diamond(), lazy=True)
+        sd.apply_delta(added_nodes=[dict(name='E', type='t')],
+                       added_edges=[['E', 'D']])
+        self.assertEqual(list(sd.node_lookup['D']['mappings']['outbound']),
+                         ['E'])
+        self.assertEqual(len(sd.topological_order), 4)
+
+    def test_prepare_nodes(self):
+        desc = diamond()
+        sd = compiler.StaticDescription(desc, lazy=True)
+        sd.prepare_nodes(desc)
+        self.assertEqual(sd._unprepared, set())
+        D = dict.__getitem__(sd.node_lookup, 'D')
+        D['variables']['marker'] = 1
+        mappings = D['mappings']
+        self.assertIs(sd.node_lookup['D'], D)
+        self.assertEqual(sd.get_node('D')['variables'], dict(x=1, marker=1))
+        self.assertIs(D['mappings'], mappings)
+
+    def test_pickle(self):
+        import pickle
+        sd = compiler.StaticDescription(diamond(), 'id', lazy=True)
+        sd.node_lookup['B']
+        sd2 = pickle.loads(pickle.dumps(sd))
+        self.assertEqual(sd2._unprepared, set(['A', 'C', 'D']))
+        self.assertNotIn('mappings', dict.__getitem__(sd2.node_lookup, 'D'))
+        D = sd2.node_lookup['D']
+        self.assertIs(D, sd2.nodes[3])
+        self.assertEqual(sorted(D['mappings']['inbound']), ['B', 'C'])
+        self.assertEqual(D['infra_id'], 'id')
+        self.assertIs(sd2.node_lookup.static_description, sd2)
+        eager = compiler.StaticDescription(diamond(), 'id')
+        self.assertEqual(
+            [[n['name'] for n in l] for l in sd2.topological_order],
+            [[n['name'] for n in l] for l in eager.topological_order])
+        self.assertEqual(sd2.nodes, eager.nodes)
+
+class EdgeTest(unittest.TestCase):
+    def test_extras(self):
+        e = compiler.Edge([dict(name='B'), dict(name='A')], [['x', 'y']],
+                          arbitrary_param='used by backend', other=1)
+        self.assertEqual(e.arbitrary_param, 'used by backend')
+        self.assertEqual(e.extras, dict(arbitrary_param='used by backend',
+                                        other=1))
+        self.assertIs(e.extras, e.extras)
+        with self.assertRaises(AttributeError):
+            e.missing
+        self.assertFalse(hasattr(e, '__dict__'))
+    def test_no_extras(self):
+        e = compiler.Edge([dict(name='B'), dict(name='A')])
+        self.assertEqual(e.extras, dict())
+        self.assertEqual(e.attribute_mappings, [])
+    def test_pickle(self):
+        import pickle
+        e = compiler.Edge([dict(name='B'), dict(name='A')], [['x', 'y']],
+                          other=1)
+        e2 = pickle.loads(pickle.dumps(e))
+        self.assertEqual(e2.other, 1)
+        self.assertEqual(e2.dependent, dict(name='B'))
+        self.assertEqual(e2.attribute_mappings,
+                         [dict(attributes=['x', 'y'], synch=False)])
+    def test_shared_mappings(self):
+        sd = compiler.StaticDescription(diamond())
+        self.assertIs(sd.node_lookup['D']['mappings']['inbound']['C'],
+                      sd.node_lookup['C']['mappings']['outbound']['D'])
+
+def diamond_by_name():
+    """ The diamond, with nodes referenced by name, like in JSON. """
+    desc = diamond()
+    desc['dependencies'] = [
+        dict(connection=['D', 'C'],
+             mappings=[dict(attributes=['fqdn', 'db_host'], synch=True),
+                       ['from', 'to']]),
+        ['D', 'B'],
+        ['B', dict(name='A', type='t')],
+        dict(connection=['C', 'A'],
+             mappings=[['Cfqdn', 'host']]),
+    ]
+    return desc
+
+class NameReferenceTest(unittest.TestCase):
+    def test_same_as_anchors(self):
+        by_name = compiler.StaticDescription(diamond_by_name(), 'id')
+        anchored = compiler.StaticDescription(diamond(), 'id')
+        self.assertEqual(
+            [[n['name'] for n in l] for l in by_name.topological_order],
+            [[n['name'] for n in l] for l in anchored.topological_order])
+        self.assertEqual(by_name.nodes, anchored.nodes)
+    def test_resolved(self):
+        sd = compiler.StaticDescription(diamond_by_name())
+        for e in sd.edges:
+            self.assertIs(e.dependent, sd.node_lookup[e.dependent['name']])
+            self.assertIs(e.dependee, sd.node_lookup[e.dependee['name']])
+        self.assertEqual(sd.dependencies[1], ['D', 'B'])
+    def test_unknown(self):
+        desc = diamond_by_name()
+        desc['dependencies'].append(['D', 'X'])
+        with self.assertRaises(SchemaError) as ctx:
+            compiler.StaticDescription(desc)
+        self.assertEqual(ctx.exception.args, ('Unknown node in dependency', 'X'))
+    def test_invalid(self):
+        desc = diamond_by_name()
+        desc['dependencies'].append(['D', 'C', 'B'])
+        with self.assertRaises(SchemaError):
+            compiler.StaticDescription(desc)
+    def test_duplicate(self):
+        desc = diamond_by_name()
+        desc['nodes'].append(dict(name='B', type='u'))
+        with self.assertRaises(SchemaError) as ctx:
+            compiler.StaticDescription(desc)
+        self.assertEqual(ctx.exception.args, ('Duplicate node', 'B'))
@@ -0,0 +1,81 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import occo.compiler as compiler
+from occo_test.static_description_test import diamond
+from occo_test.topo_test import chain
+
+def levels(sd):
+    return [sorted(n['name'] for n in l) for l in sd.topological_order]
+
+class SubgraphTest(unittest.TestCase):
+    def setUp(self):
+        self.sd = compiler.StaticDescription(diamond())
+
+    def test_upstream(self):
+        sub = self.sd.subgraph(['C'], direction='upstream')
+        self.assertEqual(levels(sub), [['A'], ['C']])
+        self.assertEqual(sub.node_lookup['C']['mappings'],
+                         dict(inbound=dict(A=[dict(attributes=['Cfqdn', 'host'],
+                                                   synch=False)]),
+                              outbound=dict()))
+        self.assertEqual(sorted(self.sd.node_lookup['C']['mappings']
+                                ['outbound']), ['D'])
+        self.assertEqual(sub.infra_id, self.sd.infra_id)
+
+    def test_downstream(self):
+        sub = self.sd.subgraph(['B'], direction='downstream')
+        self.assertEqual(levels(sub), [['B'], ['D']])
+        self.assertEqual(list(sub.node_lookup['D']['mappings']['inbound']),
+                         ['B'])
+        self.assertEqual(sub.dependencies, [[sub.node_lookup['D'],
+                                             sub.node_lookup['B']]])
+
+    def test_both(self):
+        sub = self.sd.subgraph(['B', 'C'])
+        self.assertEqual(levels(sub), [['A'], ['B', 'C'], ['D']])
+        self.assertEqual(sorted(sub.nodes, key=lambda n: n['name']),
+                         self.sd.nodes)
+        self.assertEqual(len(sub.edges), 4)
+
+    def test_both_through_selection(self):
+        # D is downstream of B only through C
+        desc = diamond()
+        A, B, C, D = desc['nodes']
+        desc['dependencies'] = [[C, B], [A, C], [D, C]]
+        sd = compiler.StaticDescription(desc)
+        sub = sd.subgraph(['A', 'B'])
+        self.assertEqual(levels(sub), [['B'], ['C'], ['A', 'D']])
+
+    def test_lazy(self):
+        sd = compiler.StaticDescription(diamond(), lazy=True)
+        sub = sd.subgraph(['B'], direction='upstream')
+        self.assertEqual(levels(sub), [['A'], ['B']])
+        self.assertEqual(sub.node_lookup['B']['variables'], dict(x=1))
+        self.assertEqual(sd._unprepared, set(['C', 'D']))
+        self.assertNotIn('topological_order', sd.__dict__)
+
+    def test_invalid(self):
+        with self.assertRaises(KeyError):
+            self.sd.subgraph(['X'])
+        with self.assertRaises(ValueError):
+            self.sd.subgraph(['A'], direction='sideways')
+
+    def test_large(self):
+        nodes, edges = chain(5000)
+        sd = compiler.StaticDescription(dict(
+            infra_name='chain', user_id='u', nodes=nodes, dependencies=edges))
+        sub = sd.subgraph(['n4990'], direction='downstream')
+        self.assertEqual(len(sub.topological_order), 10)
+        self.assertEqual(sub.compile_stats.nodes, 10)
@@ -0,0 +1,54 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import occo.compiler as compiler
+from occo_test.static_description_test import diamond
+
+class SynchIndexTest(unittest.TestCase):
+    def setUp(self):
+        desc = diamond()
+        desc['dependencies'][1] = dict(
+            connection=desc['dependencies'][1],
+            mappings=[dict(attributes=['fqdn', 'b_host'], synch=True),
+                      dict(attributes=['port', 'b_port'], synch=False)])
+        self.sd = compiler.StaticDescription(desc, lazy=True)
+
+    def test_waits(self):
+        index = self.sd.synch_index
+        self.assertEqual(index.waits_for('D'),
+                         frozenset([('C', 'fqdn'), ('B', 'fqdn')]))
+        self.assertEqual(index.waits_for('A'), frozenset())
+        self.assertEqual(index.waits, dict(D=index.waits_for('D')))
+
+    def test_waiters(self):
+        index = self.sd.synch_index
+        self.assertEqual(index.waiting_for('C', 'fqdn'), frozenset(['D']))
+        self.assertEqual(index.waiting_for('B', 'port'), frozenset())
+        self.assertEqual(sorted(index.waiters),
+                         [('B', 'fqdn'), ('C', 'fqdn')])
+        # Nothing has to be prepared
+        self.assertEqual(self.sd._unprepared, set('ABCD'))
+
+    def test_delta(self):
+        self.assertEqual(self.sd.synch_index.waiting_for('A', 'ip'),
+                         frozenset())
+        self.sd.apply_delta(
+            added_nodes=[dict(name='E', type='t')],
+            added_edges=[dict(connection=['E', 'A'],
+                              mappings=[dict(attributes=['ip', 'a_ip'],
+                                             synch=True)])],
+            removed_nodes=['B'])
+        index = self.sd.synch_index
+        self.assertEqual(index.waiting_for('A', 'ip'), frozenset(['E']))
+        self.assertEqual(index.waits_for('D'), frozenset([('C', 'fqdn')]))
@@ -0,0 +1,160 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import random
+import occo.compiler as compiler
+from occo.compiler import altcall, Edge, TopoLevel, TopologicalOrder
+from occo.compiler.cycles import CycleError
+from occo.exceptions import SchemaError
+import yaml
+import occo.util as util
+
+def reference_topo_order(all_nodes, all_edges):
+    """The original, level-peeling implementation of
+    :meth:`StaticDescription.topo_order`; kept as a reference."""
+    nodes = all_nodes
+    edges = all_edges
+    topo_order = TopologicalOrder()
+    while nodes:
+        dependents = [i.dependent for i in edges]
+        topo_level = TopoLevel(n for n in nodes if not n in dependents)
+        if not topo_level:
+            raise SchemaError("Cycle detected.", nodes)
+        nodes = [n for n in nodes if not n in topo_level]
+        edges = [e for e in edges if not e.dependee in topo_level]
+        topo_order.add_level(topo_level)
+    return topo_order
+
+def make_nodes(count):
+    return [dict(name='n{0}'.format(i), type='t') for i in range(count)]
+
+def chain(count):
+    nodes = make_nodes(count)
+    return nodes, [[nodes[i+1], nodes[i]] for i in range(count - 1)]
+
+def diamond_lattice(width, depth):
+    nodes = make_nodes(width * depth)
+    edges = [[nodes[(d+1)*width + j], nodes[d*width + i]]
+             for d in range(depth - 1)
+             for i in range(width)
+             for j in range(width)
+             if abs(i - j) <= 1]
+    return nodes, edges
+
+def random_dag(count, density, seed):
+    rnd = random.Random(seed)
+    nodes = make_nodes(count)
+    order = list(nodes)
+    rnd.shuffle(order)
+    edges = [[order[j], order[i]]
+             for i in range(count)
+             for j in range(i + 1, count)
+             if rnd.random() < density]
+    return nodes, edges
+
+def as_names(topo_order):
+    return [[n['name'] for n in level] for level in topo_order]
+
+class TopoOrderTest(unittest.TestCase):
+    def assertEquivalent(self, nodes, dependencies):
+        edges = [altcall(Edge, e) for e in dependencies]
+        expected = reference_topo_order(nodes, edges)
+        actual = compiler.StaticDescription.topo_order(nodes, edges)
+        self.assertIs(type(actual), TopologicalOrder)
+        for level in actual:
+            self.assertIs(type(level), TopoLevel)
+        self.assertEqual(as_names(actual), as_names(expected))
+
+    def test_chain(self):
+        self.assertEquivalent(*chain(300))
+    def test_diamond_lattice(self):
+        self.assertEquivalent(*diamond_lattice(15, 15))
+    def test_random_sparse(self):
+        self.assertEquivalent(*random_dag(200, 0.02, 1))
+    def test_random_dense(self):
+        self.assertEquivalent(*random_dag(100, 0.3, 2))
+    def test_duplicate_edges(self):
+        nodes, edges = chain(10)
+        self.assertEquivalent(nodes, edges + edges[3:6])
+    def test_equal_but_not_identical(self):
+        nodes, edges = chain(10)
+        edges = [[dict(d), dict(e)] for d, e in edges]
+        self.assertEquivalent(nodes, edges)
+    def test_large_chain(self):
+        nodes, edges = chain(20000)
+        topo = compiler.StaticDescription.topo_order(
+            nodes, [altcall(Edge, e) for e in edges])
+        self.assertEqual(len(topo), 20000)
+    def test_large_lattice(self):
+        nodes, edges = diamond_lattice(100, 100)
+        topo = compiler.StaticDescription.topo_order(
+            nodes, [altcall(Edge, e) for e in edges])
+        self.assertEqual(as_names(topo),
+                         [['n{0}'.format(d*100 + i) for i in range(100)]
+                          for d in range(100)])
+
+    def test_cycle(self):
+        nodes, edges = chain(10)
+        edges.append([nodes[5], nodes[8]])
+        edges = [altcall(Edge, e) for e in edges]
+        with self.assertRaises(CycleError) as new:
+            compiler.StaticDescription.topo_order(nodes, edges)
+        self.assertEqual(new.exception.cycle, ['n5', 'n8', 'n7', 'n6'])
+        self.assertEqual(new.exception.components,
+                         [['n5', 'n6', 'n7', 'n8']])
+        self.assertEqual(new.exception.msg,
+                         'Cycle detected: n5 -> n8 -> n7 -> n6 -> n5')
+    def test_self_loop(self):
+        nodes, edges = chain(5)
+        edges.append([nodes[3], nodes[3]])
+        edges = [altcall(Edge, e) for e in edges]
+        with self.assertRaises(CycleError) as new:
+            compiler.StaticDescription.topo_order(nodes, edges)
+        self.assertEqual(new.exception.cycle, ['n3'])
+    def test_several_cycles(self):
+        nodes, edges = chain(2000)
+        edges += [[nodes[10], nodes[1500]], [nodes[1200], nodes[1202]]]
+        edges = [altcall(Edge, e) for e in edges]
+        with self.assertRaises(CycleError) as new:
+            compiler.StaticDescription.topo_order(nodes, edges)
+        self.assertEqual([len(c) for c in new.exception.components], [1491])
+        self.assertEqual(len(new.exception.cycle), 1491)
+        nodes, edges = chain(2000)
+        edges += [[nodes[10], nodes[12]], [nodes[1200], nodes[1202]]]
+        edges = [altcall(Edge, e) for e in edges]
+        with self.assertRaises(CycleError) as new:
+            compiler.StaticDescription.topo_order(nodes, edges)
+        self.assertEqual(new.exception.components,
+                         [['n10', 'n11', 'n12'], ['n1200', 'n1201', 'n1202']])
+    def test_unknown_dependee(self):
+        nodes, edges = chain(5)
+        edges.append([nodes[2], dict(name='X', type='t')])
+        edges = [altcall(Edge, e) for e in edges]
+        with self.assertRaises(SchemaError) as new:
+            compiler.StaticDescription.topo_order(nodes, edges)
+        self.assertNotIsInstance(new.exception, CycleError)
+        self.assertEqual(new.exception.args,
+                         ('Dependency on unknown node.', ['n2']))
+
+def gen_case_equivalence(infra_desc):
+    def test(self):
+        self.assertEquivalent(infra_desc['nodes'],
+                              infra_desc.get('dependencies') or [])
+    return test
+
+with open(util.rel_to_file('test-config.yaml')) as f:
+    config = yaml.load(f)
+for isdesc in config['infrastructures']:
+    setattr(TopoOrderTest, 'test_equivalence_{0[name]}'.format(isdesc),
+            gen_case_equivalence(isdesc))
@@ -0,0 +1,96 @@
+### Copyright 2014, MTA SZTAKI, www.sztaki.hu
+###
+### Licensed under the Apache License, Version 2.0 (the "License");
+### you may not use this file except in compliance with the License.
+### You may obtain a copy of the License at
+###
+###    http://www.apache.org/licenses/LICENSE-2.0
+###
+### Unless required by applicable law or agreed to in writing, software
+### distributed under the License is distributed on an "AS IS" BASIS,
+### WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+### See the License for the specific language governing permissions and
+### limitations under the License.
+import unittest
+import copy
+import occo.util as util
+import occo.compiler as compiler
+from occo.compiler.variables import VariableView
+from occo_test.static_description_test import diamond
+
+def layers():
+    base = dict(image='img', credentials=dict(user='u', password='p'),
+                config=dict(a=1, nested=dict(x=1, y=2)), tags=['x', 'y'],
+                replaced=dict(q=1))
+    own = dict(config=dict(b=2, nested=dict(y=3)), port=80,
+               replaced='scalar', image='own-img')
+    return base, own
+
+class VariableViewTest(unittest.TestCase):
+    def test_same_as_dict_merge(self):
+        base, own = layers()
+        view = VariableView(base, own)
+        merged = util.dict_merge(base, own)
+        self.assertEqual(view.materialize(), merged)
+        self.assertEqual(view, merged)
+        self.assertEqual(list(view), list(merged))
+        self.assertEqual(len(view), len(merged))
+        self.assertIs(type(view.materialize()['config']), dict)
+
+    def test_copy_on_write(self):
+        base, own = layers()
+        original = copy.deepcopy((base, own))
+        view = VariableView(base, own)
+        view['image'] = 'new'
+        view['config']['nested']['x'] = 10
+        view['tags'].append('z')
+        view['credentials']['password'] = 'changed'
+        del view['port']
+        self.assertEqual((base, own), original)
+        self.assertEqual(view['image'], 'new')
+        self.assertEqual(view['config']['nested'], dict(x=10, y=3))
+        self.assertEqual(view['tags'], ['x', 'y', 'z'])
+        self.assertNotIn('port', view)
+        self.assertEqual(view.materialize()['credentials'],
+                         dict(user='u', password='changed'))
+
+    def test_materialize_keeps_no_copies(self):
+        base, own = layers()
+        view = VariableView(base, own)
+        materialized = view.materialize()
+        self.assertIsNone(view._local)
+        self.assertEqual(materialized['tags'], base['tags'])
+        self.assertIsNot(materialized['tags'], base['tags'])
+        view['tags']
+        self.assertEqual(list(view._local), ['tags'])
+
+    def test_export(self):
+        base, own = layers()
+        view = VariableView(base, own)
+        view['image'] = 'new'
+        view['config']['nested']['x'] = 10
+        del view['port']
+        exported = view.export()
+        self.assertIs(exported[0], own)
+        self.assertIs(type(exported[1]['config']), dict)
+        self.assertEqual(exported[2], ['port'])
+        rebuilt = VariableView.from_layers(base, *exported)
+        self.assertEqual(rebuilt.materialize(), view.materialize())
+        self.assertEqual(VariableView(base, own).export(), (own, None, None))
+
+    def test_views_are_independent(self):
+        base, _ = layers()
+        one, other = VariableView(base, None), VariableView(base, dict())
+        one['tags'].append('z')
+        self.assertEqual(other['tags'], ['x', 'y'])
+
+    def test_static_description(self):
+        big = dict(('v{0}'.format(i), dict(value=i)) for i in range(100))
+        desc = diamond()
+        desc['variables'] = big
+        desc['nodes'][0]['variables'] = dict(v1=dict(other=1))
+        sd = compiler.StaticDescription(desc, layered_variables=True)
+        A, B = sd.node_lookup['A'], sd.node_lookup['B']
+        self.assertIs(A['variables'].base, B['variables'].base)
+        self.assertEqual(A['variables']['v1'], dict(value=1, other=1))
+        self.assertEqual(B['variables'].materialize(), big)